@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark for stage_one.
+
+Starts a fresh Python process per run, the way a serverless platform does on
+a cold start, and measures for each settings profile:
+
+- import_ms: time to import `stage_one.wsgi` (Django setup, apps, URLconf);
+- first_response_ms: time from the start of that import to the end of the
+  first /api/hello response;
+- rss_mb: resident memory once the first response is served;
+- modules: number of modules imported by then.
+
+The first request goes to the local upstream stand-ins from `standins.py`.
+Medians over ``--runs`` processes are printed and written as JSON to
+``--output``.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 10]
+        [--profiles stage_one.settings,stage_one.settings_lean] [--output bench_cold_start.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def child():
+    """Import the WSGI application, serve one request and print the timings as JSON."""
+    from bench_hello import wsgi_request
+
+    start = time.perf_counter()
+    from stage_one.wsgi import application
+    imported = time.perf_counter()
+    _, status, _ = wsgi_request(application, '203.0.113.7')
+    served = time.perf_counter()
+    print(json.dumps({
+        "status": status,
+        "import_ms": (imported - start) * 1000,
+        "first_response_ms": (served - start) * 1000,
+        "rss_mb": rss_mb(),
+        "modules": len(sys.modules),
+        "loaded": sorted(name for name in ('django.contrib.admin', 'django.template', 'requests', 'httpx')
+                         if name in sys.modules),
+    }))
+
+
+def run_profile(profile, runs, base_url):
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=profile,
+        DJANGO_SECRET_KEY=os.environ.get('DJANGO_SECRET_KEY', 'bench'),
+        GEOLOCATION_API_KEY='bench',
+        WEATHER_API_KEY='bench',
+        GEOLOCATION_API_URL=f"{base_url}/",
+        WEATHER_API_URL=f"{base_url}/data/2.5/weather",
+        GEOLOCATION_BACKEND='remote',
+        WEATHER_REFRESH_AHEAD='False',
+        WEATHER_PREWARM_ON_START='False',
+    )
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child'],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "profile": profile,
+        "runs": runs,
+        "import_ms": round(statistics.median(s['import_ms'] for s in samples), 1),
+        "first_response_ms": round(statistics.median(s['first_response_ms'] for s in samples), 1),
+        "rss_mb": round(statistics.median(s['rss_mb'] for s in samples), 1),
+        "modules": samples[-1]['modules'],
+        "loaded": samples[-1]['loaded'],
+        "statuses": sorted({s['status'] for s in samples}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--profiles', default='stage_one.settings,stage_one.settings_lean')
+    parser.add_argument('--output', default='bench_cold_start.json')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    import standins
+
+    server = standins.serve(standins.build_app())
+    base_url = f"http://127.0.0.1:{server.port}"
+    results = [run_profile(profile, args.runs, base_url) for profile in args.profiles.split(',')]
+    server.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump({"benchmark": "cold_start", "results": results}, f, indent=2)
+
+    print(f"{'profile':<26}{'import ms':>11}{'first ms':>10}{'rss MB':>9}{'modules':>9}")
+    for row in results:
+        print(f"{row['profile']:<26}{row['import_ms']:>11}{row['first_response_ms']:>10}"
+              f"{row['rss_mb']:>9}{row['modules']:>9}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
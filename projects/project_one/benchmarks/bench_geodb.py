@@ -0,0 +1,111 @@
+"""
+Lookup benchmark for the offline geolocation database in `task_one.geodb`.
+
+Builds a synthetic IP2Location-style CSV with the requested number of IPv4 and
+IPv6 ranges, converts it with `build_database`, then reports the time and
+memory cost of opening the database and the latency of random
+lookups.
+
+Usage:
+    python benchmarks/bench_geodb.py [--ipv4 3000000] [--ipv6 500000] [--lookups 200000]
+"""
+
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+
+settings.configure()
+
+from task_one.geodb import GeoDatabase, build_database
+
+
+def memory_kib():
+    """Return (anonymous, file-backed) resident memory of this process in KiB."""
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            fields[name] = value.split()[0] if value.split() else '0'
+    return int(fields.get('RssAnon', 0)), int(fields.get('RssFile', 0))
+
+
+def write_csv(path, ipv4, ipv6, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        step = (2 ** 32) // ipv4
+        for i in range(ipv4):
+            start = i * step
+            f.write(f'"{start}","{start + step - 1}","GH","Ghana","Region","City {rng.randrange(50000)}",'
+                    f'"{rng.uniform(-90, 90):.5f}","{rng.uniform(-180, 180):.5f}"\n')
+        base = int(ipaddress.IPv6Address('2000::'))
+        step = (2 ** 125) // max(ipv6, 1)
+        for i in range(ipv6):
+            start = base + i * step
+            f.write(f'"{start}","{start + step - 1}","JP","Japan","Region","City {rng.randrange(50000)}",'
+                    f'"{rng.uniform(-90, 90):.5f}","{rng.uniform(-180, 180):.5f}"\n')
+
+
+def measure(db, addresses):
+    samples = []
+    for ip in addresses:
+        start = time.perf_counter()
+        db.lookup(ip)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    n = len(samples)
+    return (sum(samples) / n * 1e6, samples[n // 2] * 1e6, samples[int(n * 0.99) - 1] * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ipv4', type=int, default=3_000_000)
+    parser.add_argument('--ipv6', type=int, default=500_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'db.csv')
+        path = os.path.join(directory, 'geodb.bin')
+        write_csv(source, args.ipv4, args.ipv6)
+        build_database(source, path)
+
+        anon_before, file_before = memory_kib()
+        start = time.perf_counter()
+        db = GeoDatabase(path)
+        open_ms = (time.perf_counter() - start) * 1e3
+
+        rng = random.Random(1)
+        ipv4 = [str(ipaddress.IPv4Address(rng.randrange(2 ** 32))) for _ in range(args.lookups)]
+        ipv6 = [str(ipaddress.IPv6Address(rng.randrange(2 ** 125) + int(ipaddress.IPv6Address('2000::'))))
+                for _ in range(args.lookups)]
+
+        anon_open, _ = memory_kib()
+        for ip in ipv4:
+            db.lookup(ip)
+        for ip in ipv6:
+            db.lookup(ip)
+        anon_after, file_after = memory_kib()
+
+        v4 = measure(db, ipv4)
+        v6 = measure(db, ipv6)
+
+        print(f"database: {os.path.getsize(path) / 2 ** 20:.1f} MiB, "
+              f"{db.ipv4_ranges} IPv4 + {db.ipv6_ranges} IPv6 ranges, opened in {open_ms:.2f} ms")
+        print(f"private (anonymous) memory growth during lookups: {anon_after - anon_open} KiB")
+        print(f"shared page-cache pages mapped: {file_after - file_before} KiB")
+        print(f"{'family':<8}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+        for name, (mean, p50, p99) in (('ipv4', v4), ('ipv6', v6)):
+            print(f"{name:<8}{mean:>10.2f}{p50:>10.2f}{p99:>10.2f}")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
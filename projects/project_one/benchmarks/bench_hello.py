@@ -0,0 +1,331 @@
+"""
+Load benchmark for the /api/hello endpoint of 'task_one'.
+
+Starts the local upstream stand-ins from `standins.py`, then drives the
+Django application in-process with a pool of concurrent clients and measures
+throughput and latency percentiles for every combination of:
+
+- server: 'wsgi' (`hello` through the WSGI handler, one thread per client),
+  'asgi' (`hello_async` through the ASGI handler, one task per client) or
+  'micro' (the standalone ASGI application in `stage_one.micro`, which skips
+  Django's request stack);
+- cache: 'on' (the configured caches), 'off' (every TTL set to 0, so every
+  request goes to the upstreams) or 'l2' (the in-process caches backed by a
+  SQLite second tier shared by every 'l2' run, so a repeated 'l2' run starts
+  like a new instance joining a warm fleet).
+
+Each configuration runs in its own process, so module-level caches, pools and
+settings never leak from one to the next. Visitor addresses are drawn from a
+fixed pool with a Zipf-like skew, so a few visitors (and cities) are much more
+common than the rest, as with real traffic. The application is called
+directly, without an HTTP server in front, so the numbers cover Django, the
+view, the caches and the upstream calls.
+
+Besides latency percentiles, each configuration reports requests per second
+per core: requests served divided by the CPU time the process used, which
+compares the cost of each stack independently of how many cores it had.
+
+Results are printed as a table and written as JSON to ``--output``.
+
+Usage:
+    python benchmarks/bench_hello.py [--requests 2000] [--concurrency 32]
+        [--configs wsgi-on,wsgi-off,asgi-on,asgi-off,micro-on] [--geo-latency lognormal:30:0.4]
+        [--weather-latency lognormal:60:0.5] [--error-rate 0.0] [--output bench_hello.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import standins
+
+
+CACHE_OFF = {
+    "GEOLOCATION_CACHE_TTL": "0",
+    "WEATHER_CACHE_TTL": "0",
+    "WEATHER_CACHE_STALE_TTL": "0",
+    "WEATHER_CACHE_NEGATIVE_TTL": "0",
+}
+
+
+def visitor_ips(count, requests, skew, seed):
+    """
+    Return ``requests`` visitor addresses drawn from a pool of ``count``.
+
+    The n-th address of the pool is drawn with a weight of ``1 / n ** skew``.
+    """
+    rng = random.Random(seed)
+    pool = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            for _ in range(count)]
+    weights = [1 / (rank + 1) ** skew for rank in range(count)]
+    return rng.choices(pool, weights, k=requests)
+
+
+def wsgi_request(application, ip):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/api/hello',
+        'QUERY_STRING': 'visitor_name=Bench',
+        'SERVER_NAME': 'bench',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'bench',
+        'HTTP_X_FORWARDED_FOR': ip,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    start = time.perf_counter()
+    result = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return time.perf_counter() - start, int(status[0].split()[0]), body
+
+
+async def asgi_request(application, ip):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': '/api/hello',
+        'raw_path': b'/api/hello',
+        'query_string': b'visitor_name=Bench',
+        'root_path': '',
+        'headers': [(b'host', b'bench'), (b'x-forwarded-for', ip.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('bench', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    disconnected = asyncio.Event()
+    response = {'body': b''}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+
+    start = time.perf_counter()
+    await application(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    disconnected.set()
+    return elapsed, response['status'], response['body']
+
+
+async def asgi_startup(application):
+    """Run the lifespan startup of an ASGI application that supports it."""
+    events = asyncio.Queue()
+    await events.put({'type': 'lifespan.startup'})
+    started = asyncio.Event()
+
+    async def send(message):
+        if message['type'] == 'lifespan.startup.complete':
+            started.set()
+
+    asyncio.ensure_future(application({'type': 'lifespan', 'asgi': {'version': '3.0'}}, events.get, send))
+    await started.wait()
+
+
+def run_wsgi(ips, concurrency):
+    from stage_one.wsgi import application
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda ip: wsgi_request(application, ip), ips[:concurrency]))
+        start, cpu = time.perf_counter(), time.process_time()
+        samples = list(pool.map(lambda ip: wsgi_request(application, ip), ips))
+    return samples, time.perf_counter() - start, time.process_time() - cpu
+
+
+def run_asgi(ips, concurrency, micro=False):
+    if micro:
+        from stage_one.micro import application
+    else:
+        from stage_one.asgi import application
+
+    async def drive(batch):
+        queue = iter(batch)
+        samples = []
+
+        async def client():
+            for ip in queue:
+                samples.append(await asgi_request(application, ip))
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return samples
+
+    async def main():
+        if micro:
+            await asgi_startup(application)
+        await drive(ips[:concurrency])
+        start, cpu = time.perf_counter(), time.process_time()
+        samples = await drive(ips)
+        return samples, time.perf_counter() - start, time.process_time() - cpu
+
+    return asyncio.run(main())
+
+
+def summarize(samples, duration, cpu):
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+    degraded = 0
+    for _, status, body in samples:
+        if status == 200:
+            data = json.loads(body)
+            degraded += data['location'] is None or 'N/A' in data['greeting']
+
+    def percentile(p):
+        return round(latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)], 2)
+
+    return {
+        "requests": len(samples),
+        "non_200": sum(status != 200 for _, status, _ in samples),
+        "degraded": degraded,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "cpu_s": round(cpu, 3),
+        "rps_per_core": round(len(samples) / cpu, 1) if cpu else None,
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+def worker(options):
+    """Run one configuration in this process and print its summary as JSON."""
+    import django
+    django.setup()
+    from task_one import views
+    from task_one.resilience import upstream_stats
+
+    ips = visitor_ips(options['ips'], options['requests'], options['skew'], options['seed'])
+    if options['server'] == 'wsgi':
+        samples, duration, cpu = run_wsgi(ips, options['concurrency'])
+    else:
+        samples, duration, cpu = run_asgi(ips, options['concurrency'], micro=options['server'] == 'micro')
+    result = summarize(samples, duration, cpu)
+    result["caches"] = {
+        "location": views.location_cache().stats(),
+        "weather": views.weather_cache().stats(),
+    }
+    result["upstreams"] = upstream_stats()
+    print(json.dumps(result))
+
+
+def run_config(name, args, base_url, l2_path):
+    server, cache = name.split('-')
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='stage_one.settings',
+        DJANGO_SECRET_KEY=os.environ.get('DJANGO_SECRET_KEY', 'bench'),
+        GEOLOCATION_API_KEY='bench',
+        WEATHER_API_KEY='bench',
+        GEOLOCATION_API_URL=f"{base_url}/",
+        WEATHER_API_URL=f"{base_url}/data/2.5/weather",
+        GEOLOCATION_BACKEND='remote',
+        WEATHER_REFRESH_AHEAD='False',
+        WEATHER_PREWARM_ON_START='False',
+        HELLO_ASYNC=str(server != 'wsgi'),
+    )
+    if cache == 'off':
+        env.update(CACHE_OFF)
+    elif cache == 'l2':
+        env.update(LOOKUP_CACHE_L2_BACKEND='sqlite', LOOKUP_CACHE_L2_PATH=l2_path)
+    options = {
+        "server": server,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "ips": args.ips,
+        "skew": args.skew,
+        "seed": args.seed,
+    }
+    urllib.request.urlopen(f"{base_url}/__stats?reset=1").read()
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', json.dumps(options)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["standins"] = json.loads(urllib.request.urlopen(f"{base_url}/__stats").read())
+    return {"config": name, "server": server, "cache": cache, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--configs', default='wsgi-on,wsgi-off,asgi-on,asgi-off,micro-on',
+                        help='Comma-separated list of <wsgi|asgi|micro>-<on|off|l2> configurations.')
+    parser.add_argument('--ips', type=int, default=2000, help='Number of distinct visitor addresses.')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the visitor distribution.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--geo-latency', default='lognormal:30:0.4')
+    parser.add_argument('--weather-latency', default='lognormal:60:0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--output', default='bench_hello.json')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(json.loads(args.worker))
+        return
+
+    app = standins.build_app(args.geo_latency, args.weather_latency, args.error_rate)
+    server = standins.serve(app)
+    base_url = f"http://127.0.0.1:{server.port}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        l2_path = os.path.join(directory, 'lookup_cache.sqlite3')
+        results = [run_config(name, args, base_url, l2_path) for name in args.configs.split(',')]
+    server.shutdown()
+
+    report = {
+        "benchmark": "hello",
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key not in ('worker', 'output')},
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'config':<10}{'rps':>10}{'rps/core':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'degraded':>10}{'upstream':>10}")
+    for row in results:
+        upstream = row['standins']['geolocation']['requests'] + row['standins']['weather']['requests']
+        print(f"{row['config']:<10}{row['throughput_rps']:>10}{row['rps_per_core']:>10}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['degraded']:>10}{upstream:>10}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
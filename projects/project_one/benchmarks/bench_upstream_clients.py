@@ -0,0 +1,138 @@
+"""
+Microbenchmark for the upstream HTTP clients used by 'task_one'.
+
+Starts a local stub upstream that answers like the IP2Location.io and
+OpenWeatherMap APIs, then measures per-request latency for:
+
+- before: a new connection per call, the way `get_location` (ip2locationio
+  builds a fresh `http.client` connection) and `get_weather` (bare
+  `requests.get`) used to work;
+- after: the pooled keep-alive session in `task_one.clients`.
+
+The stub can add a delay to every new connection (``--connect-ms``) to stand
+in for the TCP and TLS handshake round trips paid against a remote API.
+
+Usage:
+    python benchmarks/bench_upstream_clients.py [--requests 2000] [--latency-ms 0] [--connect-ms 0]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    connect_delay = 0.0
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path.startswith('/data/2.5/weather'):
+            payload = {"main": {"temp": 27.5}}
+        else:
+            payload = {"city_name": "Accra", "latitude": 5.556, "longitude": -0.1969}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(latency, connect_delay=0.0):
+    StubHandler.latency = latency
+    StubHandler.connect_delay = connect_delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def per_call_location(base_url, ip):
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port)
+    conn.request('GET', '/?' + urlencode({"key": "bench", "ip": ip, "format": "json"}))
+    rec = json.loads(conn.getresponse().read())
+    conn.close()
+    return rec.get('city_name')
+
+
+def per_call_weather(base_url, city):
+    import requests
+    response = requests.get(f"{base_url}?q={city}&appid=bench&units=metric")
+    return response.json()['main']['temp']
+
+
+def measure(fn, arg, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='Artificial service time added by the stub upstream.')
+    parser.add_argument('--connect-ms', type=float, default=0.0,
+                        help='Artificial delay on every new connection (handshake cost).')
+    args = parser.parse_args()
+
+    server = start_stub(args.latency_ms / 1000, args.connect_ms / 1000)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    settings.configure(
+        GEOLOCATION_API_KEY='bench',
+        WEATHER_API_KEY='bench',
+        GEOLOCATION_API_URL=f"{base}/",
+        WEATHER_API_URL=f"{base}/data/2.5/weather",
+    )
+    django.setup()
+    from task_one import clients
+
+    results = {
+        "location_before": measure(lambda ip: per_call_location(base, ip), '203.0.113.7', args.requests),
+        "location_after": measure(clients.fetch_location, '203.0.113.7', args.requests),
+        "weather_before": measure(lambda city: per_call_weather(f"{base}/data/2.5/weather", city), 'Accra', args.requests),
+        "weather_after": measure(clients.fetch_weather, 'Accra', args.requests),
+    }
+    server.shutdown()
+
+    print(f"{'case':<18}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for name, row in results.items():
+        print(f"{name:<18}{row['mean_us']:>10}{row['p50_us']:>10}{row['p99_us']:>10}")
+
+
+if __name__ == '__main__':
+    main()
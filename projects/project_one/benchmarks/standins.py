@@ -0,0 +1,235 @@
+"""
+Local stand-ins for the upstream APIs used by 'task_one'.
+
+Serves imitations of the two third-party endpoints `hello` depends on, so it
+can be benchmarked without live API keys or network access:
+
+- IP2Location.io lookup: ``GET /?key=...&ip=...&format=json``
+- OpenWeatherMap current weather: ``GET /data/2.5/weather?q=...`` (or ``lat``/``lon``)
+
+Each stand-in has its own latency distribution, error rate and payloads.
+Request counters are available at ``GET /__stats`` (add ``?reset=1`` to zero
+them).
+
+Latency distributions are given as ``kind:params`` in milliseconds:
+``fixed:20``, ``uniform:10:50``, ``lognormal:20:0.5`` (median, sigma) or
+``exp:20`` (mean).
+
+Usage:
+    python benchmarks/standins.py [--port 8081] [--geo-latency lognormal:30:0.4]
+        [--weather-latency lognormal:60:0.5] [--error-rate 0.01] [--cities cities.json]
+
+Point the app at it with:
+    GEOLOCATION_API_URL=http://127.0.0.1:8081/
+    WEATHER_API_URL=http://127.0.0.1:8081/data/2.5/weather
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import zlib
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wrappers import Request, Response
+
+
+DEFAULT_CITIES = [
+    ["Accra", 5.556, -0.1969], ["Kumasi", 6.6885, -1.6244], ["Lagos", 6.5244, 3.3792],
+    ["Nairobi", -1.2921, 36.8219], ["London", 51.5072, -0.1276], ["New York", 40.7128, -74.006],
+    ["Tokyo", 35.6895, 139.6917], ["Sao Paulo", -23.5505, -46.6333], ["Berlin", 52.52, 13.405],
+    ["Mumbai", 19.076, 72.8777], ["Cairo", 30.0444, 31.2357], ["Sydney", -33.8688, 151.2093],
+]
+
+
+def parse_latency(spec):
+    """
+    Build a sampler from a latency spec such as ``lognormal:20:0.5``.
+
+    Args:
+        spec (str): The distribution kind and its parameters, in milliseconds.
+
+    Returns:
+        callable: Returns a latency in seconds each time it is called.
+    """
+    kind, *params = spec.split(':')
+    params = [float(p) for p in params]
+    rng = random.Random()
+    if kind == 'fixed':
+        return lambda: params[0] / 1000
+    if kind == 'uniform':
+        return lambda: rng.uniform(params[0], params[1]) / 1000
+    if kind == 'lognormal':
+        import math
+        mu = math.log(params[0])
+        return lambda: rng.lognormvariate(mu, params[1]) / 1000
+    if kind == 'exp':
+        return lambda: rng.expovariate(1 / params[0]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class Standin:
+    """
+    One imitated upstream endpoint.
+
+    Args:
+        latency (callable): Returns the simulated service time in seconds.
+        error_rate (float): Fraction of requests answered with an error.
+    """
+    def __init__(self, latency, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    def begin(self):
+        """Sleep for the simulated latency and return whether to fail this request."""
+        time.sleep(self.latency())
+        with self._lock:
+            self.requests += 1
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return failed
+
+    def stats(self, reset=False):
+        with self._lock:
+            stats = {"requests": self.requests, "errors": self.errors}
+            if reset:
+                self.requests = self.errors = 0
+        return stats
+
+
+class StandinApp:
+    """
+    WSGI application serving the geolocation and weather stand-ins.
+
+    Args:
+        geolocation (Standin): Behaviour of the IP2Location.io stand-in.
+        weather (Standin): Behaviour of the OpenWeatherMap stand-in.
+        cities (list): ``[name, latitude, longitude]`` entries that visitor
+            IPs are mapped onto.
+    """
+    def __init__(self, geolocation, weather, cities=None):
+        self.geolocation = geolocation
+        self.weather = weather
+        self.cities = cities or DEFAULT_CITIES
+        self._by_name = {name.casefold(): (name, lat, lon) for name, lat, lon in self.cities}
+
+    def city_for_ip(self, ip):
+        return self.cities[zlib.crc32(ip.encode()) % len(self.cities)]
+
+    def temperature(self, name):
+        return round(15 + zlib.crc32(name.encode()) % 200 / 10, 2)
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        if request.path == '/__stats':
+            reset = request.args.get('reset') == '1'
+            body = {"geolocation": self.geolocation.stats(reset), "weather": self.weather.stats(reset)}
+            return self.json(body)(environ, start_response)
+        if request.path.startswith('/data/2.5/weather'):
+            return self.weather_response(request)(environ, start_response)
+        return self.geolocation_response(request)(environ, start_response)
+
+    def geolocation_response(self, request):
+        if self.geolocation.begin():
+            return self.json({"error": {"error_code": 10000, "error_message": "Stand-in error."}}, 400)
+        ip = request.args.get('ip', '')
+        name, lat, lon = self.city_for_ip(ip)
+        return self.json({
+            "ip": ip, "country_code": "GH", "country_name": "Ghana", "region_name": "Region",
+            "city_name": name, "latitude": lat, "longitude": lon, "zip_code": "-",
+            "time_zone": "+00:00", "asn": "0", "as": "Stand-in", "is_proxy": False,
+        })
+
+    def weather_response(self, request):
+        if self.weather.begin():
+            return self.json({"cod": 500, "message": "Stand-in error."}, 500)
+        if 'lat' in request.args:
+            lat, lon = float(request.args['lat']), float(request.args['lon'])
+            name = f"{lat:.2f},{lon:.2f}"
+        else:
+            query = request.args.get('q', '')
+            if query.casefold() not in self._by_name:
+                return self.json({"cod": "404", "message": "city not found"}, 404)
+            name, lat, lon = self._by_name[query.casefold()]
+        return self.json({
+            "coord": {"lon": lon, "lat": lat},
+            "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+            "main": {"temp": self.temperature(name), "feels_like": 30.1, "pressure": 1012, "humidity": 70},
+            "name": name, "cod": 200,
+        })
+
+    @staticmethod
+    def json(body, status=200):
+        return Response(json.dumps(body), status=status, mimetype='application/json')
+
+
+class NoDelayRequestHandler(WSGIRequestHandler):
+    """Request handler that disables Nagle's algorithm on keep-alive connections."""
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve(app, host='127.0.0.1', port=0):
+    """
+    Serve ``app`` from a background thread.
+
+    Args:
+        app (StandinApp): The stand-in application.
+        host (str): The interface to bind.
+        port (int): The port to bind; 0 picks a free one.
+
+    Returns:
+        BaseWSGIServer: The running server; ``server.port`` is the bound port.
+    """
+    server = make_server(host, port, app, threaded=True, request_handler=NoDelayRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_app(geo_latency='fixed:0', weather_latency='fixed:0', error_rate=0.0, cities=None):
+    """Build a `StandinApp` from latency specs, a shared error rate and a city list."""
+    return StandinApp(
+        Standin(parse_latency(geo_latency), error_rate),
+        Standin(parse_latency(weather_latency), error_rate),
+        cities,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--geo-latency', default='lognormal:30:0.4')
+    parser.add_argument('--weather-latency', default='lognormal:60:0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--cities', default=None,
+                        help='JSON file of [name, latitude, longitude] entries.')
+    args = parser.parse_args()
+
+    cities = None
+    if args.cities:
+        with open(args.cities) as f:
+            cities = json.load(f)
+    app = build_app(args.geo_latency, args.weather_latency, args.error_rate, cities)
+    server = make_server(args.host, args.port, app, threaded=True, request_handler=NoDelayRequestHandler)
+    print(f"Stand-ins listening on http://{args.host}:{server.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stage_one.settings')
+# The ASGI profile serves /api/hello with the native async view.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stage_one.settings_asgi')
 
 application = get_asgi_application()
+
+from task_one.views import warm_weather  # noqa: E402
+
+warm_weather()
@@ -0,0 +1,89 @@
+"""
+Standalone server entry point for /api/hello, without Django's request stack.
+
+/api/hello needs none of Django's middleware, URL routing or request and
+response objects, only the lookups and caches in `task_one.views`. This
+module serves the same contract (GET /api/hello?visitor_name=..., JSON
+body, 405 for other methods) straight from `task_one.views.agreeting`, as
+``application``, a bare ASGI application servable by any ASGI server, e.g.
+``uvicorn stage_one.micro:application``. WebSocket connections are refused.
+
+Django settings are still used for configuration; they default to the lean
+profile in stage_one.settings_lean.
+
+For more information on this file, see
+https://asgi.readthedocs.io/en/latest/specs/www.html
+"""
+
+import json
+import os
+from urllib.parse import parse_qs
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stage_one.settings_lean')
+
+django.setup()
+
+from task_one.clients import get_async_client  # noqa: E402
+from task_one.views import agreeting, parse_client_ip, warm_weather  # noqa: E402
+
+
+HELLO_PATH = '/api/hello'
+METHOD_NOT_ALLOWED = {"message": "Only GET requests are allowed"}
+NOT_FOUND = {"message": "Not found"}
+
+
+async def _send_json(send, status, data):
+    body = json.dumps(data).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def application(scope, receive, send):
+    """
+    Serve /api/hello as a bare ASGI application.
+
+    On lifespan startup the upstream client is built for the server's event
+    loop, so the first requests do not stall the loop while it is created,
+    and the weather cache starts warming for the top cities.
+    WebSocket handshakes are refused by closing the connection.
+
+    Args:
+        scope (dict): The ASGI connection scope.
+        receive (callable): Awaitable returning the next ASGI event.
+        send (callable): Awaitable sending an ASGI event.
+    """
+    if scope['type'] == 'websocket':
+        if (await receive())['type'] == 'websocket.connect':
+            await send({'type': 'websocket.close'})
+        return
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                get_async_client()
+                warm_weather()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    if scope['path'].rstrip('/') != HELLO_PATH:
+        return await _send_json(send, 404, NOT_FOUND)
+    if scope['method'] != 'GET':
+        return await _send_json(send, 405, METHOD_NOT_ALLOWED)
+
+    args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    name = args.get('visitor_name', ['Guest'])[0]
+    forwarded_for = next((value.decode('latin-1') for key, value in scope.get('headers', [])
+                          if key == b'x-forwarded-for'), None)
+    client = scope.get('client')
+    client_ip = parse_client_ip(forwarded_for, client[0] if client else '')
+    await _send_json(send, 200, await agreeting(name, client_ip))
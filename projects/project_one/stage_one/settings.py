@@ -12,6 +12,113 @@ WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 GEOLOCATION_API_KEY = os.getenv('GEOLOCATION_API_KEY')
 
 
+# Geolocation backend
+# 'remote' calls the IP2Location.io API; 'local' resolves addresses against a
+# database built with `python manage.py build_geodb` and opened through mmap.
+GEOLOCATION_BACKEND = os.getenv('GEOLOCATION_BACKEND', 'remote')
+GEOLOCATION_DB_PATH = os.getenv('GEOLOCATION_DB_PATH', os.path.join(BASE_DIR, 'geodb.bin'))
+
+
+# Geolocation cache
+# Lookups are cached in-process; grouping by prefix lets every address in the
+# same /24 (IPv4) or /48 (IPv6) network share a single entry.
+GEOLOCATION_CACHE_TTL = int(os.getenv('GEOLOCATION_CACHE_TTL', 3600))
+GEOLOCATION_CACHE_MAXSIZE = int(os.getenv('GEOLOCATION_CACHE_MAXSIZE', 10000))
+GEOLOCATION_CACHE_GROUP_BY_PREFIX = os.getenv('GEOLOCATION_CACHE_GROUP_BY_PREFIX', 'False').lower() in ('1', 'true', 'yes')
+
+
+# Weather cache
+# Entries are fresh for WEATHER_CACHE_TTL seconds, then served stale for up to
+# WEATHER_CACHE_STALE_TTL more seconds while being refreshed in the background.
+# Failed lookups ("N/A") are cached for WEATHER_CACHE_NEGATIVE_TTL seconds.
+WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', 600))
+WEATHER_CACHE_STALE_TTL = int(os.getenv('WEATHER_CACHE_STALE_TTL', 3600))
+WEATHER_CACHE_NEGATIVE_TTL = int(os.getenv('WEATHER_CACHE_NEGATIVE_TTL', 60))
+WEATHER_CACHE_MAXSIZE = int(os.getenv('WEATHER_CACHE_MAXSIZE', 5000))
+
+# Shared second-tier lookup cache
+# In-process caches are not shared between processes or serverless instances.
+# With LOOKUP_CACHE_L2_BACKEND set to 'sqlite', geolocation and weather results
+# are also kept in the SQLite database at LOOKUP_CACHE_L2_PATH (on a volume the
+# processes share), written in batches every LOOKUP_CACHE_L2_FLUSH_MS
+# milliseconds and swept of expired rows every LOOKUP_CACHE_L2_SWEEP_INTERVAL
+# seconds. 'django' uses the Django cache named LOOKUP_CACHE_L2_ALIAS instead,
+# e.g. Redis or Memcached. Leave empty for in-process caching only.
+LOOKUP_CACHE_L2_BACKEND = os.getenv('LOOKUP_CACHE_L2_BACKEND', '')
+LOOKUP_CACHE_L2_PATH = os.getenv('LOOKUP_CACHE_L2_PATH', os.path.join(BASE_DIR, 'lookup_cache.sqlite3'))
+LOOKUP_CACHE_L2_ALIAS = os.getenv('LOOKUP_CACHE_L2_ALIAS', 'default')
+LOOKUP_CACHE_L2_FLUSH_MS = int(os.getenv('LOOKUP_CACHE_L2_FLUSH_MS', 50))
+LOOKUP_CACHE_L2_BATCH_SIZE = int(os.getenv('LOOKUP_CACHE_L2_BATCH_SIZE', 100))
+LOOKUP_CACHE_L2_SWEEP_INTERVAL = int(os.getenv('LOOKUP_CACHE_L2_SWEEP_INTERVAL', 300))
+
+# Weather lookups by location
+# When the visitor's coordinates are known, the weather is looked up for the
+# centre of the geohash cell they fall in, so every visitor in one cell shares
+# one cache entry and one upstream call. WEATHER_GRID_PRECISION is the geohash
+# length (5 is about 4.9 km x 4.9 km); 0 looks the weather up by city name.
+WEATHER_GRID_PRECISION = int(os.getenv('WEATHER_GRID_PRECISION', 5))
+
+# Refresh-ahead for the most requested cities
+# Request counts per city are tracked in a count-min sketch and the ranking is
+# saved to WEATHER_TOP_CITIES_PATH by the refresh-ahead worker and by the
+# prewarm_weather command, which warms those cities (into the shared store when
+# LOOKUP_CACHE_L2_BACKEND is set). With WEATHER_PREWARM_ON_START enabled, each
+# serving process also warms them in the background when it starts, at the cost
+# of up to WEATHER_TOP_CITIES upstream calls per start. With
+# WEATHER_REFRESH_AHEAD enabled, each process reloads them WEATHER_REFRESH_LEAD
+# seconds before they turn stale.
+WEATHER_TRACK_TOP_CITIES = os.getenv('WEATHER_TRACK_TOP_CITIES', 'True').lower() in ('1', 'true', 'yes')
+WEATHER_TOP_CITIES = int(os.getenv('WEATHER_TOP_CITIES', 500))
+WEATHER_TOP_CITIES_PATH = os.getenv('WEATHER_TOP_CITIES_PATH', os.path.join(BASE_DIR, 'top_cities.json'))
+WEATHER_PREWARM_ON_START = os.getenv('WEATHER_PREWARM_ON_START', 'False').lower() in ('1', 'true', 'yes')
+WEATHER_REFRESH_AHEAD = os.getenv('WEATHER_REFRESH_AHEAD', 'False').lower() in ('1', 'true', 'yes')
+WEATHER_REFRESH_INTERVAL = int(os.getenv('WEATHER_REFRESH_INTERVAL', 30))
+WEATHER_REFRESH_LEAD = int(os.getenv('WEATHER_REFRESH_LEAD', 120))
+
+
+# Upstream HTTP clients
+# HELLO_ASYNC routes /api/hello to the async view; stage_one.settings_asgi, the
+# profile of stage_one/asgi.py, enables it by default.
+HELLO_ASYNC = os.getenv('HELLO_ASYNC', 'False').lower() in ('1', 'true', 'yes')
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 1.0))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', 2.0))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_CONNECTIONS', 200))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv('UPSTREAM_MAX_KEEPALIVE', 50))
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', 1))
+
+# Latency budget for /api/hello, split between the geolocation stage
+# (HELLO_GEO_BUDGET_SHARE) and the weather stage; 0 disables it. A hedged
+# second request is sent once a call is slower than the
+# UPSTREAM_HEDGE_PERCENTILE of recent calls (0 disables hedging). After
+# UPSTREAM_BREAKER_FAILURES consecutive failures (connection errors and 5xx
+# responses; not running out of budget) an upstream is skipped for
+# UPSTREAM_BREAKER_RESET seconds.
+HELLO_LATENCY_BUDGET_MS = int(os.getenv('HELLO_LATENCY_BUDGET_MS', 300))
+HELLO_GEO_BUDGET_SHARE = float(os.getenv('HELLO_GEO_BUDGET_SHARE', 0.4))
+UPSTREAM_HEDGE_PERCENTILE = float(os.getenv('UPSTREAM_HEDGE_PERCENTILE', 95))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv('UPSTREAM_BREAKER_FAILURES', 5))
+UPSTREAM_BREAKER_RESET = int(os.getenv('UPSTREAM_BREAKER_RESET', 30))
+
+# Batch greetings (/api/hello/batch)
+# At most HELLO_BATCH_MAX_ITEMS visitors per request; the geolocation and
+# weather lookups of every batch request run in one pool of
+# HELLO_BATCH_CONCURRENCY threads per process.
+HELLO_BATCH_MAX_ITEMS = int(os.getenv('HELLO_BATCH_MAX_ITEMS', 10000))
+HELLO_BATCH_CONCURRENCY = int(os.getenv('HELLO_BATCH_CONCURRENCY', 16))
+
+# Per-stage timing for /api/hello
+# HELLO_TIMING times each stage of a request (IP parsing, geolocation, weather,
+# JSON encoding), reports it in a Server-Timing response header and aggregates
+# it into histograms. HELLO_TIMING_ENDPOINT serves those histograms at
+# /api/_timings; keep it off on public deployments.
+HELLO_TIMING = os.getenv('HELLO_TIMING', 'False').lower() in ('1', 'true', 'yes')
+HELLO_TIMING_ENDPOINT = os.getenv('HELLO_TIMING_ENDPOINT', 'False').lower() in ('1', 'true', 'yes')
+
+# Override the upstream endpoints, e.g. to point at local stand-ins.
+GEOLOCATION_API_URL = os.getenv('GEOLOCATION_API_URL')
+WEATHER_API_URL = os.getenv('WEATHER_API_URL')
+
+
 # Host set to anywhere
 ALLOWED_HOSTS = ['*']
 
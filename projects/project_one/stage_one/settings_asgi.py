@@ -0,0 +1,15 @@
+"""
+Settings profile for serving stage_one under ASGI.
+
+stage_one.asgi selects it by default. /api/hello is served with the native
+async view, so upstream calls do not tie up a thread each; set
+HELLO_ASYNC=False to use the sync view instead. Every other setting is
+inherited from stage_one.settings.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+
+
+HELLO_ASYNC = os.getenv('HELLO_ASYNC', 'True').lower() in ('1', 'true', 'yes')
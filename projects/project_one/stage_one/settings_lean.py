@@ -0,0 +1,38 @@
+"""
+Lean settings profile for serverless deployments of stage_one.
+
+On a platform such as Vercel every cold start imports the whole project
+before the first request is served. This profile keeps only what
+/api/hello needs: the 'task_one' app, no admin, auth, sessions, messages or
+templates, a single middleware and no database connection.
+
+Select it with DJANGO_SETTINGS_MODULE=stage_one.settings_lean; every other
+setting is inherited from stage_one.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+INSTALLED_APPS = [
+    'task_one',
+]
+
+MIDDLEWARE = [
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'stage_one.urls_lean'
+
+TEMPLATES = []
+
+# /api/hello never touches the database.
+DATABASES = {}
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# Cold starts must not spend upstream calls warming the weather cache; run the
+# prewarm_weather command against the shared store instead.
+WEATHER_PREWARM_ON_START = False
+WEATHER_REFRESH_AHEAD = False
+
+USE_I18N = False
@@ -0,0 +1,12 @@
+"""
+URL configuration used by the lean settings profile (stage_one.settings_lean).
+
+Available routes:
+- 'api/': Routes requests to the 'task_one' app's URL configurations.
+"""
+
+from django.urls import path, include
+
+urlpatterns = [
+    path('api/', include("task_one.urls"))
+]
@@ -8,4 +8,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stage_one.settings')
 
 application = get_wsgi_application()
 
+from task_one.views import warm_weather  # noqa: E402
+
+warm_weather()
+
 app = application
\ No newline at end of file
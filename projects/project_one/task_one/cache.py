@@ -0,0 +1,515 @@
+"""
+In-process caching helpers for the 'task_one' app.
+
+This module provides a small, thread-safe cache used to keep the results of
+upstream lookups (geolocation, weather) in memory between requests.
+
+Available helpers:
+- TTLCache: A bounded mapping with per-entry expiry and LRU eviction.
+- TieredCache: A TTLCache backed by a shared second-tier store.
+- RevalidatingCache: A read-through cache that keeps serving stale entries
+  while refreshing them in the background, optionally backed by a shared
+  second-tier store.
+- ip_cache_key: Builds a cache key for an IP address, optionally grouped
+  by network prefix.
+"""
+
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .singleflight import SingleFlight
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache with time-to-live expiry and LRU eviction.
+
+    Entries expire ``ttl`` seconds after they were stored. When the cache is
+    full, the least recently used entry is evicted to make room for a new one.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept in the cache.
+        ttl (float): The default lifetime of an entry, in seconds.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that found no live entry.
+        evictions (int): Number of entries dropped to respect ``maxsize``.
+        expirations (int): Number of entries dropped because they expired.
+    """
+    def __init__(self, maxsize=1024, ttl=300, timer=time.monotonic):
+        if maxsize <= 0:
+            raise ValueError('maxsize must be a positive integer')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """
+        Return the live value stored for ``key``, or ``default``.
+
+        Args:
+            key: The cache key to look up.
+            default: The value returned when there is no live entry.
+
+        Returns:
+            The cached value, or ``default`` on a miss.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """
+        Return the live value stored for ``key`` without touching counters or LRU order.
+
+        Args:
+            key: The cache key to look up.
+            default: The value returned when there is no live entry.
+
+        Returns:
+            The cached value, or ``default``.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= self._timer():
+                return default
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store ``value`` under ``key``, evicting the least recently used entry if full.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl (float, optional): Lifetime of this entry in seconds. Defaults
+                to the cache's ``ttl``.
+        """
+        expires_at = self._timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove ``key`` from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            dict: The hit, miss, eviction and expiration counters together with
+            the current and maximum size of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+def _rate(hits, misses):
+    return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+
+class TieredCache(TTLCache):
+    """
+    A `TTLCache` (L1) in front of a shared second-tier store (L2).
+
+    Lookups that miss in L1 are tried against ``store`` and promoted to L1 for
+    the rest of their lifetime. Values are written to both tiers. Without a
+    store it behaves exactly like a `TTLCache`.
+
+    Args:
+        store (SharedStore, optional): The second-tier store.
+        namespace (str): Prefix added to keys in ``store``, so that several
+            caches can share it.
+
+    Attributes:
+        l2_hits (int): Number of L1 misses answered by the store.
+        l2_misses (int): Number of L1 misses the store could not answer.
+    """
+    def __init__(self, maxsize=1024, ttl=300, store=None, namespace='', timer=time.monotonic):
+        super().__init__(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._store = store
+        self.namespace = namespace
+        self.l2_hits = 0
+        self.l2_misses = 0
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self._store is None:
+            return default
+        entry = self._store.get(self.namespace + key)
+        with self._lock:
+            if entry is None:
+                self.l2_misses += 1
+            else:
+                self.l2_hits += 1
+        if entry is None:
+            return default
+        value, _, expires_in = entry
+        super().set(key, value, ttl=expires_in)
+        return value
+
+    def set(self, key, value, ttl=None):
+        super().set(key, value, ttl=ttl)
+        if self._store is not None:
+            ttl = self.ttl if ttl is None else ttl
+            self._store.set(self.namespace + key, value, ttl, ttl)
+
+    def delete(self, key):
+        super().delete(key)
+        if self._store is not None:
+            self._store.delete(self.namespace + key)
+
+    def clear(self):
+        """Remove every L1 entry and reset the counters; the store is left untouched."""
+        super().clear()
+        with self._lock:
+            self.l2_hits = self.l2_misses = 0
+
+    def stats(self):
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            dict: The TTLCache counters plus the hits, misses and hit rate of
+            each tier.
+        """
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                "l1_hit_rate": _rate(stats["hits"], stats["misses"]),
+                "l2_hits": self.l2_hits,
+                "l2_misses": self.l2_misses,
+                "l2_hit_rate": _rate(self.l2_hits, self.l2_misses),
+            })
+        return stats
+
+
+class RevalidatingCache:
+    """
+    A read-through cache implementing stale-while-revalidate.
+
+    Values are produced by ``loader``. An entry is fresh for ``ttl`` seconds;
+    for a further ``stale_ttl`` seconds it is still served, but the first
+    request that sees it stale schedules a background refresh. Only a missing
+    or fully expired entry makes the caller wait for ``loader``.
+
+    Concurrent misses for the same key share a single ``loader`` call.
+
+    Results for which ``is_failure`` returns True are cached for
+    ``negative_ttl`` seconds instead. If a background refresh fails, the
+    previous good value keeps being served and the next refresh is delayed
+    by ``negative_ttl``, so a broken upstream is not retried on every request.
+
+    With a ``store``, entries are also written to that shared second tier and
+    in-process misses are answered from it, keeping their freshness.
+
+    Attributes:
+        stale_hits (int): Number of lookups answered with a stale value.
+        refreshes (int): Number of background refreshes started.
+        refresh_failures (int): Number of background refreshes that failed.
+        l2_hits (int): Number of in-process misses answered by the store.
+        l2_misses (int): Number of in-process misses the store could not answer.
+    """
+    def __init__(self, loader, maxsize=1024, ttl=600, stale_ttl=3600, negative_ttl=60,
+                 is_failure=None, executor=None, store=None, namespace='', timer=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.is_failure = is_failure or (lambda value: False)
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl, timer=timer)
+        self._executor = executor
+        self._store = store
+        self.namespace = namespace
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._flights = SingleFlight()
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.l2_hits = 0
+        self.l2_misses = 0
+
+    def get(self, key, *args, load=None):
+        """
+        Return the value for ``key``, loading it with ``loader(*args)`` on a miss.
+
+        Args:
+            key: The cache key.
+            *args: Arguments passed to ``loader``. Defaults to ``(key,)``.
+            load (callable, optional): Used instead of ``loader`` for a miss
+                loaded by this call, e.g. to apply the caller's deadline.
+                Background refreshes always use ``loader``.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        args = args or (key,)
+        found, value = self.lookup(key, *args)
+        if found:
+            return value
+        return self._flights.do(key, self._load, key, args, load or self.loader)
+
+    def fresh_for(self, key):
+        """
+        Return how many seconds the entry for ``key`` stays fresh.
+
+        Returns:
+            float: Seconds until the entry turns stale (negative once stale),
+            or None if there is no entry.
+        """
+        entry = self._entries.peek(key)
+        return None if entry is None else entry[0] - self._timer()
+
+    def refresh(self, key, *args):
+        """
+        Reload ``key`` now, in the calling thread.
+
+        As with background refreshes, a failed reload keeps serving the
+        previous good value.
+
+        Args:
+            key: The cache key.
+            *args: Arguments passed to ``loader``. Defaults to ``(key,)``.
+        """
+        self._refresh(key, args or (key,))
+
+    def _load(self, key, args, loader):
+        # Another caller may have stored the value since our lookup missed.
+        entry = self._entries.peek(key)
+        if entry is not None:
+            return entry[2]
+        return self.store(key, loader(*args))
+
+    def lookup(self, key, *args):
+        """
+        Return the cached value for ``key`` without waiting on ``loader``.
+
+        A stale entry is returned as found and a background refresh is
+        scheduled for it. Callers that load values themselves (for example
+        with an async client) should pass the result to `store` on a miss.
+
+        Args:
+            key: The cache key.
+            *args: Arguments passed to ``loader`` for the background refresh.
+                Defaults to ``(key,)``.
+
+        Returns:
+            tuple: ``(found, value)``; ``value`` is None when ``found`` is False.
+        """
+        entry = self._entries.get(key)
+        if entry is None and self._store is not None:
+            entry = self._promote(key)
+        if entry is None:
+            return False, None
+
+        fresh_until, _, value = entry
+        if fresh_until <= self._timer():
+            with self._lock:
+                self.stale_hits += 1
+            self._schedule_refresh(key, args or (key,))
+        return True, value
+
+    def _promote(self, key):
+        stored = self._store.get(self.namespace + key)
+        with self._lock:
+            if stored is None:
+                self.l2_misses += 1
+            else:
+                self.l2_hits += 1
+        if stored is None:
+            return None
+        value, fresh_for, expires_in = stored
+        now = self._timer()
+        entry = (now + fresh_for, now + expires_in, value)
+        self._entries.set(key, entry, ttl=expires_in)
+        return entry
+
+    def peek(self, key):
+        """Return the cached value for ``key`` without loading or refreshing it."""
+        entry = self._entries.peek(key)
+        return None if entry is None else entry[2]
+
+    def store(self, key, value):
+        """
+        Store a freshly loaded ``value`` for ``key``.
+
+        Args:
+            key: The cache key.
+            value: The loaded value. Failures are kept for ``negative_ttl``.
+
+        Returns:
+            The stored value.
+        """
+        now = self._timer()
+        if self.is_failure(value):
+            fresh_for = expires_in = self.negative_ttl
+        else:
+            fresh_for, expires_in = self.ttl, self.ttl + self.stale_ttl
+        self._entries.set(key, (now + fresh_for, now + expires_in, value), ttl=expires_in)
+        if self._store is not None:
+            self._store.set(self.namespace + key, value, fresh_for, expires_in)
+        return value
+
+    def _back_off(self, key, previous):
+        # Keep serving the last good value, but wait before retrying.
+        now = self._timer()
+        _, stale_until, value = previous
+        remaining = max(stale_until - now, self.negative_ttl)
+        self._entries.set(key, (now + self.negative_ttl, stale_until, value), ttl=remaining)
+
+    def _schedule_refresh(self, key, args):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.refreshes += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+        self._executor.submit(self._refresh, key, args)
+
+    def _refresh(self, key, args):
+        try:
+            previous = self._entries.peek(key)
+            try:
+                value = self.loader(*args)
+            except Exception:
+                value = None
+                failed = True
+            else:
+                failed = self.is_failure(value)
+            if failed:
+                with self._lock:
+                    self.refresh_failures += 1
+                if previous is not None:
+                    self._back_off(key, previous)
+                elif value is not None:
+                    self.store(key, value)
+            else:
+                self.store(key, value)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        """Remove every in-process entry and reset the counters; the store is left untouched."""
+        self._entries.clear()
+        with self._lock:
+            self.stale_hits = self.refreshes = self.refresh_failures = 0
+            self.l2_hits = self.l2_misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Return a snapshot of the cache counters.
+
+        Returns:
+            dict: The underlying TTLCache counters plus the stale-hit,
+            background-refresh and per-tier hit counters.
+        """
+        stats = self._entries.stats()
+        with self._lock:
+            stats.update({
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "l1_hit_rate": _rate(stats["hits"], stats["misses"]),
+                "l2_hits": self.l2_hits,
+                "l2_misses": self.l2_misses,
+                "l2_hit_rate": _rate(self.l2_hits, self.l2_misses),
+            })
+        return stats
+
+
+def normalize_city(city):
+    """
+    Normalize a city name for use as a cache key.
+
+    Args:
+        city (str): The city name.
+
+    Returns:
+        str: The city name with surrounding and repeated whitespace removed,
+        case-folded.
+    """
+    return ' '.join(str(city).split()).casefold()
+
+
+def ip_cache_key(ip, group_by_prefix=False, ipv4_prefix=24, ipv6_prefix=48):
+    """
+    Build the cache key used for an IP address.
+
+    When ``group_by_prefix`` is set, addresses are collapsed to their network
+    (by default /24 for IPv4 and /48 for IPv6) so that nearby addresses share
+    a single cache entry.
+
+    Args:
+        ip (str): The IP address.
+        group_by_prefix (bool): Whether to key by network prefix instead of
+            by the full address.
+        ipv4_prefix (int): The prefix length used for IPv4 addresses.
+        ipv6_prefix (int): The prefix length used for IPv6 addresses.
+
+    Returns:
+        str: The cache key. Values that are not valid IP addresses are
+        returned stripped but otherwise unchanged.
+    """
+    ip = ip.strip()
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+
+    if not group_by_prefix:
+        return str(address)
+
+    prefix = ipv4_prefix if address.version == 4 else ipv6_prefix
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
@@ -0,0 +1,314 @@
+"""
+Upstream API clients for the 'task_one' app.
+
+This module holds the shared HTTP clients used to talk to the IP2Location.io
+geolocation API and the OpenWeatherMap current weather API.
+
+Available helpers:
+- get_session: Returns the pooled, thread-safe sync HTTP session.
+- fetch_location: Looks up the city and coordinates for an IP address.
+- fetch_weather: Looks up the current temperature for a city.
+- fetch_weather_at: Looks up the current temperature at a point.
+- get_async_client: Returns the pooled async HTTP client for the running event loop.
+- afetch_location: Looks up the city and coordinates for an IP address without blocking.
+- afetch_weather: Looks up the current temperature for a city without blocking.
+- afetch_weather_at: Looks up the current temperature at a point without blocking.
+- UpstreamError: Raised when an upstream cannot be reached or fails with a 5xx.
+
+The fetch helpers return None or 'N/A' when the upstream answers without the
+data (an unknown address or city), and raise `UpstreamError` only when the
+upstream itself is failing, so that only the latter trips the circuit
+breakers in `resilience`.
+"""
+
+import asyncio
+import threading
+import weakref
+
+from django.conf import settings
+
+from .geodb import GeoRecord
+
+# requests and httpx are imported where the clients are built, so a cold
+# start that never reaches an upstream (cache hits, the local geolocation
+# backend) does not pay for importing them.
+
+
+GEOLOCATION_URL = 'https://api.ip2location.io/'
+WEATHER_URL = 'https://api.openweathermap.org/data/2.5/weather'
+
+_session = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream cannot be reached or answers with a server error."""
+
+
+def geolocation_url():
+    """Return the IP2Location.io endpoint, overridable through GEOLOCATION_API_URL."""
+    return getattr(settings, 'GEOLOCATION_API_URL', None) or GEOLOCATION_URL
+
+
+def weather_url():
+    """Return the OpenWeatherMap endpoint, overridable through WEATHER_API_URL."""
+    return getattr(settings, 'WEATHER_API_URL', None) or WEATHER_URL
+
+
+def upstream_timeout():
+    """
+    Build the per-call timeout used for upstream requests.
+
+    Returns:
+        httpx.Timeout: Connect and read timeouts taken from the
+        UPSTREAM_CONNECT_TIMEOUT and UPSTREAM_READ_TIMEOUT settings.
+    """
+    import httpx
+
+    connect = getattr(settings, 'UPSTREAM_CONNECT_TIMEOUT', 1.0)
+    read = getattr(settings, 'UPSTREAM_READ_TIMEOUT', 2.0)
+    return httpx.Timeout(read, connect=connect)
+
+
+def get_session():
+    """
+    Return the shared sync HTTP session, creating it on first use.
+
+    The session keeps connections to each upstream alive between requests, so
+    only the first call pays for the TCP and TLS handshakes. Its pool is sized
+    by the UPSTREAM_MAX_KEEPALIVE setting and idempotent requests are retried
+    at most UPSTREAM_MAX_RETRIES times on connection errors and 502/503/504
+    responses.
+
+    Returns:
+        requests.Session: The pooled session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retries = Retry(
+                    total=getattr(settings, 'UPSTREAM_MAX_RETRIES', 1),
+                    backoff_factor=0.05,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(['GET']),
+                    raise_on_status=False,
+                )
+                pool_size = getattr(settings, 'UPSTREAM_MAX_KEEPALIVE', 50)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+                session = requests.Session()
+                # Resolve proxy settings once instead of re-reading the
+                # environment and .netrc on every request.
+                session.proxies.update(requests.utils.getproxies())
+                session.trust_env = False
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def session_timeout():
+    """
+    Return the ``(connect, read)`` timeout passed to every sync upstream call.
+
+    Returns:
+        tuple: The UPSTREAM_CONNECT_TIMEOUT and UPSTREAM_READ_TIMEOUT settings.
+    """
+    return (
+        getattr(settings, 'UPSTREAM_CONNECT_TIMEOUT', 1.0),
+        getattr(settings, 'UPSTREAM_READ_TIMEOUT', 2.0),
+    )
+
+
+def _get(url, params):
+    import requests
+
+    try:
+        response = get_session().get(url, params=params, timeout=session_timeout())
+    except requests.RequestException as e:
+        raise UpstreamError(f"{url}: {e}") from e
+    return _checked(url, response)
+
+
+async def _aget(url, params):
+    import httpx
+
+    try:
+        response = await get_async_client().get(url, params=params)
+    except httpx.HTTPError as e:
+        raise UpstreamError(f"{url}: {e}") from e
+    return _checked(url, response)
+
+
+def _checked(url, response):
+    if response.status_code >= 500:
+        raise UpstreamError(f"{url}: HTTP {response.status_code}")
+    return response
+
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _temperature(response):
+    try:
+        return _json(response)['main']['temp']
+    except (KeyError, TypeError):
+        return "N/A"
+
+
+def _location_record(rec):
+    if not isinstance(rec, dict) or 'error' in rec or not rec.get('city_name'):
+        return None
+    try:
+        latitude, longitude = float(rec['latitude']), float(rec['longitude'])
+    except (KeyError, TypeError, ValueError):
+        latitude = longitude = None
+    return GeoRecord(rec['city_name'], latitude, longitude)
+
+
+def fetch_location(ip):
+    """
+    Get the city and coordinates for a given IP address using the IP2Location.io API.
+
+    Args:
+        ip (str): The IP address to lookup.
+
+    Returns:
+        GeoRecord: The city name, latitude and longitude (the coordinates are
+        None if missing), or None if the upstream does not know the city.
+
+    Raises:
+        UpstreamError: If the upstream cannot be reached or fails.
+    """
+    params = {"key": settings.GEOLOCATION_API_KEY, "ip": ip, "format": "json"}
+    return _location_record(_json(_get(geolocation_url(), params)))
+
+
+def fetch_weather(city):
+    """
+    Get the current temperature for a given city using the OpenWeatherMap API.
+
+    Args:
+        city (str): The city name to get the weather for.
+
+    Returns:
+        str: The current temperature in Celsius. Returns 'N/A' if the upstream
+        has no weather for the city.
+
+    Raises:
+        UpstreamError: If the upstream cannot be reached or fails.
+    """
+    params = {"q": city, "appid": settings.WEATHER_API_KEY, "units": "metric"}
+    return _temperature(_get(weather_url(), params))
+
+
+def fetch_weather_at(latitude, longitude):
+    """
+    Get the current temperature at a point using the OpenWeatherMap API.
+
+    Args:
+        latitude (float): The latitude in degrees.
+        longitude (float): The longitude in degrees.
+
+    Returns:
+        str: The current temperature in Celsius, or 'N/A' if the upstream has
+        no weather there.
+
+    Raises:
+        UpstreamError: If the upstream cannot be reached or fails.
+    """
+    params = {"lat": round(latitude, 4), "lon": round(longitude, 4), "appid": settings.WEATHER_API_KEY, "units": "metric"}
+    return _temperature(_get(weather_url(), params))
+
+
+def get_async_client():
+    """
+    Return the shared async HTTP client for the running event loop.
+
+    One client is created per event loop, so every in-flight request served
+    by that loop shares a single keep-alive connection pool. The pool is sized
+    by the UPSTREAM_MAX_CONNECTIONS and UPSTREAM_MAX_KEEPALIVE settings.
+
+    Returns:
+        httpx.AsyncClient: The pooled client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _async_clients_lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                import httpx
+
+                limits = httpx.Limits(
+                    max_connections=getattr(settings, 'UPSTREAM_MAX_CONNECTIONS', 200),
+                    max_keepalive_connections=getattr(settings, 'UPSTREAM_MAX_KEEPALIVE', 50),
+                )
+                client = httpx.AsyncClient(limits=limits, timeout=upstream_timeout())
+                _async_clients[loop] = client
+    return client
+
+
+async def afetch_location(ip):
+    """
+    Get the city and coordinates for a given IP address using the IP2Location.io API.
+
+    Args:
+        ip (str): The IP address to lookup.
+
+    Returns:
+        GeoRecord: The city name, latitude and longitude, or None if the
+        upstream does not know the city.
+
+    Raises:
+        UpstreamError: If the upstream cannot be reached or fails.
+    """
+    params = {"key": settings.GEOLOCATION_API_KEY, "ip": ip, "format": "json"}
+    return _location_record(_json(await _aget(geolocation_url(), params)))
+
+
+async def afetch_weather(city):
+    """
+    Get the current temperature for a given city using the OpenWeatherMap API.
+
+    Args:
+        city (str): The city name to get the weather for.
+
+    Returns:
+        str: The current temperature in Celsius. Returns 'N/A' if the upstream
+        has no weather for the city.
+
+    Raises:
+        UpstreamError: If the upstream cannot be reached or fails.
+    """
+    params = {"q": city, "appid": settings.WEATHER_API_KEY, "units": "metric"}
+    return _temperature(await _aget(weather_url(), params))
+
+
+async def afetch_weather_at(latitude, longitude):
+    """
+    Get the current temperature at a point using the OpenWeatherMap API.
+
+    Args:
+        latitude (float): The latitude in degrees.
+        longitude (float): The longitude in degrees.
+
+    Returns:
+        str: The current temperature in Celsius, or 'N/A' if the upstream has
+        no weather there.
+
+    Raises:
+        UpstreamError: If the upstream cannot be reached or fails.
+    """
+    params = {"lat": round(latitude, 4), "lon": round(longitude, 4), "appid": settings.WEATHER_API_KEY, "units": "metric"}
+    return _temperature(await _aget(weather_url(), params))
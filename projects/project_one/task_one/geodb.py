@@ -0,0 +1,297 @@
+"""
+Offline IP geolocation for the 'task_one' app.
+
+This module resolves IP addresses against a local copy of an IP2Location
+database instead of calling the remote API. The IP2Location CSV is first
+converted into a compact binary file (see `build_database` and the
+'build_geodb' management command). That file is opened through ``mmap`` and
+its columns are read in place as typed arrays, so the database is shared
+through the page cache by every worker process and costs almost nothing to
+open.
+
+File layout (all integers in the byte order recorded in the header):
+- header: magic, byte order, IPv4 range count, IPv6 range count, city count
+  and string table size;
+- IPv4 columns: range start, range end (uint32), city index (uint32),
+  latitude, longitude (float32);
+- IPv6 columns: range start and end split into high/low halves (uint64),
+  city index (uint32), latitude, longitude (float32);
+- city string offsets (uint32) followed by the UTF-8 city names.
+
+Ranges in each family are sorted by start address and resolved by binary
+search.
+
+Available helpers:
+- GeoRecord: The result of a lookup.
+- GeoDatabase: A memory-mapped database.
+- build_database: Converts an IP2Location CSV file into the compact format.
+- get_database: Returns the database configured by GEOLOCATION_DB_PATH.
+- reset_database: Closes that database, so that it is reopened on next use.
+"""
+
+import csv
+import ipaddress
+import logging
+import math
+import mmap
+import socket
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'T1GEODB1'
+HEADER = struct.Struct('<8s8sIIII')
+IPV4_MAX = 2 ** 32 - 1
+IPV4_MAPPED = int(ipaddress.IPv6Address('::ffff:0:0'))
+IPV4_MAPPED_PREFIX = ipaddress.IPv6Address('::ffff:0:0').packed[:12]
+UNKNOWN_CITY = 0
+
+GeoRecord = namedtuple('GeoRecord', ['city', 'latitude', 'longitude'])
+
+_database = None
+_database_failed = False
+_database_lock = threading.Lock()
+
+
+def _typed(code):
+    column = array(code)
+    expected = {'I': 4, 'Q': 8, 'f': 4}[code]
+    if column.itemsize != expected:
+        raise RuntimeError(f"array type '{code}' is not {expected} bytes on this platform")
+    return column
+
+
+def _pad(size):
+    return -size % 8
+
+
+class GeoDatabase:
+    """
+    A read-only, memory-mapped geolocation database.
+
+    Args:
+        path (str): Path to a file produced by `build_database`.
+
+    Attributes:
+        ipv4_ranges (int): Number of IPv4 ranges in the database.
+        ipv6_ranges (int): Number of IPv6 ranges in the database.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, byteorder, n4, n6, ncities, nbytes = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a geolocation database")
+        if byteorder.rstrip(b'\0').decode() != sys.byteorder:
+            raise ValueError(f"{path} was built on a {byteorder.decode()}-endian machine")
+
+        self._offset = HEADER.size + _pad(HEADER.size)
+        self._view = view
+        self.ipv4_ranges = n4
+        self.ipv6_ranges = n6
+
+        self._v4_from = self._column('I', n4)
+        self._v4_to = self._column('I', n4)
+        self._v4_city = self._column('I', n4)
+        self._v4_lat = self._column('f', n4)
+        self._v4_lon = self._column('f', n4)
+        self._v6_from_hi = self._column('Q', n6)
+        self._v6_from_lo = self._column('Q', n6)
+        self._v6_to_hi = self._column('Q', n6)
+        self._v6_to_lo = self._column('Q', n6)
+        self._v6_city = self._column('I', n6)
+        self._v6_lat = self._column('f', n6)
+        self._v6_lon = self._column('f', n6)
+        self._city_offsets = self._column('I', ncities + 1)
+        self._strings = view[self._offset:self._offset + nbytes]
+
+    def _column(self, code, count):
+        size = count * _typed(code).itemsize
+        column = self._view[self._offset:self._offset + size].cast(code)
+        self._offset += size + _pad(size)
+        return column
+
+    def _city(self, index):
+        if index == UNKNOWN_CITY:
+            return None
+        start, end = self._city_offsets[index], self._city_offsets[index + 1]
+        return str(self._strings[start:end], 'utf-8')
+
+    @staticmethod
+    def _coordinate(value):
+        return None if math.isnan(value) else round(value, 4)
+
+    def lookup(self, ip):
+        """
+        Resolve an IP address to its city and coordinates.
+
+        Args:
+            ip (str): The IPv4 or IPv6 address to lookup.
+
+        Returns:
+            GeoRecord: The matching record, or None if the address is invalid
+            or not covered by the database.
+        """
+        ip = ip.strip()
+        try:
+            packed = socket.inet_pton(socket.AF_INET, ip)
+        except OSError:
+            try:
+                packed = socket.inet_pton(socket.AF_INET6, ip)
+            except OSError:
+                return None
+            if packed[:12] == IPV4_MAPPED_PREFIX:
+                packed = packed[12:]
+
+        if len(packed) == 4:
+            value = int.from_bytes(packed, 'big')
+            i = bisect_right(self._v4_from, value) - 1
+            if i < 0 or value > self._v4_to[i]:
+                return None
+            return GeoRecord(self._city(self._v4_city[i]),
+                             self._coordinate(self._v4_lat[i]),
+                             self._coordinate(self._v4_lon[i]))
+
+        hi, lo = int.from_bytes(packed[:8], 'big'), int.from_bytes(packed[8:], 'big')
+        i = self._search_v6(hi, lo)
+        if i < 0 or (hi, lo) > (self._v6_to_hi[i], self._v6_to_lo[i]):
+            return None
+        return GeoRecord(self._city(self._v6_city[i]),
+                         self._coordinate(self._v6_lat[i]),
+                         self._coordinate(self._v6_lon[i]))
+
+    def _search_v6(self, hi, lo):
+        # Index of the last range starting at or before (hi, lo), or -1.
+        from_hi, from_lo = self._v6_from_hi, self._v6_from_lo
+        low, high = 0, self.ipv6_ranges
+        while low < high:
+            mid = (low + high) // 2
+            mid_hi = from_hi[mid]
+            if hi < mid_hi or (hi == mid_hi and lo < from_lo[mid]):
+                high = mid
+            else:
+                low = mid + 1
+        return low - 1
+
+    def close(self):
+        """Release the memory map."""
+        for name in [attr for attr in vars(self) if isinstance(getattr(self, attr), memoryview)]:
+            getattr(self, name).release()
+        self._mmap.close()
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def build_database(source, path):
+    """
+    Convert an IP2Location CSV database into the compact memory-mappable format.
+
+    Both the IPv4 (DB3, DB5, ...) and the IPv6 editions are supported. The
+    first two columns must be the numeric range bounds and the sixth column
+    the city name; latitude and longitude are read from the seventh and
+    eighth columns when present. IPv4-mapped IPv6 ranges are stored as IPv4.
+
+    Args:
+        source (str): Path to the IP2Location CSV file.
+        path (str): Path of the database file to write.
+
+    Returns:
+        tuple: The number of IPv4 and IPv6 ranges written.
+    """
+    cities = {None: UNKNOWN_CITY}
+    v4, v6 = [], []
+
+    with open(source, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 6 or not row[0].isdigit():
+                continue
+            start, end = int(row[0]), int(row[1])
+            name = row[5] if row[5] not in ('', '-') else None
+            city = cities.setdefault(name, len(cities))
+            lat = _parse_float(row[6]) if len(row) > 7 else math.nan
+            lon = _parse_float(row[7]) if len(row) > 7 else math.nan
+
+            if end <= IPV4_MAX:
+                v4.append((start, end, city, lat, lon))
+            elif start >> 32 == IPV4_MAPPED >> 32 and end >> 32 == IPV4_MAPPED >> 32:
+                v4.append((start & IPV4_MAX, end & IPV4_MAX, city, lat, lon))
+            else:
+                v6.append((start, end, city, lat, lon))
+
+    v4.sort()
+    v6.sort()
+
+    columns = [_typed('I') for _ in range(3)] + [_typed('f') for _ in range(2)]
+    for start, end, city, lat, lon in v4:
+        for column, value in zip(columns, (start, end, city, lat, lon)):
+            column.append(value)
+
+    v6_columns = [_typed('Q') for _ in range(4)] + [_typed('I')] + [_typed('f') for _ in range(2)]
+    for start, end, city, lat, lon in v6:
+        values = (start >> 64, start & 0xFFFFFFFFFFFFFFFF, end >> 64, end & 0xFFFFFFFFFFFFFFFF, city, lat, lon)
+        for column, value in zip(v6_columns, values):
+            column.append(value)
+
+    names = sorted(cities, key=cities.get)
+    offsets, blob = _typed('I'), bytearray()
+    for name in names:
+        offsets.append(len(blob))
+        blob += (name or '').encode('utf-8')
+    offsets.append(len(blob))
+
+    with open(path, 'wb') as f:
+        header = HEADER.pack(MAGIC, sys.byteorder.encode(), len(v4), len(v6), len(names), len(blob))
+        f.write(header + b'\0' * _pad(len(header)))
+        for column in columns + v6_columns + [offsets]:
+            data = column.tobytes()
+            f.write(data + b'\0' * _pad(len(data)))
+        f.write(bytes(blob))
+
+    return len(v4), len(v6)
+
+
+def get_database():
+    """
+    Return the process-wide database opened from GEOLOCATION_DB_PATH.
+
+    If the file is missing or unreadable the error is logged once, and None
+    is returned until `reset_database` is called.
+
+    Returns:
+        GeoDatabase: The database, opened on first use, or None.
+    """
+    global _database, _database_failed
+    if _database is None and not _database_failed:
+        with _database_lock:
+            if _database is None and not _database_failed:
+                try:
+                    _database = GeoDatabase(settings.GEOLOCATION_DB_PATH)
+                except (OSError, ValueError):
+                    logger.error("Could not open the geolocation database at %s",
+                                 settings.GEOLOCATION_DB_PATH, exc_info=True)
+                    _database_failed = True
+    return _database
+
+
+def reset_database():
+    """Close the process-wide database, so that it is reopened on next use."""
+    global _database, _database_failed
+    with _database_lock:
+        if _database is not None:
+            _database.close()
+        _database, _database_failed = None, False
@@ -0,0 +1,82 @@
+"""
+Geohash encoding for the 'task_one' app.
+
+A geohash names a rectangular cell of the latitude/longitude grid; each extra
+character splits the cell 32 ways (precision 5 is a cell of about 4.9 km by
+4.9 km). Weather lookups are keyed by the cell a visitor falls in, so every
+visitor in the same area shares one cached entry and one upstream call.
+
+Available helpers:
+- encode: Returns the geohash of the cell containing a point.
+- decode: Returns the centre of the cell named by a geohash.
+"""
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {char: index for index, char in enumerate(BASE32)}
+
+
+def encode(latitude, longitude, precision=5):
+    """
+    Return the geohash of the cell containing a point.
+
+    Args:
+        latitude (float): The latitude in degrees.
+        longitude (float): The longitude in degrees.
+        precision (int): The number of characters in the geohash.
+
+    Returns:
+        str: The geohash.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit = 0
+    index = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            index = index * 2 + 1
+            interval[0] = mid
+        else:
+            index = index * 2
+            interval[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[index])
+            bit = index = 0
+    return ''.join(chars)
+
+
+def decode(geohash):
+    """
+    Return the centre of the cell named by a geohash.
+
+    Args:
+        geohash (str): The geohash.
+
+    Returns:
+        tuple: ``(latitude, longitude)`` of the cell centre, in degrees.
+
+    Raises:
+        ValueError: If ``geohash`` contains a character outside the alphabet.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        try:
+            index = _DECODE[char]
+        except KeyError:
+            raise ValueError(f"Invalid geohash: {geohash!r}") from None
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if index >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
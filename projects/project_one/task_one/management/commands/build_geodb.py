@@ -0,0 +1,32 @@
+"""
+Management command to build the offline geolocation database.
+
+Usage:
+    python manage.py build_geodb IP2LOCATION-LITE-DB5.CSV [--output geodb.bin]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from task_one.geodb import GeoDatabase, build_database
+
+
+class Command(BaseCommand):
+    help = "Convert an IP2Location CSV database into the memory-mapped format used by GEOLOCATION_BACKEND='local'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Path to the IP2Location CSV file (IPv4 or IPv6 edition).')
+        parser.add_argument('--output', default=None,
+                            help='Database file to write. Defaults to GEOLOCATION_DB_PATH.')
+
+    def handle(self, *args, **options):
+        output = options['output'] or settings.GEOLOCATION_DB_PATH
+        try:
+            ipv4, ipv6 = build_database(options['source'], output)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        GeoDatabase(output).close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {ipv4} IPv4 and {ipv6} IPv6 ranges to {output}"
+        ))
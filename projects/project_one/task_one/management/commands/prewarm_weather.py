@@ -0,0 +1,120 @@
+"""
+Management command to pre-warm the weather cache for the most requested cities.
+
+The weather is loaded into this process's cache, and so into the shared store
+when LOOKUP_CACHE_L2_BACKEND is set, where every serving process finds it.
+The ranking is saved to WEATHER_TOP_CITIES_PATH, for the next run and for
+serving processes started with WEATHER_PREWARM_ON_START.
+
+Usage:
+    python manage.py prewarm_weather [--top 500] [--cities-file cities.json] [--loop]
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from task_one import geohash, views
+from task_one.refresh import RefreshAhead, prewarm
+from task_one.stores import get_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the weather for the most requested cities into the weather cache. "
+        "Cities are read from the snapshot at WEATHER_TOP_CITIES_PATH or from --cities-file, "
+        "and the ranking is saved back to the snapshot. "
+        "With --loop, keep refreshing them ahead of expiry."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='Number of cities to warm. Defaults to WEATHER_TOP_CITIES.')
+        parser.add_argument('--cities-file', default=None,
+                            help='JSON list of city names, or of [city, count] pairs, to warm instead.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of concurrent upstream calls.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and refresh the cities before they turn stale.')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Seconds between refresh passes. Defaults to WEATHER_REFRESH_INTERVAL.')
+
+    @staticmethod
+    def parse_cities(path, cities):
+        """Return ``(name, count)`` pairs from a --cities-file, the count being None when not given."""
+        if not isinstance(cities, list):
+            raise CommandError(f"{path} must contain a JSON list")
+        parsed = []
+        for city in cities:
+            if isinstance(city, list) and len(city) == 2 and isinstance(city[1], int):
+                name, hits = city
+            else:
+                name, hits = city, None
+            if not isinstance(name, str) or not name.strip():
+                raise CommandError(f"Invalid city in {path}: {city!r}")
+            if name.startswith(views.GRID_PREFIX):
+                cell = name[len(views.GRID_PREFIX):]
+                try:
+                    if not cell:
+                        raise ValueError(f"Invalid geohash: {cell!r}")
+                    geohash.decode(cell)
+                except ValueError as e:
+                    raise CommandError(f"Invalid city in {path}: {e}")
+            parsed.append((name, hits))
+        return parsed
+
+    def handle(self, *args, **options):
+        count = options['top'] or settings.WEATHER_TOP_CITIES
+        tracker = views.top_cities()
+        if options['cities_file']:
+            try:
+                with open(options['cities_file']) as f:
+                    cities = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['cities_file']}: {e}")
+            for rank, (name, hits) in enumerate(self.parse_cities(options['cities_file'], cities)):
+                tracker.add(name, hits or len(cities) - rank)
+
+        cache = views.weather_cache()
+        cities = [city for city, _ in tracker.top(count)]
+        start = time.perf_counter()
+        prewarm(cache, cities, options['workers'])
+        stats = cache.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {len(cities)} cities in {time.perf_counter() - start:.1f}s "
+            f"({stats['size']} entries cached)"
+        ))
+        snapshot_path = settings.WEATHER_TOP_CITIES_PATH
+        if snapshot_path:
+            try:
+                tracker.dump(snapshot_path)
+            except OSError as e:
+                raise CommandError(f"Could not save top cities to {snapshot_path}: {e}")
+            self.stdout.write(f"Saved the top cities to {snapshot_path}")
+        if get_store() is None:
+            self.stdout.write(
+                "LOOKUP_CACHE_L2_BACKEND is not set, so the weather is only cached in this process; "
+                "set it for serving processes to read the warmed cities."
+            )
+
+        if not options['loop']:
+            return
+
+        worker = RefreshAhead(
+            cache, tracker, count=count,
+            interval=options['interval'] or settings.WEATHER_REFRESH_INTERVAL,
+            lead=settings.WEATHER_REFRESH_LEAD,
+            snapshot_path=snapshot_path,
+            workers=options['workers'],
+        )
+        self.stdout.write(f"Refreshing the top {count} cities every {worker.interval}s; Ctrl-C to stop.")
+        try:
+            while True:
+                refreshed = worker.run_once()
+                if refreshed:
+                    self.stdout.write(f"Refreshed {refreshed} cities")
+                time.sleep(worker.interval)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,117 @@
+"""
+Weather cache pre-warming and refresh-ahead for the 'task_one' app.
+
+The `hello` view counts requests per city in a `TopCities` tracker. The
+helpers here use that ranking to load the weather for the most requested
+cities before anyone asks for it, and to reload entries shortly before they
+turn stale, so requests for those cities never wait on OpenWeatherMap.
+
+Available helpers:
+- prewarm: Loads the weather for a list of cities.
+- RefreshAhead: Background thread that keeps the top cities fresh.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import normalize_city
+
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm(cache, cities, workers=8):
+    """
+    Load the weather for ``cities`` into ``cache``.
+
+    Args:
+        cache (RevalidatingCache): The weather cache.
+        cities (iterable): City names to load.
+        workers (int): Number of upstream calls made concurrently.
+
+    Returns:
+        int: The number of cities processed.
+    """
+    cities = list(cities)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-prewarm') as pool:
+        list(pool.map(lambda city: cache.refresh(normalize_city(city), city), cities))
+    return len(cities)
+
+
+def due_for_refresh(cache, cities, lead):
+    """
+    Return the cities whose entry is missing or turns stale within ``lead`` seconds.
+
+    Args:
+        cache (RevalidatingCache): The weather cache.
+        cities (iterable): City names to check.
+        lead (float): How many seconds ahead of staleness to refresh.
+
+    Returns:
+        list: The city names that should be reloaded.
+    """
+    due = []
+    for city in cities:
+        remaining = cache.fresh_for(normalize_city(city))
+        if remaining is None or remaining < lead:
+            due.append(city)
+    return due
+
+
+class RefreshAhead(threading.Thread):
+    """
+    Background thread that keeps the weather of the top cities fresh.
+
+    Every ``interval`` seconds it reloads any of the ``count`` most requested
+    cities whose entry is missing or turns stale within ``lead`` seconds, and
+    saves the current ranking to ``snapshot_path`` so a restarted process can
+    warm up the same cities straight away.
+
+    Args:
+        cache (RevalidatingCache): The weather cache.
+        tracker (TopCities): The request frequency tracker.
+        count (int): Number of top cities to keep fresh.
+        interval (float): Seconds between refresh passes.
+        lead (float): Seconds ahead of staleness at which entries are reloaded.
+        snapshot_path (str, optional): File the ranking is saved to.
+        workers (int): Number of upstream calls made concurrently.
+    """
+    def __init__(self, cache, tracker, count=500, interval=30, lead=120, snapshot_path=None, workers=8):
+        super().__init__(name='weather-refresh-ahead', daemon=True)
+        self.cache = cache
+        self.tracker = tracker
+        self.count = count
+        self.interval = interval
+        self.lead = lead
+        self.snapshot_path = snapshot_path
+        self.workers = workers
+        self._stopped = threading.Event()
+
+    def run_once(self):
+        """
+        Run a single refresh pass.
+
+        Returns:
+            int: The number of cities reloaded.
+        """
+        cities = [city for city, _ in self.tracker.top(self.count)]
+        refreshed = prewarm(self.cache, due_for_refresh(self.cache, cities, self.lead), self.workers)
+        if self.snapshot_path:
+            try:
+                self.tracker.dump(self.snapshot_path)
+            except OSError:
+                logger.warning("Could not save top cities to %s", self.snapshot_path, exc_info=True)
+        return refreshed
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Weather refresh-ahead pass failed")
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        """Ask the thread to exit after the current pass."""
+        self._stopped.set()
@@ -0,0 +1,459 @@
+"""
+Latency and failure control for the upstream calls made by the 'task_one' app.
+
+When IP2Location.io or OpenWeatherMap slow down, `hello` should not slow down
+with them. The helpers in this module bound every upstream call by a
+deadline, send a hedged second request when the first one is slower than
+usual, and stop calling an upstream altogether while it is failing.
+
+Only calls that raise (transport errors and 5xx responses, see `clients`)
+count as upstream failures. An answer without data, such as no city for an
+address, is a normal answer, and a call still running when the caller's
+budget expires is left to finish: its outcome then settles the breaker, and
+its result can still be stored by the caller.
+
+Available helpers:
+- Deadline: A per-request latency budget split across stages.
+- CircuitBreaker: Fails fast while an upstream is unhealthy.
+- LatencyWindow: Recent call latencies, used to pick the hedging delay.
+- Upstream: Wraps calls to one upstream with all of the above.
+- UpstreamTimeout: Raised instead of returning the fallback when asked to.
+- get_upstream: Returns the process-wide `Upstream` for a name.
+- upstream_stats: Returns the counters of every upstream.
+- reset_upstreams: Forgets every upstream and its state.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _upstreams_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'UPSTREAM_MAX_KEEPALIVE', 50),
+                    thread_name_prefix='upstream',
+                )
+    return _executor
+
+
+class UpstreamTimeout(Exception):
+    """Raised by `Upstream.call` and `Upstream.acall` with ``raise_timeout=True`` when time runs out."""
+
+
+class Deadline:
+    """
+    A latency budget for one request.
+
+    Args:
+        budget (float): The total budget in seconds.
+    """
+    def __init__(self, budget, timer=time.monotonic):
+        self.budget = budget
+        self._timer = timer
+        self._expires_at = timer() + budget
+
+    def remaining(self):
+        """Return the seconds left in the budget, never below zero."""
+        return max(self._expires_at - self._timer(), 0.0)
+
+    def stage(self, share):
+        """
+        Return the time allotted to a stage using ``share`` of the total budget.
+
+        A stage never gets more than what is left of the budget, so later
+        stages are not starved by an earlier stage finishing late.
+
+        Args:
+            share (float): The fraction of the total budget for this stage.
+
+        Returns:
+            float: The stage timeout in seconds.
+        """
+        return min(self.budget * share, self.remaining())
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker for one upstream.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls are rejected for ``reset_timeout`` seconds. It then lets a single
+    trial call through (half-open): success closes it, failure opens it again.
+
+    Attributes:
+        state (str): 'closed', 'open' or 'half_open'.
+        opened (int): Number of times the breaker opened.
+        rejected (int): Number of calls rejected while open.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30, timer=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.state = CLOSED
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """
+        Return whether a call may be made now.
+
+        Returns:
+            bool: False while the breaker is open, or while a half-open trial
+            call is already in flight.
+        """
+        with self._lock:
+            if self.state == OPEN and self._timer() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Record a successful call, closing the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self):
+        """Record a failed call, opening the breaker if the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = self._timer()
+
+
+class LatencyWindow:
+    """
+    The latencies of the most recent ``size`` successful calls.
+
+    Args:
+        size (int): Number of samples kept.
+    """
+    def __init__(self, size=256):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        """Record the latency of a call."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p, min_samples=20):
+        """
+        Return the ``p``-th percentile of the recorded latencies.
+
+        Returns:
+            float: The percentile in seconds, or None with fewer than
+            ``min_samples`` samples.
+        """
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+class Upstream:
+    """
+    Deadline, hedging and circuit breaking for calls to one upstream.
+
+    Every call is bounded by a timeout. Once the call has taken longer than
+    the ``hedge_percentile``-th percentile of recent calls, a second identical
+    call is started and the first result wins. While the circuit breaker
+    is open, calls are not made at all and ``fallback`` is returned.
+
+    A call fails when it raises; any returned value is a result. Running out
+    of time is not a failure of the upstream, as the caller's budget may be
+    shorter than the upstream's normal latency.
+
+    Args:
+        name (str): The upstream's name, used in stats.
+        fallback: The value returned when a call fails, times out or is rejected.
+        timeout (float): Timeout used when the caller does not pass one.
+        hedge_percentile (float): Latency percentile after which to hedge; 0
+            disables hedging.
+        breaker (CircuitBreaker): The breaker guarding this upstream.
+
+    Attributes:
+        calls (int): Number of calls attempted (not counting hedges).
+        hedges (int): Number of hedged second requests sent.
+        hedge_wins (int): Number of calls answered by the hedged request.
+        timeouts (int): Number of calls that ran out of time.
+        late_results (int): Number of timed out calls that later returned a result.
+        failures (int): Number of calls that raised.
+    """
+    def __init__(self, name, fallback, timeout=3.0, hedge_percentile=95, breaker=None):
+        self.name = name
+        self.fallback = fallback
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.late_results = 0
+        self.failures = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _hedge_after(self, timeout):
+        if not self.hedge_percentile:
+            return None
+        delay = self.latency.percentile(self.hedge_percentile)
+        if delay is None or delay >= timeout:
+            return None
+        return delay
+
+    def _succeeded(self, result, started, hedged_won):
+        self.latency.add(time.monotonic() - started)
+        if hedged_won:
+            self._count('hedge_wins')
+        self.breaker.record_success()
+        return result
+
+    def _failed(self):
+        self._count('failures')
+        self.breaker.record_failure()
+        return self.fallback
+
+    def _timed_out(self, raise_timeout):
+        self._count('timeouts')
+        if raise_timeout:
+            raise UpstreamTimeout(self.name)
+        return self.fallback
+
+    def _settle_late(self, pending, started, on_late_result):
+        # The caller has stopped waiting, but the calls in flight still tell
+        # whether the upstream is healthy; the first result also goes to
+        # on_late_result, so it is not wasted.
+        remaining, lock = set(pending), threading.Lock()
+
+        def done(future):
+            with lock:
+                if future not in remaining:
+                    return
+                remaining.discard(future)
+                failed = future.cancelled() or future.exception() is not None
+                if failed and remaining:
+                    return
+                others = list(remaining)
+                remaining.clear()
+            for other in others:
+                other.cancel()
+            if failed:
+                self._failed()
+                return
+            self._count('late_results')
+            result = self._succeeded(future.result(), started, False)
+            if on_late_result is not None:
+                on_late_result(result)
+
+        for future in pending:
+            future.add_done_callback(done)
+
+    def call(self, fn, *args, timeout=None, raise_timeout=False, on_late_result=None):
+        """
+        Call ``fn(*args)`` within ``timeout`` seconds, hedging and failing fast.
+
+        Args:
+            fn (callable): The upstream call.
+            *args: Arguments passed to ``fn``.
+            timeout (float, optional): The time allowed. Defaults to ``self.timeout``.
+            raise_timeout (bool): Raise `UpstreamTimeout` instead of returning
+                ``fallback`` when time runs out, so callers can tell a request
+                that ran out of budget from an upstream failure.
+            on_late_result (callable, optional): Called with the result of a
+                call that completes after time ran out, e.g. to cache it.
+
+        Returns:
+            The result of ``fn``, or ``fallback``.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0:
+            return self._timed_out(raise_timeout)
+        if not self.breaker.allow():
+            return self.fallback
+        self._count('calls')
+
+        started = time.monotonic()
+        expires_at = started + timeout
+        executor = _get_executor()
+        first = executor.submit(fn, *args)
+        futures = [first]
+
+        hedge_after = self._hedge_after(timeout)
+        if hedge_after is not None:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                self._count('hedges')
+                futures.append(executor.submit(fn, *args))
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(expires_at - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                # Calls still queued behind a busy executor are dropped, so a
+                # slow upstream does not build up a backlog of abandoned work;
+                # only the running ones are left to finish.
+                running = {future for future in pending if not future.cancel()}
+                if running:
+                    self._settle_late(running, started, on_late_result)
+                return self._timed_out(raise_timeout)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return self._succeeded(future.result(), started, future is not first)
+        return self._failed()
+
+    async def acall(self, fn, *args, timeout=None, raise_timeout=False, on_late_result=None):
+        """
+        Async version of `call` for coroutine functions.
+
+        Args:
+            fn (callable): The upstream coroutine function.
+            *args: Arguments passed to ``fn``.
+            timeout (float, optional): The time allowed. Defaults to ``self.timeout``.
+            raise_timeout (bool): Raise `UpstreamTimeout` instead of returning
+                ``fallback`` when time runs out.
+            on_late_result (callable, optional): Called with the result of a
+                call that completes after time ran out.
+
+        Returns:
+            The result of ``fn``, or ``fallback``.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0:
+            return self._timed_out(raise_timeout)
+        if not self.breaker.allow():
+            return self.fallback
+        self._count('calls')
+
+        started = time.monotonic()
+        expires_at = started + timeout
+        first = asyncio.ensure_future(fn(*args))
+        tasks = [first]
+        late = set()
+        try:
+            hedge_after = self._hedge_after(timeout)
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self._count('hedges')
+                    tasks.append(asyncio.ensure_future(fn(*args)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(expires_at - time.monotonic(), 0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._settle_late(pending, started, on_late_result)
+                    late = pending
+                    return self._timed_out(raise_timeout)
+                for task in done:
+                    if task.exception() is None:
+                        return self._succeeded(task.result(), started, task is not first)
+            return self._failed()
+        finally:
+            # Calls left running after a timeout are settled by _settle_late.
+            for task in tasks:
+                if task not in late:
+                    task.cancel()
+
+    def stats(self):
+        """
+        Return the counters of this upstream and its circuit breaker.
+
+        Returns:
+            dict: Call, hedge, timeout and failure counters, breaker state and
+            the current hedging delay in milliseconds.
+        """
+        hedge_after = self.latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+                "timeouts": self.timeouts,
+                "late_results": self.late_results,
+                "failures": self.failures,
+                "breaker_state": self.breaker.state,
+                "breaker_opened": self.breaker.opened,
+                "breaker_rejected": self.breaker.rejected,
+                "hedge_after_ms": None if hedge_after is None else round(hedge_after * 1000, 1),
+            }
+
+
+def get_upstream(name):
+    """
+    Return the process-wide `Upstream` for 'geolocation' or 'weather'.
+
+    Upstreams are configured from the UPSTREAM_* settings on first use.
+
+    Args:
+        name (str): The upstream name.
+
+    Returns:
+        Upstream: The upstream guard.
+    """
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        with _upstreams_lock:
+            upstream = _upstreams.get(name)
+            if upstream is None:
+                upstream = Upstream(
+                    name, None if name == 'geolocation' else "N/A",
+                    timeout=getattr(settings, 'UPSTREAM_CONNECT_TIMEOUT', 1.0) + getattr(settings, 'UPSTREAM_READ_TIMEOUT', 2.0),
+                    hedge_percentile=getattr(settings, 'UPSTREAM_HEDGE_PERCENTILE', 95),
+                    breaker=CircuitBreaker(
+                        failure_threshold=getattr(settings, 'UPSTREAM_BREAKER_FAILURES', 5),
+                        reset_timeout=getattr(settings, 'UPSTREAM_BREAKER_RESET', 30),
+                    ),
+                )
+                _upstreams[name] = upstream
+    return upstream
+
+
+def upstream_stats():
+    """Return the counters of every upstream created so far, keyed by name."""
+    return {name: upstream.stats() for name, upstream in list(_upstreams.items())}
+
+
+def reset_upstreams():
+    """Forget every upstream, with its counters and breaker state."""
+    with _upstreams_lock:
+        _upstreams.clear()
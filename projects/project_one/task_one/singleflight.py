@@ -0,0 +1,131 @@
+"""
+Request coalescing for the 'task_one' app.
+
+When many requests miss the cache for the same key at once, only one of them
+should call the upstream API. The helpers in this module let concurrent
+callers share a single in-flight call and its result (or exception).
+
+Available helpers:
+- SingleFlight: Coalesces calls made from concurrent threads (WSGI).
+- AsyncSingleFlight: Coalesces coroutine calls on an event loop (ASGI).
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key across threads.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result or exception.
+
+    Attributes:
+        calls (int): Number of calls that actually ran the function.
+        coalesced (int): Number of calls that shared another caller's result.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        """
+        Run ``fn(*args)`` unless a call for ``key`` is already in flight.
+
+        Args:
+            key: Identifies calls that may share a result.
+            fn (callable): The function to run.
+            *args: Arguments passed to ``fn``.
+
+        Returns:
+            The result of the shared call.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Return the call and coalesced counters."""
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent coroutine calls for the same key on an event loop.
+
+    The shared call runs as its own task, so cancelling one waiting request
+    does not cancel the upstream call the other requests are waiting on.
+
+    Attributes:
+        calls (int): Number of calls that actually ran the coroutine.
+        coalesced (int): Number of calls that shared another caller's result.
+    """
+    def __init__(self):
+        self._tasks = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args):
+        """
+        Await ``fn(*args)`` unless a call for ``key`` is already in flight.
+
+        Args:
+            key: Identifies calls that may share a result.
+            fn (callable): The coroutine function to run.
+            *args: Arguments passed to ``fn``.
+
+        Returns:
+            The result of the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        task = self._tasks.get(flight)
+        if task is None:
+            task = self._tasks[flight] = loop.create_task(fn(*args))
+            task.add_done_callback(lambda _: self._tasks.pop(flight, None))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """Return the call and coalesced counters."""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._tasks)}
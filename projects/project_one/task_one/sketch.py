@@ -0,0 +1,125 @@
+"""
+Request frequency tracking for the 'task_one' app.
+
+The `hello` view records the city of every visitor here so the weather cache
+can be kept warm for the most-requested cities. Counts are kept in a
+count-min sketch, which uses a fixed amount of memory however many distinct
+cities are seen, and a bounded set of heavy-hitter candidates is kept
+alongside it so the top cities can be listed.
+
+Available helpers:
+- CountMinSketch: Approximate frequency counts in fixed memory.
+- TopCities: Tracks the most frequently requested cities.
+"""
+
+import json
+import os
+import threading
+from array import array
+from hashlib import blake2b
+
+from .cache import normalize_city
+
+
+class CountMinSketch:
+    """
+    A count-min sketch of ``depth`` rows with ``width`` counters each.
+
+    Estimates never undercount; they overcount by at most ``2 * total / width``
+    with probability ``1 - 0.5 ** depth``.
+    """
+    def __init__(self, width=4096, depth=4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+
+    def _indexes(self, key):
+        digest = blake2b(key.encode('utf-8'), digest_size=4 * self.depth).digest()
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width
+
+    def add(self, key, count=1):
+        """
+        Add ``count`` occurrences of ``key``.
+
+        Returns:
+            int: The new estimated count for ``key``.
+        """
+        estimate = None
+        for row, index in self._indexes(key):
+            value = self._rows[row][index] + count
+            self._rows[row][index] = value
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key):
+        """Return the estimated count for ``key``."""
+        return min(self._rows[row][index] for row, index in self._indexes(key))
+
+
+class TopCities:
+    """
+    Track the most frequently requested cities.
+
+    Each city is counted in a `CountMinSketch`, and up to ``2 * capacity``
+    candidates with the highest estimates are remembered so that `top` can
+    list them. The set is pruned back to ``capacity`` when it overflows.
+
+    Args:
+        capacity (int): The number of top cities to track.
+    """
+    def __init__(self, capacity=500, width=4096, depth=4):
+        self.capacity = capacity
+        self._sketch = CountMinSketch(width, depth)
+        self._candidates = {}
+        self._lock = threading.Lock()
+
+    def add(self, city, count=1):
+        """Record ``count`` requests for ``city``."""
+        key = normalize_city(city)
+        with self._lock:
+            estimate = self._sketch.add(key, count)
+            self._candidates[key] = (city, estimate)
+            if len(self._candidates) > 2 * self.capacity:
+                ranked = sorted(self._candidates.items(), key=lambda item: item[1][1], reverse=True)
+                self._candidates = dict(ranked[:self.capacity])
+
+    def top(self, n=None):
+        """
+        Return the most requested cities, most frequent first.
+
+        Args:
+            n (int, optional): The number of cities to return. Defaults to
+                ``capacity``.
+
+        Returns:
+            list: ``(city, estimated_count)`` tuples.
+        """
+        with self._lock:
+            ranked = sorted(self._candidates.values(), key=lambda item: item[1], reverse=True)
+        return ranked[:n or self.capacity]
+
+    def dump(self, path):
+        """Write the current top cities to ``path`` as JSON, atomically."""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump([[city, count] for city, count in self.top()], f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """
+        Seed the tracker with top cities previously written by `dump`.
+
+        Missing or unreadable files are ignored.
+
+        Returns:
+            int: The number of cities loaded.
+        """
+        try:
+            with open(path) as f:
+                cities = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        for city, count in cities:
+            self.add(city, int(count))
+        return len(cities)
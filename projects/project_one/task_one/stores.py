@@ -0,0 +1,324 @@
+"""
+Shared second-tier stores for the 'task_one' lookup caches.
+
+The in-process caches in `cache` are lost whenever a process exits and are
+not shared between processes, so every new serverless instance starts cold.
+A shared store sits behind them as a second tier: values written by one
+process can be read by every other process using the same store.
+
+Stores keep each value with two lifetimes: how long it stays fresh and when
+it expires. They are given and returned as seconds from now, and kept
+internally as wall-clock times so that every process agrees on them.
+
+Available helpers:
+- SharedStore: The interface every second-tier store implements.
+- SQLiteStore: A store in a local SQLite database (WAL mode, batched writes,
+  periodic expiry sweep), shared by the processes on one host or volume.
+- DjangoCacheStore: A store in a Django cache backend, e.g. Redis or Memcached.
+- get_store: Returns the process-wide store selected by the settings.
+"""
+
+import abc
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+_store = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+class SharedStore(abc.ABC):
+    """
+    Interface of a second-tier store shared between processes.
+
+    Values must be JSON-serialisable.
+    """
+    @abc.abstractmethod
+    def get(self, key):
+        """
+        Return the live entry stored for ``key``.
+
+        Returns:
+            tuple: ``(value, fresh_for, expires_in)`` in seconds from now, or
+            None if there is no live entry.
+        """
+
+    @abc.abstractmethod
+    def set(self, key, value, fresh_for, expires_in):
+        """
+        Store ``value`` under ``key``.
+
+        Args:
+            key (str): The key.
+            value: The value to store.
+            fresh_for (float): Seconds the value stays fresh.
+            expires_in (float): Seconds until the value expires.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove ``key`` if present."""
+
+    def stats(self):
+        """Return a snapshot of the store's counters."""
+        return {}
+
+    def close(self):
+        """Write out anything pending and release resources."""
+
+
+class SQLiteStore(SharedStore):
+    """
+    A `SharedStore` backed by a SQLite database in WAL mode.
+
+    Reads go straight to the database, so readers never block each other or
+    the writer; a read that fails, e.g. on a locked or damaged database, is
+    logged and answered as a miss. Writes are queued and committed by a background thread in
+    batches, every ``flush_interval`` seconds or as soon as ``batch_size``
+    writes are pending; until then they are answered from the queue. The same
+    thread deletes expired rows every ``sweep_interval`` seconds.
+
+    Args:
+        path (str): The database file.
+        flush_interval (float): Seconds between batched writes.
+        batch_size (int): Pending writes that trigger an early flush.
+        sweep_interval (float): Seconds between expiry sweeps.
+
+    Attributes:
+        writes (int): Number of values written to the database.
+        flushes (int): Number of batches committed.
+        swept (int): Number of expired rows deleted.
+    """
+    def __init__(self, path, flush_interval=0.05, batch_size=100, sweep_interval=300, timer=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self._timer = timer
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._writer = None
+        self._last_sweep = timer()
+        self.writes = 0
+        self.flushes = 0
+        self.swept = 0
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS lookup_cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'fresh_until REAL NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS lookup_cache_expires_at ON lookup_cache (expires_at)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = self._timer()
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            value, fresh_until, expires_at = pending
+        else:
+            try:
+                row = self._connection().execute(
+                    'SELECT value, fresh_until, expires_at FROM lookup_cache WHERE key = ?', (key,)
+                ).fetchone()
+            except sqlite3.DatabaseError:
+                logger.warning("Could not read from the lookup cache at %s", self.path, exc_info=True)
+                return None
+            if row is None:
+                return None
+            value, fresh_until, expires_at = json.loads(row[0]), row[1], row[2]
+        if expires_at <= now:
+            return None
+        return value, fresh_until - now, expires_at - now
+
+    def set(self, key, value, fresh_for, expires_in):
+        now = self._timer()
+        with self._lock:
+            self._pending[key] = (value, now + fresh_for, now + expires_in)
+            full = len(self._pending) >= self.batch_size
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='lookup-cache-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+        if full:
+            self._wake.set()
+
+    def delete(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+        try:
+            self._connection().execute('DELETE FROM lookup_cache WHERE key = ?', (key,))
+        except sqlite3.DatabaseError:
+            logger.warning("Could not delete from the lookup cache at %s", self.path, exc_info=True)
+
+    def flush(self):
+        """
+        Commit every pending write in one transaction.
+
+        Returns:
+            int: The number of values written.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        rows = [(key, json.dumps(value), fresh_until, expires_at)
+                for key, (value, fresh_until, expires_at) in batch.items()]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO lookup_cache (key, value, fresh_until, expires_at) VALUES (?, ?, ?, ?)', rows)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        with self._lock:
+            self.writes += len(rows)
+            self.flushes += 1
+        return len(rows)
+
+    def sweep(self):
+        """
+        Delete every expired row.
+
+        Returns:
+            int: The number of rows deleted.
+        """
+        now = self._timer()
+        deleted = self._connection().execute('DELETE FROM lookup_cache WHERE expires_at <= ?', (now,)).rowcount
+        with self._lock:
+            self.swept += deleted
+        self._last_sweep = now
+        return deleted
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self._timer() - self._last_sweep >= self.sweep_interval:
+                    self.sweep()
+            except sqlite3.Error:
+                logger.warning("Could not write to the lookup cache at %s", self.path, exc_info=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "writes": self.writes,
+                "flushes": self.flushes,
+                "swept": self.swept,
+                "pending": len(self._pending),
+            }
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except sqlite3.Error:
+            logger.warning("Could not write to the lookup cache at %s", self.path, exc_info=True)
+
+
+class DjangoCacheStore(SharedStore):
+    """
+    A `SharedStore` backed by a Django cache, e.g. Redis or Memcached.
+
+    Args:
+        alias (str): The name of the cache in the CACHES setting.
+    """
+    def __init__(self, alias='default', timer=time.time):
+        from django.core.cache import caches
+
+        self.alias = alias
+        self._cache = caches[alias]
+        self._timer = timer
+
+    @staticmethod
+    def _key(key):
+        # Memcached rejects keys containing spaces or control characters.
+        return 'task_one:' + quote(key, safe=':/')
+
+    def get(self, key):
+        entry = self._cache.get(self._key(key))
+        if entry is None:
+            return None
+        value, fresh_until, expires_at = entry
+        now = self._timer()
+        if expires_at <= now:
+            return None
+        return value, fresh_until - now, expires_at - now
+
+    def set(self, key, value, fresh_for, expires_in):
+        now = self._timer()
+        self._cache.set(self._key(key), (value, now + fresh_for, now + expires_in), timeout=max(expires_in, 1))
+
+    def delete(self, key):
+        self._cache.delete(self._key(key))
+
+    def stats(self):
+        return {"backend": "django", "alias": self.alias}
+
+
+def get_store():
+    """
+    Return the process-wide second-tier store, creating it on first use.
+
+    The store is selected by LOOKUP_CACHE_L2_BACKEND: 'sqlite' for a
+    `SQLiteStore` at LOOKUP_CACHE_L2_PATH, 'django' for a `DjangoCacheStore`
+    on the LOOKUP_CACHE_L2_ALIAS cache, or empty for none. If the SQLite
+    database cannot be opened the error is logged once, and the caches run
+    without a second tier.
+
+    Returns:
+        SharedStore: The store, or None when no second tier is configured or
+        it cannot be opened.
+    """
+    global _store, _store_failed
+    backend = getattr(settings, 'LOOKUP_CACHE_L2_BACKEND', '')
+    if not backend:
+        return None
+    if _store is None and not _store_failed:
+        with _store_lock:
+            if _store is None and not _store_failed:
+                if backend == 'sqlite':
+                    try:
+                        _store = SQLiteStore(
+                            settings.LOOKUP_CACHE_L2_PATH,
+                            flush_interval=getattr(settings, 'LOOKUP_CACHE_L2_FLUSH_MS', 50) / 1000,
+                            batch_size=getattr(settings, 'LOOKUP_CACHE_L2_BATCH_SIZE', 100),
+                            sweep_interval=getattr(settings, 'LOOKUP_CACHE_L2_SWEEP_INTERVAL', 300),
+                        )
+                    except sqlite3.Error:
+                        logger.error("Could not open the lookup cache at %s", settings.LOOKUP_CACHE_L2_PATH,
+                                     exc_info=True)
+                        _store_failed = True
+                elif backend == 'django':
+                    _store = DjangoCacheStore(getattr(settings, 'LOOKUP_CACHE_L2_ALIAS', 'default'))
+                else:
+                    raise ValueError(f"Unknown LOOKUP_CACHE_L2_BACKEND: {backend}")
+    return _store
@@ -1,3 +1,864 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import clients, views
+from .cache import TTLCache, RevalidatingCache, TieredCache, ip_cache_key, normalize_city
+from .geodb import GeoDatabase, GeoRecord, build_database, reset_database
+from .refresh import RefreshAhead
+from .resilience import CircuitBreaker, Deadline, Upstream, reset_upstreams, upstream_stats
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .sketch import TopCities
+from .stores import SharedStore, SQLiteStore
+from . import geohash, stores, timing
+
+
+ACCRA = GeoRecord('Accra', 5.556, -0.1969)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_expired_entries_are_misses(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=4, ttl=10, timer=clock)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 11
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class RevalidatingCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.results = []
+        self.calls = []
+
+    def make_cache(self):
+        def loader(city):
+            self.calls.append(city)
+            return self.results.pop(0)
+        return RevalidatingCache(
+            loader, ttl=10, stale_ttl=100, negative_ttl=5,
+            is_failure=lambda value: value == "N/A",
+            executor=InlineExecutor(), timer=self.clock,
+        )
+
+    def test_stale_entry_is_served_then_refreshed(self):
+        cache = self.make_cache()
+        self.results = [20, 25]
+        self.assertEqual(cache.get('accra'), 20)
+        self.clock.now = 11
+        self.assertEqual(cache.get('accra'), 20)
+        self.assertEqual(cache.get('accra'), 25)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(cache.stats()['stale_hits'], 1)
+
+    def test_failures_use_negative_ttl(self):
+        cache = self.make_cache()
+        self.results = ["N/A", 20]
+        self.assertEqual(cache.get('accra'), "N/A")
+        self.assertEqual(cache.get('accra'), "N/A")
+        self.clock.now = 6
+        self.assertEqual(cache.get('accra'), 20)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failed_refresh_keeps_previous_value(self):
+        cache = self.make_cache()
+        self.results = [20, "N/A"]
+        cache.get('accra')
+        self.clock.now = 11
+        self.assertEqual(cache.get('accra'), 20)
+        self.assertEqual(cache.get('accra'), 20)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(cache.stats()['refresh_failures'], 1)
+
+    def test_normalize_city(self):
+        self.assertEqual(normalize_city('  New   York '), normalize_city('new york'))
+
+
+class IPCacheKeyTests(SimpleTestCase):
+    def test_full_address_by_default(self):
+        self.assertEqual(ip_cache_key('203.0.113.7'), '203.0.113.7')
+
+    def test_groups_by_prefix(self):
+        self.assertEqual(ip_cache_key('203.0.113.7', True), '203.0.113.0/24')
+        self.assertEqual(ip_cache_key('2001:db8:1:2::1', True), '2001:db8:1::/48')
+
+    def test_invalid_address_is_passed_through(self):
+        self.assertEqual(ip_cache_key(' unknown ', True), 'unknown')
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.clock = FakeClock()
+        self.store = SQLiteStore(os.path.join(directory.name, 'l2.sqlite3'), timer=self.clock)
+        self.addCleanup(self.store.close)
+
+    def test_second_process_reads_through_the_store(self):
+        first = TieredCache(ttl=10, store=self.store, namespace='geo:', timer=self.clock)
+        second = TieredCache(ttl=10, store=self.store, namespace='geo:', timer=self.clock)
+        first.set('203.0.113.7', 'Accra')
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(second.get('203.0.113.7'), 'Accra')
+        self.assertEqual(second.get('203.0.113.7'), 'Accra')
+        stats = second.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['l2_hits']), (1, 1, 1))
+        self.assertEqual(stats['l1_hit_rate'], 0.5)
+
+    def test_expired_rows_are_misses_and_swept(self):
+        cache = TieredCache(ttl=10, store=self.store, timer=self.clock)
+        cache.set('a', 1)
+        self.store.flush()
+        self.clock.now = 11
+        self.assertIsNone(TieredCache(store=self.store, timer=self.clock).get('a'))
+        self.assertEqual(self.store.sweep(), 1)
+
+    def test_revalidating_cache_keeps_freshness_from_the_store(self):
+        make = lambda loader: RevalidatingCache(
+            loader, ttl=10, stale_ttl=100, store=self.store, namespace='weather:',
+            executor=InlineExecutor(), timer=self.clock)
+        make(lambda city: 20).get('accra')
+        self.clock.now = 11
+        refreshed = []
+        cache = make(lambda city: refreshed.append(city) or 25)
+        self.assertEqual(cache.get('accra'), 20)
+        self.assertEqual(refreshed, ['accra'])
+        self.assertEqual(cache.stats()['l2_hits'], 1)
+
+    def test_unreadable_store_degrades_to_a_miss(self):
+        cache = TieredCache(ttl=10, store=self.store, timer=self.clock)
+        cache.set('a', 1)
+        self.store.flush()
+        self.store._connection().execute('DROP TABLE lookup_cache')
+        with self.assertLogs('task_one.stores', 'WARNING'):
+            self.assertIsNone(TieredCache(store=self.store, timer=self.clock).get('a'))
+        with self.assertLogs('task_one.stores', 'WARNING'):
+            self.store.delete('a')
+
+    def test_store_that_is_not_a_database_is_skipped(self):
+        path = os.path.join(os.path.dirname(self.store.path), 'garbage.sqlite3')
+        with open(path, 'wb') as f:
+            f.write(b'not a database' * 512)
+        with mock.patch.object(stores, '_store', None), mock.patch.object(stores, '_store_failed', False), \
+                override_settings(LOOKUP_CACHE_L2_BACKEND='sqlite', LOOKUP_CACHE_L2_PATH=path):
+            with self.assertLogs('task_one.stores', 'ERROR'):
+                self.assertIsNone(stores.get_store())
+            with self.assertNoLogs('task_one.stores'):
+                self.assertIsNone(stores.get_store())
+
+        # A file damaged after the store was opened reads as a miss.
+        cache = TieredCache(ttl=10, store=self.store, timer=self.clock)
+        cache.set('a', 1)
+        self.store.flush()
+        self.store.close()
+        self.store._connection().close()
+        del self.store._local.conn
+        with open(self.store.path, 'wb') as f:
+            f.write(b'not a database' * 512)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(self.store.path + suffix):
+                os.remove(self.store.path + suffix)
+        with self.assertLogs('task_one.stores', 'WARNING'):
+            self.assertIsNone(TieredCache(store=self.store, timer=self.clock).get('a'))
+        with self.assertLogs('task_one.stores', 'WARNING'):
+            self.store.delete('a')
+
+    def test_stores_must_implement_the_interface(self):
+        class Partial(SharedStore):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            Partial()
+
+
+@override_settings(GEOLOCATION_CACHE_GROUP_BY_PREFIX=True)
+class GetLocationCacheTests(SimpleTestCase):
+    def setUp(self):
+        reset_upstreams()
+        views.location_cache().clear()
+
+    @mock.patch('task_one.views.fetch_location', return_value=ACCRA)
+    def test_same_network_shares_one_lookup(self, fetch_location):
+        self.assertEqual(views.get_location('203.0.113.7'), 'Accra')
+        self.assertEqual(views.get_location('203.0.113.99'), 'Accra')
+        self.assertEqual(fetch_location.call_count, 1)
+
+    @mock.patch('task_one.views.fetch_location', return_value=None)
+    def test_failures_are_not_cached(self, fetch_location):
+        self.assertEqual(views.get_location('203.0.113.7'), 'Unknown Location')
+        self.assertEqual(views.get_location('203.0.113.7'), 'Unknown Location')
+        self.assertEqual(fetch_location.call_count, 2)
+
+
+@override_settings(HELLO_LATENCY_BUDGET_MS=300, HELLO_GEO_BUDGET_SHARE=0.4)
+class SlowUpstreamTests(SimpleTestCase):
+    def setUp(self):
+        reset_upstreams()
+        views.location_cache().clear()
+        views.weather_cache().clear()
+
+    @mock.patch('task_one.views.fetch_weather_at', return_value=21)
+    def test_slower_than_budget_fills_the_cache(self, weather):
+        def fetch_location(ip):
+            time.sleep(0.15)
+            return ACCRA
+
+        request = RequestFactory().get('/api/hello', REMOTE_ADDR='203.0.113.7')
+        with mock.patch('task_one.views.fetch_location', side_effect=fetch_location) as fetch:
+            first = json.loads(views.hello(request).content)
+            time.sleep(0.1)
+            cities = [json.loads(views.hello(request).content)['location'] for _ in range(9)]
+        self.assertEqual(first['location'], 'Unknown Location')
+        self.assertEqual(cities, ['Accra'] * 9)
+        self.assertEqual(fetch.call_count, 1)
+        stats = upstream_stats()['geolocation']
+        self.assertEqual((stats['breaker_state'], stats['breaker_rejected'], stats['failures']), ('closed', 0, 0))
+
+    @mock.patch('task_one.views.fetch_weather', return_value="N/A")
+    @mock.patch('task_one.views.fetch_location', return_value=None)
+    def test_unknown_addresses_and_cities_do_not_open_the_breakers(self, location, weather):
+        for index in range(10):
+            request = RequestFactory().get('/api/hello', HTTP_X_FORWARDED_FOR=f'junk-{index}')
+            self.assertEqual(json.loads(views.hello(request).content)['location'], 'Unknown Location')
+        self.assertEqual(location.call_count, 10)
+        weather.reset_mock()
+        for index in range(10):
+            self.assertEqual(views.get_weather(f'Atlantis {index}'), "N/A")
+        self.assertEqual(weather.call_count, 10)
+        for stats in upstream_stats().values():
+            self.assertEqual((stats['breaker_state'], stats['failures']), ('closed', 0))
+
+
+class ClientErrorTests(SimpleTestCase):
+    def respond(self, status, body):
+        response = mock.Mock(status_code=status)
+        response.json.return_value = body
+        return mock.patch('task_one.clients.get_session', return_value=mock.Mock(get=mock.Mock(return_value=response)))
+
+    def test_server_errors_raise(self):
+        with self.respond(503, {}), self.assertRaises(clients.UpstreamError):
+            clients.fetch_location('203.0.113.7')
+        with self.respond(500, {}), self.assertRaises(clients.UpstreamError):
+            clients.fetch_weather('Accra')
+
+    def test_answers_without_data_do_not_raise(self):
+        with self.respond(200, {"city_name": '-'}):
+            self.assertEqual(clients.fetch_location('junk').city, '-')
+        with self.respond(400, {"error": {"error_message": 'Invalid IP address.'}}):
+            self.assertIsNone(clients.fetch_location('junk'))
+        with self.respond(404, {"cod": '404', "message": 'city not found'}):
+            self.assertEqual(clients.fetch_weather('Atlantis'), "N/A")
+
+    def test_transport_errors_raise(self):
+        import requests
+
+        session = mock.Mock(get=mock.Mock(side_effect=requests.ConnectionError('refused')))
+        with mock.patch('task_one.clients.get_session', return_value=session), \
+                self.assertRaises(clients.UpstreamError):
+            clients.fetch_weather('Accra')
+
+
+class WeatherGridTests(SimpleTestCase):
+    def setUp(self):
+        reset_upstreams()
+        views.location_cache().clear()
+        views.weather_cache().clear()
+
+    def test_geohash_round_trip(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        latitude, longitude = geohash.decode('u4pruydqqvj')
+        self.assertAlmostEqual(latitude, 57.64911, places=4)
+        self.assertAlmostEqual(longitude, 10.40744, places=4)
+
+    @mock.patch('task_one.views.fetch_weather_at', return_value=21)
+    def test_visitors_in_one_cell_share_an_entry(self, fetch):
+        queries = [views.weather_query(city, GeoRecord(city, 5.5561, -0.1969 + delta))
+                   for city, delta in (('Accra', 0), ('ACCRA', 0.001), ('Akra', 0.002))]
+        self.assertEqual(len(set(queries)), 1)
+        for query in queries:
+            self.assertEqual(views.get_weather(query), 21)
+        latitude, longitude = fetch.call_args.args
+        self.assertAlmostEqual(latitude, 5.56, places=1)
+        self.assertEqual(fetch.call_count, 1)
+
+    @override_settings(WEATHER_GRID_PRECISION=0)
+    def test_falls_back_to_city(self):
+        self.assertEqual(views.weather_query('Accra', ACCRA), 'Accra')
+        self.assertEqual(views.weather_query('Accra', GeoRecord('Accra', None, None)), 'Accra')
+
+
+class HelloAsyncTests(SimpleTestCase):
+    def setUp(self):
+        reset_upstreams()
+        views.location_cache().clear()
+        views.weather_cache().clear()
+
+    @mock.patch('task_one.views.afetch_weather_at', new_callable=mock.AsyncMock, return_value=21)
+    @mock.patch('task_one.views.afetch_location', new_callable=mock.AsyncMock, return_value=ACCRA)
+    async def test_greeting_uses_async_lookups(self, location, weather):
+        request = RequestFactory().get('/api/hello', {'visitor_name': 'Ama'}, REMOTE_ADDR='203.0.113.7')
+        response = await views.hello_async(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {
+            "client_ip": '203.0.113.7',
+            "location": 'Accra',
+            "greeting": "Hello, Ama!, the weather is 21 degree Celsius in Accra.",
+        })
+        await views.hello_async(request)
+        self.assertEqual(location.await_count, 1)
+        self.assertEqual(weather.await_count, 1)
+
+    def test_asgi_profile_enables_the_async_view_without_touching_the_environment(self):
+        from stage_one import asgi, settings_asgi
+
+        self.assertTrue(settings_asgi.HELLO_ASYNC)
+        self.assertIsNotNone(asgi.application)
+        self.assertNotIn('HELLO_ASYNC', os.environ)
+
+    async def test_rejects_other_methods(self):
+        response = await views.hello_async(RequestFactory().post('/api/hello'))
+        self.assertEqual(response.status_code, 405)
+
+    @mock.patch('task_one.views.afetch_weather_at', new_callable=mock.AsyncMock, return_value=21)
+    @mock.patch('task_one.views.afetch_location', new_callable=mock.AsyncMock, return_value=ACCRA)
+    async def test_micro_application_serves_the_same_contract(self, location, weather):
+        from stage_one.micro import application
+
+        async def call(method, path, query=b''):
+            scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+                     'headers': [(b'x-forwarded-for', b'203.0.113.7, 10.0.0.1')], 'client': ('10.0.0.1', 0)}
+            sent = []
+            await application(scope, None, mock.AsyncMock(side_effect=sent.append))
+            return sent[0]['status'], json.loads(sent[1]['body'])
+
+        status, body = await call('GET', '/api/hello', b'visitor_name=Ama')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {
+            "client_ip": '203.0.113.7',
+            "location": 'Accra',
+            "greeting": "Hello, Ama!, the weather is 21 degree Celsius in Accra.",
+        })
+        self.assertEqual((await call('POST', '/api/hello'))[0], 405)
+        self.assertEqual((await call('GET', '/api/other'))[0], 404)
+
+    async def test_micro_application_refuses_other_scope_types(self):
+        from stage_one.micro import application
+
+        sent = []
+        receive = mock.AsyncMock(return_value={'type': 'websocket.connect'})
+        await application({'type': 'websocket', 'path': '/api/hello'}, receive, mock.AsyncMock(side_effect=sent.append))
+        self.assertEqual(sent, [{'type': 'websocket.close'}])
+        with self.assertRaises(ValueError):
+            await application({'type': 'other'}, receive, mock.AsyncMock())
+
+
+class HelloBatchTests(SimpleTestCase):
+    def setUp(self):
+        reset_upstreams()
+        views.location_cache().clear()
+        views.weather_cache().clear()
+
+    def post(self, body):
+        request = RequestFactory().post('/api/hello/batch', json.dumps(body), content_type='application/json')
+        return views.hello_batch(request)
+
+    @mock.patch('task_one.views.fetch_weather_at', return_value=21)
+    @mock.patch('task_one.views.fetch_weather', return_value=18)
+    @mock.patch('task_one.views.fetch_location')
+    def test_streams_in_input_order_with_one_lookup_per_location(self, location, weather, weather_at):
+        records = {
+            '203.0.113.7': ACCRA,
+            '198.51.100.1': GeoRecord('Accra', 5.5561, -0.1968),
+            '192.0.2.1': GeoRecord('Kumasi', None, None),
+        }
+        location.side_effect = lambda ip: time.sleep(0.05 if ip == '203.0.113.7' else 0) or records[ip]
+        response = self.post([
+            {"ip": '203.0.113.7', "visitor_name": 'Ama'},
+            {"ip": '192.0.2.1'},
+            {"name": 'no ip'},
+            {"ip": '198.51.100.1', "visitor_name": 'Kofi'},
+            {"ip": '203.0.113.7', "visitor_name": 'Esi'},
+        ])
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line.get('client_ip') for line in lines],
+                         ['203.0.113.7', '192.0.2.1', None, '198.51.100.1', '203.0.113.7'])
+        self.assertEqual(lines[1]['greeting'], "Hello, Guest!, the weather is 18 degree Celsius in Kumasi.")
+        self.assertIn('error', lines[2])
+        self.assertEqual(lines[4]['greeting'], "Hello, Esi!, the weather is 21 degree Celsius in Accra.")
+        self.assertEqual(location.call_count, 3)
+        self.assertEqual(weather_at.call_count, 1)
+        self.assertEqual(weather.call_count, 1)
+
+    @mock.patch('task_one.views.fetch_weather', return_value=18)
+    @mock.patch('task_one.views.fetch_location')
+    def test_closed_response_starts_no_more_lookups(self, location, weather):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        records = {'203.0.113.7': GeoRecord('Accra', None, None), '192.0.2.1': GeoRecord('Kumasi', None, None)}
+        location.side_effect = lambda ip: (ip == '203.0.113.7' or release.wait(5)) and records[ip]
+        response = self.post([{"ip": '203.0.113.7'}, {"ip": '192.0.2.1'}])
+        self.assertIs(views.batch_pool(), views.batch_pool())
+        lines = iter(response.streaming_content)
+        self.assertEqual(json.loads(next(lines))['location'], 'Accra')
+        response.close()
+        with self.assertNoLogs('concurrent.futures'):
+            release.set()
+            time.sleep(0.1)
+        weather.assert_called_once_with('Accra')
+
+    def test_rejects_invalid_bodies(self):
+        self.assertEqual(self.post({"ip": '203.0.113.7'}).status_code, 400)
+        with override_settings(HELLO_BATCH_MAX_ITEMS=1):
+            self.assertEqual(self.post([{"ip": '203.0.113.7'}] * 2).status_code, 400)
+        self.assertEqual(views.hello_batch(RequestFactory().get('/api/hello/batch')).status_code, 405)
+
+
+class TimingTests(SimpleTestCase):
+    def setUp(self):
+        reset_upstreams()
+        timing.reset()
+        views.location_cache().clear()
+        views.weather_cache().clear()
+
+    @override_settings(HELLO_TIMING=True)
+    @mock.patch('task_one.views.fetch_weather_at', return_value=21)
+    @mock.patch('task_one.views.fetch_location', return_value=ACCRA)
+    def test_server_timing_header_and_histograms(self, location, weather):
+        request = RequestFactory().get('/api/hello', REMOTE_ADDR='203.0.113.7')
+        response = views.hello(request)
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(stages, ['ip', 'geo-cache', 'geo-upstream', 'geo', 'weather-upstream', 'weather', 'json', 'total'])
+        views.hello(request)
+        self.assertNotIn('geo-upstream', views.hello(request)['Server-Timing'])
+        summary = timing.snapshot()
+        self.assertEqual(summary['total']['count'], 3)
+        self.assertEqual(summary['geo-upstream']['count'], 1)
+        self.assertLessEqual(summary['total']['p50_ms'], 2 * summary['total']['max_ms'])
+
+    @override_settings(HELLO_TIMING=True)
+    @mock.patch('task_one.views.afetch_weather_at', new_callable=mock.AsyncMock, return_value=21)
+    @mock.patch('task_one.views.afetch_location', new_callable=mock.AsyncMock, return_value=ACCRA)
+    async def test_async_view_is_timed(self, location, weather):
+        response = await views.hello_async(RequestFactory().get('/api/hello', REMOTE_ADDR='203.0.113.7'))
+        self.assertIn('weather-upstream;dur=', response['Server-Timing'])
+
+    @mock.patch('task_one.views.fetch_weather_at', return_value=21)
+    @mock.patch('task_one.views.fetch_location', return_value=ACCRA)
+    def test_disabled_by_default(self, location, weather):
+        response = views.hello(RequestFactory().get('/api/hello', REMOTE_ADDR='203.0.113.7'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(timing.snapshot(), {})
+
+
+GEODB_CSV = """\
+"16777216","16777471","AU","Australia","Queensland","Brisbane","-27.46794","153.02809"
+"16777472","16778239","CN","China","Fujian","-","-","-"
+"3405803776","3405804031","GH","Ghana","Greater Accra","Accra","5.55602","-0.1969"
+"42540766411282592856903984951653826560","42540766411282592875350729025363378175","JP","Japan","Tokyo","Tokyo","35.6895","139.69171"
+"""
+
+
+class GeoDatabaseTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = os.path.join(directory.name, 'db.csv')
+        with open(source, 'w') as f:
+            f.write(GEODB_CSV)
+        path = os.path.join(directory.name, 'geodb.bin')
+        self.assertEqual(build_database(source, path), (3, 1))
+        self.path = path
+        self.db = GeoDatabase(path)
+        self.addCleanup(self.db.close)
+
+    def test_ipv4_lookup(self):
+        self.assertEqual(self.db.lookup('203.0.113.42'), GeoRecord('Accra', 5.556, -0.1969))
+        self.assertEqual(self.db.lookup('::ffff:203.0.113.42').city, 'Accra')
+        self.assertEqual(self.db.lookup('1.0.1.1'), GeoRecord(None, None, None))
+
+    def test_ipv6_lookup(self):
+        self.assertEqual(self.db.lookup('2001:db8::1').city, 'Tokyo')
+
+    def test_addresses_outside_ranges(self):
+        self.assertIsNone(self.db.lookup('203.0.114.1'))
+        self.assertIsNone(self.db.lookup('2001:db9::1'))
+        self.assertIsNone(self.db.lookup('not-an-ip'))
+
+    @mock.patch('task_one.views.fetch_location', return_value=ACCRA)
+    def test_local_backend_uses_the_database(self, location):
+        with override_settings(GEOLOCATION_BACKEND='local', GEOLOCATION_DB_PATH=self.path):
+            reset_database()
+            self.addCleanup(reset_database)
+            self.assertEqual(views.get_location('2001:db8::1'), 'Tokyo')
+        location.assert_not_called()
+
+    @mock.patch('task_one.views.fetch_location', return_value=ACCRA)
+    def test_missing_database_falls_back_to_the_remote_api(self, location):
+        reset_upstreams()
+        views.location_cache().clear()
+        missing = os.path.join(os.path.dirname(self.path), 'missing.bin')
+        with override_settings(GEOLOCATION_BACKEND='local', GEOLOCATION_DB_PATH=missing):
+            reset_database()
+            self.addCleanup(reset_database)
+            with self.assertLogs('task_one.geodb', 'ERROR'):
+                self.assertEqual(views.get_location('203.0.113.7'), 'Accra')
+            with self.assertNoLogs('task_one.geodb'):
+                self.assertEqual(views.get_location('203.0.113.7'), 'Accra')
+        self.assertEqual(location.call_count, 1)
+
+
+class SingleFlightTests(SimpleTestCase):
+    callers = 16
+
+    def setUp(self):
+        reset_upstreams()
+        views.location_cache().clear()
+        views.weather_cache().clear()
+
+    def run_concurrently(self, fn, *args):
+        barrier = threading.Barrier(self.callers)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(fn(*args))
+
+        threads = [threading.Thread(target=call) for _ in range(self.callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def slow(self, value):
+        def upstream(*args):
+            time.sleep(0.1)
+            return value
+        return upstream
+
+    def test_concurrent_location_misses_hit_upstream_once(self):
+        with mock.patch('task_one.views.fetch_location', side_effect=self.slow(ACCRA)) as fetch:
+            results = self.run_concurrently(views.get_location, '203.0.113.7')
+        self.assertEqual(results, ['Accra'] * self.callers)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_concurrent_weather_misses_hit_upstream_once(self):
+        loader = mock.Mock(side_effect=self.slow(21))
+        results = self.run_concurrently(RevalidatingCache(loader).get, 'accra')
+        self.assertEqual(results, [21] * self.callers)
+        self.assertEqual(loader.call_count, 1)
+
+    def test_errors_are_shared(self):
+        flights = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('upstream down')
+
+        errors = []
+
+        def call():
+            try:
+                flights.do('key', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(flights.stats()['calls'], 1)
+
+    async def test_concurrent_async_misses_hit_upstream_once(self):
+        async def upstream(*args):
+            await asyncio.sleep(0.05)
+            return 21
+
+        with mock.patch('task_one.views.afetch_weather', side_effect=upstream) as fetch:
+            results = await asyncio.gather(*[views.aget_weather('Accra') for _ in range(self.callers)])
+        self.assertEqual(results, [21] * self.callers)
+        self.assertEqual(fetch.call_count, 1)
+
+    async def test_cancelling_one_caller_does_not_cancel_the_flight(self):
+        flights = AsyncSingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        first = asyncio.ensure_future(flights.do('key', upstream))
+        second = asyncio.ensure_future(flights.do('key', upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, 'done')
+        self.assertEqual(flights.stats()['calls'], 1)
+
+
+class TopCitiesTests(SimpleTestCase):
+    def test_ranks_cities_by_frequency(self):
+        tracker = TopCities(capacity=2)
+        for city, count in (('Accra', 5), ('Kumasi', 3), ('Tamale', 1), ('accra ', 2)):
+            for _ in range(count):
+                tracker.add(city)
+        self.assertEqual([city for city, _ in tracker.top()], ['accra ', 'Kumasi'])
+        self.assertEqual(tracker.top(1)[0][1], 7)
+
+    def test_snapshot_round_trip(self):
+        tracker = TopCities()
+        tracker.add('Accra', 3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'top.json')
+            tracker.dump(path)
+            restored = TopCities()
+            self.assertEqual(restored.load(path), 1)
+        self.assertEqual(restored.top(), [('Accra', 3)])
+
+
+class RefreshAheadTests(SimpleTestCase):
+    def test_refreshes_missing_and_expiring_cities(self):
+        clock = FakeClock()
+        loader = mock.Mock(return_value=20)
+        cache = RevalidatingCache(loader, ttl=600, timer=clock)
+        tracker = TopCities()
+        tracker.add('Accra', 2)
+        tracker.add('Kumasi')
+        worker = RefreshAhead(cache, tracker, lead=120)
+
+        self.assertEqual(worker.run_once(), 2)
+        self.assertEqual(worker.run_once(), 0)
+        clock.now = 500
+        self.assertEqual(worker.run_once(), 2)
+        self.assertEqual(loader.call_count, 4)
+        cache.get('accra')
+        self.assertEqual(cache.stats()['stale_hits'], 0)
+
+
+class PrewarmWeatherTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.snapshot = os.path.join(directory.name, 'top_cities.json')
+        patcher = mock.patch.object(views, '_top_cities', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        overrides = override_settings(WEATHER_TOP_CITIES_PATH=self.snapshot, LOOKUP_CACHE_L2_BACKEND='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_upstreams()
+        views.weather_cache().clear()
+
+    def cities_file(self, cities):
+        path = os.path.join(self.directory, 'cities.json')
+        with open(path, 'w') as f:
+            json.dump(cities, f)
+        return path
+
+    @mock.patch('task_one.views.fetch_weather_at', return_value=30)
+    @mock.patch('task_one.views.fetch_weather', return_value=21)
+    def test_saves_the_ranking_for_serving_processes(self, weather, weather_at):
+        out = io.StringIO()
+        call_command('prewarm_weather', cities_file=self.cities_file([['Accra', 5], 'gh:s00']), stdout=out)
+        self.assertEqual(weather.call_count + weather_at.call_count, 2)
+        self.assertIn('only cached in this process', out.getvalue())
+        with open(self.snapshot) as f:
+            self.assertEqual([city for city, _ in json.load(f)], ['Accra', 'gh:s00'])
+
+        with mock.patch.object(views, '_top_cities', None), \
+                override_settings(WEATHER_PREWARM_ON_START=True, WEATHER_REFRESH_AHEAD=False):
+            views.weather_cache().clear()
+            views.warm_weather().join()
+        self.assertEqual(views.weather_cache().peek('accra'), 21)
+
+    @mock.patch('task_one.views.fetch_weather', return_value=21)
+    def test_rejects_invalid_cities(self, weather):
+        for cities in (['gh:s0a'], ['gh:'], [42], {'Accra': 1}):
+            with self.subTest(cities=cities), self.assertRaises(CommandError):
+                call_command('prewarm_weather', cities_file=self.cities_file(cities), stdout=io.StringIO())
+        weather.assert_not_called()
+        self.assertFalse(os.path.exists(self.snapshot))
+
+    def test_warming_at_startup_is_off_by_default(self):
+        from stage_one import settings_lean
+
+        views.top_cities().add('Accra')
+        with override_settings(WEATHER_REFRESH_AHEAD=False):
+            self.assertIsNone(views.warm_weather())
+        self.assertFalse(settings_lean.WEATHER_PREWARM_ON_START or settings_lean.WEATHER_REFRESH_AHEAD)
+
+    @mock.patch('task_one.management.commands.prewarm_weather.time.sleep', side_effect=KeyboardInterrupt)
+    @mock.patch('task_one.management.commands.prewarm_weather.RefreshAhead')
+    def test_loop_saves_the_ranking(self, refresh_ahead, sleep):
+        refresh_ahead.return_value.run_once.return_value = 0
+        call_command('prewarm_weather', loop=True, interval=1, stdout=io.StringIO())
+        self.assertEqual(refresh_ahead.call_args.kwargs['snapshot_path'], self.snapshot)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_recovers_after_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, timer=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(breaker.opened, 1)
+        self.assertEqual(breaker.rejected, 2)
+
+
+class UpstreamTests(SimpleTestCase):
+    def make_upstream(self, **kwargs):
+        return Upstream('weather', "N/A", **kwargs)
+
+    def test_open_breaker_fails_fast(self):
+        upstream = self.make_upstream(breaker=CircuitBreaker(failure_threshold=1))
+        fetch = mock.Mock(side_effect=clients.UpstreamError('HTTP 503'))
+        self.assertEqual(upstream.call(fetch, 'Accra'), "N/A")
+        self.assertEqual(upstream.call(fetch, 'Accra'), "N/A")
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(upstream.stats()['breaker_state'], 'open')
+
+    def test_slow_call_times_out(self):
+        upstream = self.make_upstream(hedge_percentile=0)
+        started = time.monotonic()
+        self.assertEqual(upstream.call(lambda city: time.sleep(0.5) or 20, 'Accra', timeout=0.05), "N/A")
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(upstream.stats()['timeouts'], 1)
+
+    def test_timed_out_calls_still_queued_are_dropped(self):
+        upstream = self.make_upstream(hedge_percentile=0)
+        executor, release = ThreadPoolExecutor(max_workers=1), threading.Event()
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        executor.submit(release.wait)
+        fetch = mock.Mock(return_value=20)
+        with mock.patch('task_one.resilience._get_executor', return_value=executor):
+            self.assertEqual(upstream.call(fetch, 'Accra', timeout=0.05), "N/A")
+        release.set()
+        executor.shutdown(wait=True)
+        fetch.assert_not_called()
+        self.assertEqual(upstream.stats()['breaker_state'], 'closed')
+
+    def test_slow_call_is_hedged(self):
+        upstream = self.make_upstream(hedge_percentile=50)
+        for _ in range(20):
+            upstream.latency.add(0.01)
+        delays = iter([0.5, 0.0])
+        result = upstream.call(lambda city: time.sleep(next(delays)) or 20, 'Accra', timeout=0.3)
+        self.assertEqual(result, 20)
+        self.assertEqual(upstream.stats()['hedges'], 1)
+        self.assertEqual(upstream.stats()['hedge_wins'], 1)
+
+    async def test_async_slow_call_is_hedged(self):
+        upstream = self.make_upstream(hedge_percentile=50)
+        for _ in range(20):
+            upstream.latency.add(0.01)
+        delays = iter([0.5, 0.0])
+
+        async def fetch(city):
+            await asyncio.sleep(next(delays))
+            return 20
+
+        self.assertEqual(await upstream.acall(fetch, 'Accra', timeout=0.3), 20)
+        self.assertEqual(upstream.stats()['hedge_wins'], 1)
+
+    def test_answers_without_data_are_not_failures(self):
+        upstream = self.make_upstream(breaker=CircuitBreaker(failure_threshold=2))
+        fetch = mock.Mock(return_value="N/A")
+        for _ in range(5):
+            self.assertEqual(upstream.call(fetch, 'Atlantis'), "N/A")
+        self.assertEqual(fetch.call_count, 5)
+        self.assertEqual(upstream.stats()['failures'], 0)
+        self.assertEqual(upstream.stats()['breaker_state'], 'closed')
+
+    def test_running_out_of_budget_is_not_a_failure(self):
+        upstream = self.make_upstream(hedge_percentile=0, breaker=CircuitBreaker(failure_threshold=2))
+        late = []
+        for _ in range(4):
+            result = upstream.call(lambda city: time.sleep(0.1) or 20, 'Accra', timeout=0.02,
+                                   on_late_result=late.append)
+            self.assertEqual(result, "N/A")
+        time.sleep(0.2)
+        self.assertEqual(late, [20] * 4)
+        stats = upstream.stats()
+        self.assertEqual((stats['timeouts'], stats['late_results'], stats['failures']), (4, 4, 0))
+        self.assertEqual((stats['breaker_state'], stats['breaker_rejected']), ('closed', 0))
+
+    def test_late_errors_open_the_breaker(self):
+        upstream = self.make_upstream(hedge_percentile=0, breaker=CircuitBreaker(failure_threshold=1))
+
+        def fetch(city):
+            time.sleep(0.05)
+            raise clients.UpstreamError('HTTP 502')
+
+        self.assertEqual(upstream.call(fetch, 'Accra', timeout=0.01), "N/A")
+        time.sleep(0.1)
+        self.assertEqual(upstream.stats()['breaker_state'], 'open')
+
+    async def test_async_late_result_is_delivered(self):
+        upstream = self.make_upstream(hedge_percentile=0)
+        late = []
+
+        async def fetch(city):
+            await asyncio.sleep(0.05)
+            return 20
+
+        self.assertEqual(await upstream.acall(fetch, 'Accra', timeout=0.01, on_late_result=late.append), "N/A")
+        await asyncio.sleep(0.1)
+        self.assertEqual(late, [20])
+        self.assertEqual(upstream.stats()['breaker_state'], 'closed')
+
+    def test_deadline_stages(self):
+        clock = FakeClock()
+        deadline = Deadline(0.3, timer=clock)
+        self.assertAlmostEqual(deadline.stage(0.4), 0.12)
+        clock.now = 0.25
+        self.assertAlmostEqual(deadline.stage(0.4), 0.05)
+        self.assertAlmostEqual(deadline.remaining(), 0.05)
@@ -0,0 +1,206 @@
+"""
+Per-stage timing for the views of the 'task_one' app.
+
+With the HELLO_TIMING setting enabled, every stage of a request wrapped by
+`timed` (client IP parsing, geolocation, weather, JSON encoding, ...) is
+timed with `time.perf_counter_ns`. The durations are sent back in a
+`Server-Timing` header and aggregated into per-stage histograms, which
+`snapshot` returns and the optional /api/_timings endpoint serves.
+
+When it is disabled, `stage` returns a shared no-op context manager, so
+instrumented code only pays for one context variable lookup per stage.
+
+Available helpers:
+- stage: Context manager timing one stage of the current request.
+- timed: View decorator that collects the stages of each request.
+- Histogram: Log-scale latency histogram for one stage.
+- snapshot: Returns the aggregated histograms of every stage.
+- reset: Clears the aggregated histograms.
+"""
+
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# Bucket upper bounds in milliseconds: 10 us to about 42 s, doubling each time.
+BUCKETS_MS = [0.01 * 2 ** i for i in range(23)]
+
+_current = ContextVar('task_one_timings', default=None)
+_noop = nullcontext()
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class Histogram:
+    """
+    Latency histogram for one stage, with log-scale buckets.
+
+    Percentiles are estimated as the upper bound of the bucket they fall in,
+    so they are accurate to within a factor of two.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def add(self, ms):
+        """Record a duration in milliseconds."""
+        index = bisect.bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            if self.min_ms is None or ms < self.min_ms:
+                self.min_ms = ms
+            if self.max_ms is None or ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, p):
+        """Return the estimated ``p``-th percentile in milliseconds, or None if empty."""
+        with self._lock:
+            rank = self.count * p / 100
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= rank:
+                    return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+        return None
+
+    def summary(self):
+        """
+        Return the histogram as a JSON-serialisable dict.
+
+        Returns:
+            dict: Count, mean, min, max and estimated p50/p95/p99 in
+            milliseconds, and the non-empty ``[upper_bound_ms, count]`` buckets.
+        """
+        percentiles = {f"p{p}_ms": self.percentile(p) for p in (50, 95, 99)}
+        with self._lock:
+            return {
+                "count": self.count,
+                "mean_ms": round(self.total_ms / self.count, 4) if self.count else None,
+                "min_ms": self.min_ms,
+                "max_ms": self.max_ms,
+                **percentiles,
+                "buckets": [[BUCKETS_MS[i] if i < len(BUCKETS_MS) else None, count]
+                            for i, count in enumerate(self.counts) if count],
+            }
+
+
+class _Stage:
+    __slots__ = ('timings', 'name', 'started')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter_ns() - self.started
+        self.timings[self.name] = self.timings.get(self.name, 0) + elapsed
+        return False
+
+
+def stage(name):
+    """
+    Time a stage of the current request.
+
+    Usage::
+
+        with stage('geo'):
+            city = get_location(ip)
+
+    A stage entered several times in one request is reported once, with the
+    durations summed. Outside a `timed` view, or with HELLO_TIMING disabled,
+    nothing is recorded.
+
+    Args:
+        name (str): The stage name, as it will appear in Server-Timing.
+
+    Returns:
+        A context manager.
+    """
+    timings = _current.get()
+    if timings is None:
+        return _noop
+    return _Stage(timings, name)
+
+
+def _record(timings, response, started):
+    timings['total'] = time.perf_counter_ns() - started
+    entries = []
+    for name, ns in timings.items():
+        ms = ns / 1e6
+        _histogram(name).add(ms)
+        entries.append(f"{name};dur={ms:.3f}")
+    response['Server-Timing'] = ', '.join(entries)
+    return response
+
+
+def _histogram(name):
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, Histogram())
+    return histogram
+
+
+def timed(view):
+    """
+    Decorate a view, sync or async, to collect the timings of its stages.
+
+    When HELLO_TIMING is enabled, the response gets a ``Server-Timing`` header
+    listing every stage plus the 'total' time spent in the view, and the
+    durations are added to the aggregated histograms.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'HELLO_TIMING', False):
+                return await view(request, *args, **kwargs)
+            timings = {}
+            token = _current.set(timings)
+            started = time.perf_counter_ns()
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                _current.reset(token)
+            return _record(timings, response, started)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'HELLO_TIMING', False):
+                return view(request, *args, **kwargs)
+            timings = {}
+            token = _current.set(timings)
+            started = time.perf_counter_ns()
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                _current.reset(token)
+            return _record(timings, response, started)
+    return wrapper
+
+
+def snapshot():
+    """Return the summary of every stage histogram, keyed by stage name."""
+    return {name: histogram.summary() for name, histogram in sorted(_histograms.items())}
+
+
+def reset():
+    """Clear every stage histogram."""
+    with _histograms_lock:
+        _histograms.clear()
@@ -5,13 +5,25 @@ This module defines the URL patterns for the 'task_one' app, routing requests
 to the appropriate view functions defined in the 'views' module.
 
 Available routes:
-- 'hello': Routes requests to the 'hello' view function.
+- 'hello': Routes requests to the 'hello' view function, or to 'hello_async'
+  when the HELLO_ASYNC setting is enabled (the default in
+  stage_one.settings_asgi).
+- 'hello/batch': Routes requests to the 'hello_batch' view function.
+- '_timings': Routes requests to the 'timings' view function, only when the
+  HELLO_TIMING_ENDPOINT setting is enabled.
 """
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
 
+hello_view = views.hello_async if getattr(settings, 'HELLO_ASYNC', False) else views.hello
+
 urlpatterns = [
-	path('hello', views.hello, name="hello")
-]
\ No newline at end of file
+	path('hello', hello_view, name="hello"),
+	path('hello/batch', views.hello_batch, name="hello_batch"),
+]
+
+if getattr(settings, 'HELLO_TIMING_ENDPOINT', False):
+	urlpatterns.append(path('_timings', views.timings, name="timings"))
\ No newline at end of file
@@ -1,11 +1,43 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings 
-import ip2locationio
-import requests
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .cache import RevalidatingCache, TieredCache, ip_cache_key, normalize_city
+from . import geohash
+from .clients import (
+        afetch_location, afetch_weather, afetch_weather_at, fetch_location, fetch_weather, fetch_weather_at,
+        get_async_client, get_session,
+)
+from .geodb import GeoRecord, get_database
+from .refresh import RefreshAhead, prewarm
+from .resilience import Deadline, UpstreamTimeout, get_upstream
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .sketch import TopCities
+from .stores import get_store
+from .timing import reset as reset_timings, snapshot, stage, timed
+
+
+_location_cache = None
+_weather_cache = None
+_top_cities = None
+_refresh_ahead = None
+_batch_pool = None
+_cache_lock = threading.Lock()
+
+# Weather queries for a geohash cell start with this prefix; see `weather_query`.
+GRID_PREFIX = 'gh:'
+
+# Concurrent cache misses for the same key share one upstream call.
+_location_flights = SingleFlight()
+_alocation_flights = AsyncSingleFlight()
+_aweather_flights = AsyncSingleFlight()
 
 
 @csrf_exempt
+@timed
 def hello(request):
         """
         Handle a GET request to provide a personalized greeting and weather information.
@@ -22,19 +54,24 @@ def hello(request):
 
         If the request method is not GET, returns a JSON response indicating only GET 
         requests are allowed with status 405.
+
+        With HELLO_TIMING enabled, the time spent in each stage is reported in a
+        Server-Timing header (see `timing`).
         """
         if request.method == "GET":
                 name = request.GET.get('visitor_name', 'Guest')
-                
-                x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                        client_ip = x_forwarded_for.split(',')[0]
-                else:
-                        client_ip = request.META.get('REMOTE_ADDR', '')
+                with stage('ip'):
+                        client_ip = get_client_ip(request)
                 
                 # client_city = 'Kasoa'      
-                client_city = get_location(client_ip)
-                temperature = get_weather(client_city)
+                deadline = request_deadline()
+                with stage('geo'):
+                        location = get_location_record(client_ip, timeout=deadline and deadline.stage(geo_budget_share()))
+                client_city = location.city if location else 'Unknown Location'
+                query = weather_query(client_city, location)
+                record_city(query)
+                with stage('weather'):
+                        temperature = get_weather(query, timeout=deadline and deadline.remaining())
                 
                 response_data = {
         		"client_ip": client_ip,
@@ -42,51 +79,648 @@ def hello(request):
         		"greeting": f"Hello, {name}!, the weather is {temperature} degree Celsius in {client_city}."
         	}
                 
-                return JsonResponse(response_data, status=200)
+                with stage('json'):
+                        return JsonResponse(response_data, status=200)
         
         message = {"message": "Only GET requests are allowed"}
         return JsonResponse(message, status=405)
 
 
-def get_location(ip):
+@timed
+async def hello_async(request):
+        """
+        Async version of the `hello` view, served natively under ASGI.
+
+        The geolocation and weather lookups share the caches used by `hello`, and
+        cache misses go through one pooled async HTTP client, so waiting on an
+        upstream does not hold a worker thread.
+
+        Args:
+                request: The HTTP request object.
+
+        Returns:
+                JsonResponse: The same response as `hello`.
+        """
+        if request.method == "GET":
+                name = request.GET.get('visitor_name', 'Guest')
+                with stage('ip'):
+                        client_ip = get_client_ip(request)
+
+                response_data = await agreeting(name, client_ip)
+
+                with stage('json'):
+                        return JsonResponse(response_data, status=200)
+
+        message = {"message": "Only GET requests are allowed"}
+        return JsonResponse(message, status=405)
+
+
+# csrf_exempt wraps views in a sync function, so mark the coroutine directly.
+hello_async.csrf_exempt = True
+
+
+async def agreeting(name, client_ip):
+        """
+        Build the `hello` response body for a visitor, without blocking.
+
+        Shared by `hello_async` and the standalone server in `stage_one.micro`, so
+        both serve the same contract from the same caches and upstream guards.
+
+        Args:
+                name (str): The visitor's name.
+                client_ip (str): The visitor's IP address.
+
+        Returns:
+                dict: The visitor's IP, city and greeting with the current weather.
+        """
+        deadline = request_deadline()
+        with stage('geo'):
+                location = await aget_location_record(client_ip, timeout=deadline and deadline.stage(geo_budget_share()))
+        client_city = location.city if location else 'Unknown Location'
+        query = weather_query(client_city, location)
+        record_city(query)
+        with stage('weather'):
+                temperature = await aget_weather(query, timeout=deadline and deadline.remaining())
+
+        return {
+                "client_ip": client_ip,
+                "location": client_city,
+                "greeting": f"Hello, {name}!, the weather is {temperature} degree Celsius in {client_city}."
+        }
+
+
+@csrf_exempt
+def hello_batch(request):
+        """
+        Handle a POST request greeting many visitors at once.
+
+        The body is a JSON list of objects with an "ip" and an optional
+        "visitor_name". Repeated addresses (or networks, see `get_location_record`)
+        are geolocated once, and the weather is fetched once per distinct location,
+        in a pool of HELLO_BATCH_CONCURRENCY threads shared by every batch request
+        of the process.
+
+        Args:
+                request: The HTTP request object.
+
+        Returns:
+                StreamingHttpResponse: One JSON object per line (NDJSON) in input order,
+                each shaped like the `hello` response, or {"error": ...} for an invalid
+                entry. Invalid bodies get a JSON response with status 400, and other
+                methods a JSON response with status 405.
+        """
+        if request.method != "POST":
+                return JsonResponse({"message": "Only POST requests are allowed"}, status=405)
+
+        try:
+                visitors = json.loads(request.body)
+        except ValueError:
+                return JsonResponse({"message": "Body must be a JSON list"}, status=400)
+        if not isinstance(visitors, list):
+                return JsonResponse({"message": "Body must be a JSON list"}, status=400)
+        max_items = getattr(settings, 'HELLO_BATCH_MAX_ITEMS', 10000)
+        if len(visitors) > max_items:
+                return JsonResponse({"message": f"At most {max_items} visitors per request"}, status=400)
+
+        return StreamingHttpResponse(_batch_greetings(visitors), content_type='application/x-ndjson')
+
+
+def batch_pool():
+        """
+        Return the process-wide pool running the lookups of `hello_batch`.
+
+        Returns:
+                ThreadPoolExecutor: A pool of HELLO_BATCH_CONCURRENCY threads.
+        """
+        global _batch_pool
+        if _batch_pool is None:
+                with _cache_lock:
+                        if _batch_pool is None:
+                                _batch_pool = ThreadPoolExecutor(
+                                        max_workers=getattr(settings, 'HELLO_BATCH_CONCURRENCY', 16),
+                                        thread_name_prefix='batch',
+                                )
+        return _batch_pool
+
+
+def _batch_greetings(visitors):
+        # Geolocation futures are keyed by cache key and weather futures by query,
+        # so each distinct address and location is looked up once. Weather is
+        # requested as soon as a location resolves, while earlier lines stream out.
+        # Lookups never wait on each other, so both stages can share one pool.
+        group_by_prefix = getattr(settings, 'GEOLOCATION_CACHE_GROUP_BY_PREFIX', False)
+        pool = batch_pool()
+        locations, weather, lock = {}, {}, threading.Lock()
+        closed = False
+
+        def location_query(record):
+                city = record.city if record else 'Unknown Location'
+                return city, weather_query(city, record)
+
+        def weather_future(query):
+                with lock:
+                        future = weather.get(query)
+                        if future is None and not closed:
+                                future = weather[query] = pool.submit(get_weather, query)
+                return future
+
+        def located(future):
+                # Locations resolving after the response was closed start no more lookups.
+                if not future.cancelled() and future.exception() is None:
+                        weather_future(location_query(future.result())[1])
+
+        entries = []
+        for visitor in visitors:
+                ip = visitor.get('ip') if isinstance(visitor, dict) else None
+                if not isinstance(ip, str) or not ip.strip():
+                        entries.append(None)
+                        continue
+                key = ip_cache_key(ip, group_by_prefix)
+                if key not in locations:
+                        locations[key] = pool.submit(get_location_record, ip)
+                        locations[key].add_done_callback(located)
+                entries.append((ip.strip(), str(visitor.get('visitor_name') or 'Guest'), locations[key]))
+
+        try:
+                for entry in entries:
+                        if entry is None:
+                                yield json.dumps({"error": "Each visitor needs an \"ip\""}) + '\n'
+                                continue
+                        ip, name, location = entry
+                        city, query = location_query(location.result())
+                        temperature = weather_future(query).result()
+                        yield json.dumps({
+                                "client_ip": ip,
+                                "location": city,
+                                "greeting": f"Hello, {name}!, the weather is {temperature} degree Celsius in {city}."
+                        }) + '\n'
+        finally:
+                # Drop the lookups still queued when the client goes away.
+                with lock:
+                        closed = True
+                        pending = list(locations.values()) + list(weather.values())
+                for future in pending:
+                        future.cancel()
+
+
+def timings(request):
+        """
+        Return the aggregated per-stage timings of the instrumented views.
+
+        Served at /api/_timings when HELLO_TIMING_ENDPOINT is enabled; stages are
+        only recorded while HELLO_TIMING is enabled.
+
+        Args:
+                request: The HTTP request object. With `?reset=1`, the histograms are
+                cleared after being read.
+
+        Returns:
+                JsonResponse: Count, mean, min, max, estimated percentiles and buckets
+                per stage, in milliseconds.
+        """
+        data = snapshot()
+        if request.GET.get('reset') == '1':
+                reset_timings()
+        return JsonResponse(data)
+
+
+def request_deadline():
+        """
+        Start the latency budget for one `hello` request.
+
+        Returns:
+                Deadline: A deadline of HELLO_LATENCY_BUDGET_MS, or None when the
+                budget is disabled (set to 0).
+        """
+        budget_ms = getattr(settings, 'HELLO_LATENCY_BUDGET_MS', 300)
+        return Deadline(budget_ms / 1000) if budget_ms else None
+
+
+def geo_budget_share():
+        """Return the fraction of the latency budget given to geolocation."""
+        return getattr(settings, 'HELLO_GEO_BUDGET_SHARE', 0.4)
+
+
+def get_client_ip(request):
+        """
+        Get the visitor's IP address, honouring the X-Forwarded-For header.
+
+        Args:
+                request: The HTTP request object.
+
+        Returns:
+                str: The client IP address, or an empty string if unknown.
+        """
+        return parse_client_ip(request.META.get('HTTP_X_FORWARDED_FOR'), request.META.get('REMOTE_ADDR', ''))
+
+
+def parse_client_ip(x_forwarded_for, remote_addr):
+        """
+        Get the visitor's IP address from the X-Forwarded-For header or the peer address.
+
+        Args:
+                x_forwarded_for (str): The X-Forwarded-For header, or None.
+                remote_addr (str): The address of the connecting peer.
+
+        Returns:
+                str: The client IP address, or an empty string if unknown.
+        """
+        if x_forwarded_for:
+                return x_forwarded_for.split(',')[0]
+        return remote_addr or ''
+
+
+def top_cities():
+        """
+        Return the process-wide tracker of the most requested cities.
+
+        On first use it is seeded from the snapshot at WEATHER_TOP_CITIES_PATH, so
+        a freshly started process knows which cities to warm up.
+
+        Returns:
+                TopCities: The tracker.
+        """
+        global _top_cities
+        if _top_cities is None:
+                with _cache_lock:
+                        if _top_cities is None:
+                                tracker = TopCities(capacity=getattr(settings, 'WEATHER_TOP_CITIES', 500))
+                                path = getattr(settings, 'WEATHER_TOP_CITIES_PATH', None)
+                                if path:
+                                        tracker.load(path)
+                                _top_cities = tracker
+        return _top_cities
+
+
+def record_city(city):
+        """
+        Count a request for `city` and start the refresh-ahead worker if enabled.
+
+        Args:
+                city (str): The visitor's weather query: a city name, or a grid cell
+                        built by `weather_query`.
+        """
+        if city == 'Unknown Location' or not getattr(settings, 'WEATHER_TRACK_TOP_CITIES', True):
+                return
+        top_cities().add(city)
+        if _refresh_ahead is None and getattr(settings, 'WEATHER_REFRESH_AHEAD', False):
+                start_refresh_ahead()
+
+
+def start_refresh_ahead():
+        """
+        Start the background worker that keeps the top cities' weather fresh.
+
+        The worker is started at most once per process; its first pass warms the
+        cache for the cities loaded from the snapshot.
+
+        Returns:
+                RefreshAhead: The running worker.
+        """
+        global _refresh_ahead
+        cache, tracker = weather_cache(), top_cities()
+        with _cache_lock:
+                if _refresh_ahead is None:
+                        worker = RefreshAhead(
+                                cache,
+                                tracker,
+                                count=getattr(settings, 'WEATHER_TOP_CITIES', 500),
+                                interval=getattr(settings, 'WEATHER_REFRESH_INTERVAL', 30),
+                                lead=getattr(settings, 'WEATHER_REFRESH_LEAD', 120),
+                                snapshot_path=getattr(settings, 'WEATHER_TOP_CITIES_PATH', None),
+                        )
+                        worker.start()
+                        _refresh_ahead = worker
+        return _refresh_ahead
+
+
+def warm_weather():
+        """
+        Warm the weather cache for the top cities when a serving process starts.
+
+        Called by the WSGI and ASGI entry points, so the first requests for the
+        cities in the WEATHER_TOP_CITIES_PATH snapshot do not wait on the upstream.
+        With WEATHER_REFRESH_AHEAD enabled this starts the refresh-ahead worker,
+        whose first pass warms them; otherwise, if WEATHER_PREWARM_ON_START is set,
+        they are loaded once in a background thread.
+
+        Returns:
+                threading.Thread: The thread warming the cache, or None if there is
+                nothing to warm.
+        """
+        if getattr(settings, 'WEATHER_REFRESH_AHEAD', False):
+                return start_refresh_ahead()
+        if not getattr(settings, 'WEATHER_PREWARM_ON_START', False):
+                return None
+        cities = [city for city, _ in top_cities().top(getattr(settings, 'WEATHER_TOP_CITIES', 500))]
+        if not cities:
+                return None
+        thread = threading.Thread(
+                target=prewarm, args=(weather_cache(), cities), name='weather-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+
+def location_cache():
+        """
+        Return the process-wide cache used by `get_location`, creating it on first use.
+
+        The cache is sized and configured from the GEOLOCATION_CACHE_* settings and
+        backed by the shared store configured by LOOKUP_CACHE_L2_*, if any. Its
+        per-tier hit, miss and eviction counters are available through `stats()`.
+
+        Returns:
+                TieredCache: The geolocation cache.
+        """
+        global _location_cache
+        if _location_cache is None:
+                with _cache_lock:
+                        if _location_cache is None:
+                                _location_cache = TieredCache(
+                                        maxsize=getattr(settings, 'GEOLOCATION_CACHE_MAXSIZE', 10000),
+                                        ttl=getattr(settings, 'GEOLOCATION_CACHE_TTL', 3600),
+                                        store=get_store(),
+                                        namespace='geo:',
+                                )
+        return _location_cache
+
+
+def get_location(ip, timeout=None):
         """
         Get the city name for a given IP address using the IP2Location API.
 
         Args:
                 ip (str): The IP address to lookup.
+                timeout (float, optional): Seconds allowed for the upstream call.
 
         Returns:
                 str: The city name associated with the IP address. Returns 'Unknown Location' 
                 if the city cannot be determined or an error occurs.
         """
-        configuration = ip2locationio.Configuration(settings.GEOLOCATION_API_KEY)
-        ipgeolocation = ip2locationio.IPGeolocation(configuration)
-        
-        try:
-                rec = ipgeolocation.lookup(ip)
-                return rec.get('city_name', 'Unknown Location')
-        except Exception as e:
-                return 'Unknown Location'
+        record = get_location_record(ip, timeout)
+        return record.city if record else 'Unknown Location'
+
+
+def get_location_record(ip, timeout=None):
+        """
+        Get the city and coordinates for a given IP address.
+
+        With GEOLOCATION_BACKEND set to 'local', the address is resolved against the
+        memory-mapped database in `geodb` instead, unless that database cannot be
+        opened. Otherwise lookups go through the
+        pooled upstream session in `clients`, and successful lookups are cached
+        in-process, keyed by the address or, when GEOLOCATION_CACHE_GROUP_BY_PREFIX
+        is set, by its /24 (IPv4) or /48 (IPv6) network. Failed lookups are not cached.
+        Concurrent misses for the same key share one upstream call, which is
+        bounded by `timeout` and guarded by the 'geolocation' circuit breaker.
 
+        Args:
+                ip (str): The IP address to lookup.
+                timeout (float, optional): Seconds allowed for the upstream call.
 
-def get_weather(city):
+        Returns:
+                GeoRecord: The city, latitude and longitude (the coordinates may be
+                None), or None if the city cannot be determined or an error occurs.
         """
-        Get the current temperature for a given city using the OpenWeatherMap API.
+        database = _local_database()
+        if database is not None:
+                record = database.lookup(ip)
+                return record if record and record.city else None
+
+        cache = location_cache()
+        key = ip_cache_key(ip, getattr(settings, 'GEOLOCATION_CACHE_GROUP_BY_PREFIX', False))
+        with stage('geo-cache'):
+                record = cache.get(key)
+        if record is not None:
+                return _as_record(record)
+
+        with stage('geo-upstream'):
+                return _as_record(_location_flights.do(key, _load_location, cache, key, ip, timeout))
+
+
+def _local_database():
+        # The remote API stands in for a local database that cannot be opened.
+        if getattr(settings, 'GEOLOCATION_BACKEND', 'remote') == 'local':
+                return get_database()
+        return None
+
+
+def _as_record(record):
+        # The shared store returns records as JSON lists.
+        if record is None or isinstance(record, GeoRecord):
+                return record
+        return GeoRecord(*record)
+
+
+def _load_location(cache, key, ip, timeout):
+        # Another request may have filled the cache while this one waited.
+        record = cache.peek(key)
+        if record is None:
+                # Build the pooled session first, so its one-off cost is not
+                # charged to the upstream call's timeout.
+                get_session()
+                record = get_upstream('geolocation').call(
+                        fetch_location, ip, timeout=timeout, on_late_result=functools.partial(_cache_location, cache, key))
+                _cache_location(cache, key, record)
+        return record
+
+
+def _cache_location(cache, key, record):
+        # Also called with the result of a lookup that outlived its request.
+        if record:
+                cache.set(key, record)
+
+
+async def aget_location(ip, timeout=None):
+        """
+        Async version of `get_location`, sharing its cache.
 
         Args:
-                city (str): The city name to get the weather for.
+                ip (str): The IP address to lookup.
+                timeout (float, optional): Seconds allowed for the upstream call.
+
+        Returns:
+                str: The city name, or 'Unknown Location'.
+        """
+        record = await aget_location_record(ip, timeout)
+        return record.city if record else 'Unknown Location'
+
+
+async def aget_location_record(ip, timeout=None):
+        """
+        Async version of `get_location_record`, sharing its cache. Concurrent misses
+        for the same key share one upstream call.
+
+        Args:
+                ip (str): The IP address to lookup.
+                timeout (float, optional): Seconds allowed for the upstream call.
+
+        Returns:
+                GeoRecord: The city, latitude and longitude, or None.
+        """
+        database = _local_database()
+        if database is not None:
+                record = database.lookup(ip)
+                return record if record and record.city else None
+
+        cache = location_cache()
+        key = ip_cache_key(ip, getattr(settings, 'GEOLOCATION_CACHE_GROUP_BY_PREFIX', False))
+        with stage('geo-cache'):
+                record = cache.get(key)
+        if record is not None:
+                return _as_record(record)
+
+        with stage('geo-upstream'):
+                return _as_record(await _alocation_flights.do(key, _aload_location, cache, key, ip, timeout))
+
+
+async def _aload_location(cache, key, ip, timeout):
+        record = cache.peek(key)
+        if record is None:
+                get_async_client()
+                record = await get_upstream('geolocation').acall(
+                        afetch_location, ip, timeout=timeout, on_late_result=functools.partial(_cache_location, cache, key))
+                _cache_location(cache, key, record)
+        return record
+
+
+
+def weather_cache():
+        """
+        Return the process-wide cache used by `get_weather`, creating it on first use.
+
+        The cache is configured from the WEATHER_CACHE_* settings, backed by the
+        shared store configured by LOOKUP_CACHE_L2_*, if any, and serves stale
+        temperatures while refreshing them in the background.
+
+        Returns:
+                RevalidatingCache: The weather cache.
+        """
+        global _weather_cache
+        if _weather_cache is None:
+                with _cache_lock:
+                        if _weather_cache is None:
+                                _weather_cache = RevalidatingCache(
+                                        _refresh_weather,
+                                        maxsize=getattr(settings, 'WEATHER_CACHE_MAXSIZE', 5000),
+                                        ttl=getattr(settings, 'WEATHER_CACHE_TTL', 600),
+                                        stale_ttl=getattr(settings, 'WEATHER_CACHE_STALE_TTL', 3600),
+                                        negative_ttl=getattr(settings, 'WEATHER_CACHE_NEGATIVE_TTL', 60),
+                                        is_failure=lambda temperature: temperature == "N/A",
+                                        store=get_store(),
+                                        namespace='weather:',
+                                )
+        return _weather_cache
+
+
+def weather_query(city, location=None):
+        """
+        Build the query used to look up and cache the weather for a visitor.
+
+        When the visitor's coordinates are known and WEATHER_GRID_PRECISION is set,
+        the query names the geohash cell they fall in ('gh:' followed by the
+        geohash), so every visitor in that cell shares one weather entry however
+        their city is spelled. Otherwise the query is the city name.
+
+        Args:
+                city (str): The visitor's city.
+                location (GeoRecord, optional): The visitor's geolocation record.
+
+        Returns:
+                str: The weather query.
+        """
+        precision = getattr(settings, 'WEATHER_GRID_PRECISION', 5)
+        if precision and location is not None and location.latitude is not None and location.longitude is not None:
+                return GRID_PREFIX + geohash.encode(location.latitude, location.longitude, precision)
+        return city
+
+
+def _weather_call(query):
+        # Grid cells are looked up at the centre of the cell.
+        if query.startswith(GRID_PREFIX):
+                return fetch_weather_at, geohash.decode(query[len(GRID_PREFIX):])
+        return fetch_weather, (query,)
+
+
+def _aweather_call(query):
+        if query.startswith(GRID_PREFIX):
+                return afetch_weather_at, geohash.decode(query[len(GRID_PREFIX):])
+        return afetch_weather, (query,)
+
+
+def get_weather(city, timeout=None):
+        """
+        Get the current temperature for a city or grid cell, served from the weather cache.
+
+        A cold miss calls OpenWeatherMap within `timeout`, guarded by the 'weather'
+        circuit breaker; background refreshes are not bound by the request's budget.
+        A miss that runs out of time returns 'N/A' without caching it, as it says
+        nothing about the upstream's health; the upstream call carries on, and
+        its result is cached when it arrives.
+
+        Args:
+                city (str): The city name, or a grid cell query built by `weather_query`.
+                timeout (float, optional): Seconds allowed for an upstream call.
 
         Returns:
                 str: The current temperature in Celsius. Returns 'N/A' if the temperature 
                 cannot be determined or an error occurs.
         """
+        cache, key = weather_cache(), normalize_city(city)
+
+        def load(query):
+                fetch, args = _weather_call(query)
+                get_session()
+                with stage('weather-upstream'):
+                        return get_upstream('weather').call(
+                                fetch, *args, timeout=timeout, raise_timeout=True,
+                                on_late_result=functools.partial(cache.store, key))
+
         try:
-                api_key = settings.WEATHER_API_KEY
-                url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-                        
-                response = requests.get(url)
-                weather_data = response.json()
-                temperature = weather_data['main']['temp']
+                return cache.get(key, city, load=load)
+        except UpstreamTimeout:
+                return "N/A"
+
+
+def _refresh_weather(query):
+        fetch, args = _weather_call(query)
+        return get_upstream('weather').call(fetch, *args)
+
+
+async def aget_weather(city, timeout=None):
+        """
+        Async version of `get_weather`, sharing its cache.
+
+        Stale entries are returned immediately and refreshed in the background;
+        only a cold miss waits on the async client, and concurrent misses for the
+        same city share one upstream call.
+
+        Args:
+                city (str): The city name, or a grid cell query built by `weather_query`.
+                timeout (float, optional): Seconds allowed for an upstream call.
+
+        Returns:
+                str: The current temperature in Celsius, or 'N/A'.
+        """
+        cache = weather_cache()
+        key = normalize_city(city)
+        with stage('weather-cache'):
+                found, temperature = cache.lookup(key, city)
+        if found:
+                return temperature
+        with stage('weather-upstream'):
+                return await _aweather_flights.do(key, _aload_weather, cache, key, city, timeout)
+
+
+async def _aload_weather(cache, key, query, timeout):
+        temperature = cache.peek(key)
+        if temperature is not None:
                 return temperature
-        except Exception as e:
+        fetch, args = _aweather_call(query)
+        get_async_client()
+        try:
+                temperature = await get_upstream('weather').acall(
+                        fetch, *args, timeout=timeout, raise_timeout=True, on_late_result=functools.partial(cache.store, key))
+        except UpstreamTimeout:
                 return "N/A"
+        return cache.store(key, temperature)
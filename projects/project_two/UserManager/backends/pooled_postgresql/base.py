@@ -0,0 +1,128 @@
+"""
+PostgreSQL database backend with an in-process connection pool.
+
+Use it as the ENGINE of a database and size the pool in its OPTIONS::
+
+    'ENGINE': 'UserManager.backends.pooled_postgresql',
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {'pool': {'min_size': 2, 'max_size': 10, 'timeout': 5}},
+
+When Django closes a connection, at the end of every request with
+CONN_MAX_AGE = 0, it goes back to the pool instead, with any open
+transaction rolled back, and the next request on any thread reuses it. This
+bounds the connections each process opens to ``max_size``, and a request
+waits up to ``timeout`` seconds for one before failing with
+OperationalError. Connections idle for ``check_after`` seconds (30 by
+default) are checked with ``SELECT 1`` before reuse. Destroying a test
+database closes the pools connected to it first, so that their idle
+connections do not block DROP DATABASE.
+"""
+
+import functools
+import os
+import threading
+
+from django.db.backends.postgresql.base import Database, DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.utils import NO_DB_ALIAS
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from .creation import DatabaseCreation
+from .pool import ConnectionPool, PoolTimeout
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _ping(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return not conn.closed
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    creation_class = DatabaseCreation
+    # The pool the current connection was taken from.
+    connection_pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def _pool(self, conn_params):
+        # Pools are per process, as connections must not be shared across a
+        # fork, and per set of parameters, as creating a test database
+        # changes NAME under the same alias.
+        key = (self.alias, os.getpid(), tuple(sorted((name, str(value)) for name, value in conn_params.items())))
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    options = self.settings_dict['OPTIONS'].get('pool', {})
+                    pool = ConnectionPool(
+                        functools.partial(PostgresDatabaseWrapper.get_new_connection, self, conn_params),
+                        min_size=options.get('min_size', 0),
+                        max_size=options.get('max_size', 10),
+                        timeout=options.get('timeout', 5.0),
+                        check=_ping,
+                        check_after=options.get('check_after', 30.0),
+                    )
+                    pool.fill()
+                    _pools[key] = pool
+        return pool
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Short-lived connections made to create or drop databases.
+            return super().get_new_connection(conn_params)
+        pool = self._pool(conn_params)
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e)) from e
+        self.connection_pool = pool
+        # Set on every checkout, as PostgresDatabaseWrapper.get_new_connection
+        # does when it opens the connection.
+        level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel.READ_COMMITTED if level is None else IsolationLevel(level)
+        return connection
+
+    def _close(self):
+        pool, self.connection_pool = self.connection_pool, None
+        if self.connection is None or pool is None:
+            return super()._close()
+        connection = self.connection
+        if connection.closed:
+            pool.discard(connection)
+            return
+        try:
+            if connection.get_transaction_status() != Database.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Database.Error:
+            pool.discard(connection)
+        else:
+            pool.release(connection)
+
+
+def pool_stats():
+    """Return the counters of every connection pool of this process."""
+    return [{"alias": alias, **pool.stats()} for (alias, pid, _), pool in list(_pools.items()) if pid == os.getpid()]
+
+
+def close_pools(dbname=None):
+    """
+    Close this process's pools, for the database ``dbname`` or for all of them.
+
+    Idle connections are closed at once, and connections in use when they
+    are released; the next connection opens a new pool.
+    """
+    with _pools_lock:
+        for key in list(_pools):
+            _, pid, params = key
+            if pid == os.getpid() and (dbname is None or ('dbname', str(dbname)) in params):
+                _pools.pop(key).close()
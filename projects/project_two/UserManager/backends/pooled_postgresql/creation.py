@@ -0,0 +1,11 @@
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections to the test database would make DROP
+        # DATABASE fail with "is being accessed by other users".
+        from .base import close_pools
+
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool's timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections with a minimum and maximum size.
+
+    Connections are handed out most recently released first, so under light
+    load the same few stay warm. A connection idle for ``check_after``
+    seconds is checked with ``check`` before it is handed out again, and
+    replaced if the check fails.
+
+    Args:
+        connect (callable): Opens a new connection.
+        min_size (int): Connections opened up front by `fill`.
+        max_size (int): The maximum number of open connections.
+        timeout (float): Seconds `acquire` waits for a connection.
+        check (callable): Returns whether a connection is still usable.
+        check_after (float): Idle seconds after which connections are checked.
+
+    Attributes:
+        created (int): Number of connections opened.
+        waits (int): Number of acquires that had to wait.
+        timeouts (int): Number of acquires that timed out.
+    """
+    def __init__(self, connect, min_size=0, max_size=10, timeout=5.0, check=None, check_after=30.0,
+                 timer=time.monotonic):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self._timer = timer
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.created = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def _open(self):
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def acquire(self):
+        """
+        Return a connection, opening one if none is idle and the pool is not full.
+
+        Raises:
+            PoolTimeout: If the pool stays full for ``timeout`` seconds.
+        """
+        deadline = self._timer() + self.timeout
+        while True:
+            with self._cond:
+                waited = False
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - self._timer()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                    if not waited:
+                        self.waits += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    conn = None
+            if conn is None:
+                return self._open()
+            if self.check is None or self._timer() - released_at < self.check_after or self.check(conn):
+                return conn
+            self.discard(conn)
+
+    def release(self, conn):
+        """Return a connection to the pool, or close it if the pool is closed."""
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, self._timer()))
+                self._cond.notify()
+                return
+        self.discard(conn)
+
+    def discard(self, conn):
+        """Close a connection that must not be reused and free its slot."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def fill(self):
+        """Open connections until at least ``min_size`` are open."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self.release(self._open())
+
+    def close(self):
+        """Close every idle connection, and connections in use once they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self.discard(conn)
+
+    def stats(self):
+        """Return a snapshot of the pool's counters."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "created": self.created,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+            }
@@ -67,14 +67,33 @@ WSGI_APPLICATION = 'UserManager.wsgi.application'
 
 
 # Database
+# Connections persist for DB_CONN_MAX_AGE seconds per thread (0, the default,
+# closes them after every request) and are health-checked before reuse. Only
+# raise DB_CONN_MAX_AGE under WSGI: under ASGI, Django advises against
+# persistent connections, which are not reused there and pile up. With DB_POOL,
+# the pooled backend shares DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections
+# between the threads of each process instead. See the README for running
+# behind PgBouncer.
+DB_POOL = os.getenv('DB_POOL', 'False').lower() in ('1', 'true', 'yes')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'UserManager.backends.pooled_postgresql' if DB_POOL else 'django.db.backends.postgresql_psycopg2',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False').lower() in ('1', 'true', 'yes'),
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            },
+        } if DB_POOL else {},
         'TEST': {
             'NAME': 'test_postgres',
             'CHARSET': 'UTF-8',
@@ -110,6 +129,51 @@ REST_FRAMEWORK = {
 }
 
 
+# Authentication user cache: an in-process LRU tier in front of a Django cache.
+# Entries are dropped on save or delete; USER_CACHE_TTL = 0 disables caching.
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+USER_CACHE_ALIAS = os.getenv('USER_CACHE_ALIAS', 'default')
+USER_CACHE_LOCAL_SIZE = int(os.getenv('USER_CACHE_LOCAL_SIZE', 1024))
+USER_CACHE_LOCAL_TTL = float(os.getenv('USER_CACHE_LOCAL_TTL', 5))
+
+# Organisation membership claims in access tokens. When enabled, tokens carry
+# the user's organisation IDs and membership version, and the organisation
+# views authorize from them while the version is current. Users in more than
+# TOKEN_MEMBERSHIP_CLAIMS_MAX organisations get tokens without claims.
+TOKEN_MEMBERSHIP_CLAIMS = os.getenv('TOKEN_MEMBERSHIP_CLAIMS', 'False').lower() in ('1', 'true', 'yes')
+TOKEN_MEMBERSHIP_CLAIMS_MAX = int(os.getenv('TOKEN_MEMBERSHIP_CLAIMS_MAX', 100))
+
+# Organisation membership cache: each organisation's member IDs as a sorted
+# array, in-process and in the USER_CACHE_ALIAS cache, dropped on membership
+# changes. Larger organisations are always checked in the database.
+ORG_MEMBERSHIP_CACHE = os.getenv('ORG_MEMBERSHIP_CACHE', 'False').lower() in ('1', 'true', 'yes')
+ORG_MEMBERSHIP_CACHE_TTL = int(os.getenv('ORG_MEMBERSHIP_CACHE_TTL', 300))
+ORG_MEMBERSHIP_CACHE_MAX_MEMBERS = int(os.getenv('ORG_MEMBERSHIP_CACHE_MAX_MEMBERS', 100000))
+ORG_MEMBERSHIP_CACHE_LOCAL_SIZE = int(os.getenv('ORG_MEMBERSHIP_CACHE_LOCAL_SIZE', 256))
+
+
+# Keyset pagination of list endpoints: default and maximum `limit`.
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 50))
+PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 200))
+
+
+# Bulk writes: rows per INSERT, and user ids accepted by one bulk membership add.
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+BULK_ADD_MAX_USERS = int(os.getenv('BULK_ADD_MAX_USERS', 10000))
+
+
+# Password hashing: processes in the pool that hashes passwords on registration
+# and import, which bounds how much CPU hashing takes from the serving process.
+# 0 hashes inline.
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 0))
+
+
+# Async API views: serve the user and organisation endpoints with the views in
+# users.async_views, which use the async ORM, instead of the DRF ones. Only
+# worth it under an ASGI server (UserManager.asgi).
+USERS_ASYNC_VIEWS = os.getenv('USERS_ASYNC_VIEWS', 'False').lower() in ('1', 'true', 'yes')
+
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 
@@ -0,0 +1,187 @@
+"""
+Benchmark of the DRF views against their async versions under concurrency.
+
+Serves ``--endpoints`` through the ASGI application (UserManager.asgi) with
+``--concurrency`` requests in flight at once, against a throwaway test
+database created from the configured DATABASES, in each mode:
+
+- sync: the DRF views of users.views, each request run in a worker thread;
+- async: USERS_ASYNC_VIEWS, the views of users.async_views and the async ORM.
+
+The endpoints are 'user' (GET /api/users/<id>) and 'organisation'
+(GET /api/organisations/<id>). The user cache is disabled, so every request
+reads the database. Each mode runs in its own process and reports
+throughput, latency percentiles and non-200 responses.
+
+Results are printed as a table and written as JSON to ``--output``.
+
+Usage:
+    DJANGO_SECRET_KEY=... python benchmarks/bench_async.py [--requests 2000] [--concurrency 50]
+        [--modes sync,async] [--endpoints user,organisation] [--output bench_async.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UserManager.settings')
+
+
+MODES = {
+    'sync': {"USERS_ASYNC_VIEWS": 'False'},
+    'async': {"USERS_ASYNC_VIEWS": 'True'},
+}
+
+
+async def asgi_request(application, path, token):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'bench'), (b'authorization', f"Bearer {token}".encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('bench', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    disconnected = asyncio.Event()
+    response = {}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    start = time.perf_counter()
+    await application(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    disconnected.set()
+    return elapsed, response['status']
+
+
+async def run(application, path, token, requests, concurrency):
+    samples = []
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            samples.append(await asgi_request(application, path, token))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def worker(options):
+    """Run one mode and endpoint in this process and print its summary as JSON."""
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from users.models import User, Organisation
+    from users.utils import generate_token
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = User.objects.create_user(email='bench@example.com', username='bench', password=None)
+        organisation = Organisation.objects.create(name='Bench')
+        organisation.users.add(user)
+        path = {
+            'user': f"/api/users/{user.userId}",
+            'organisation': f"/api/organisations/{organisation.orgId}",
+        }[options['endpoint']]
+        token = generate_token(user)
+        connection.close()
+
+        asyncio.run(run(application, path, token, options['concurrency'], options['concurrency']))
+        samples, duration = asyncio.run(
+            run(application, path, token, options['requests'], options['concurrency']))
+    finally:
+        connection.close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+
+    def percentile(p):
+        return round(latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)], 2)
+
+    print(json.dumps({
+        "requests": len(samples),
+        "non_200": sum(status != 200 for _, status in samples),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--endpoints', default='user,organisation')
+    parser.add_argument('--output', default='bench_async.json')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import django
+        django.setup()
+        worker(json.loads(args.worker))
+        return
+
+    results = []
+    for endpoint in args.endpoints.split(','):
+        for mode in args.modes.split(','):
+            env = dict(os.environ, USER_CACHE_TTL='0', **MODES[mode])
+            options = {"endpoint": endpoint, "requests": args.requests, "concurrency": args.concurrency}
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', json.dumps(options)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results.append({"endpoint": endpoint, "mode": mode, **json.loads(output.strip().splitlines()[-1])})
+
+    report = {
+        "benchmark": "async",
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key not in ('worker', 'output')},
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'endpoint':<14}{'mode':<8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'non-200':>9}")
+    for row in results:
+        print(f"{row['endpoint']:<14}{row['mode']:<8}{row['throughput_rps']:>10}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['non_200']:>9}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark of per-request latency with and without database connection reuse.
+
+Drives GET /api/users/<id> through the WSGI handler with ``--concurrency``
+threads, against a throwaway test database created from the configured
+DATABASES (PostgreSQL, possibly behind PgBouncer), in each mode:
+
+- new: DB_CONN_MAX_AGE = 0, a new connection for every request;
+- persistent: DB_CONN_MAX_AGE = 60, one connection per thread, health-checked;
+- pool: DB_POOL, the in-process pool of ``--pool-size`` connections.
+
+The user cache is disabled, so every request authenticates and reads the
+user in the database. Each mode runs in its own process and reports latency
+percentiles, throughput and how many connections were opened.
+
+Results are printed as a table and written as JSON to ``--output``.
+
+Usage:
+    DJANGO_SECRET_KEY=... DB_NAME=... DB_USER=... DB_PASSWORD=... DB_HOST=... DB_PORT=... \\
+        python benchmarks/bench_connections.py [--requests 2000] [--concurrency 8]
+        [--modes new,persistent,pool] [--pool-size 4] [--output bench_connections.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UserManager.settings')
+
+
+MODES = {
+    'new': {"DB_POOL": 'False', "DB_CONN_MAX_AGE": '0'},
+    'persistent': {"DB_POOL": 'False', "DB_CONN_MAX_AGE": '60'},
+    'pool': {"DB_POOL": 'True'},
+}
+
+
+def wsgi_request(application, path, token):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'bench',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'bench',
+        'HTTP_AUTHORIZATION': f"Bearer {token}",
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    start = time.perf_counter()
+    result = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return time.perf_counter() - start, int(status[0].split()[0])
+
+
+def worker(options):
+    """Run one mode in this process and print its summary as JSON."""
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from users.models import User
+    from users.utils import generate_token
+
+    opened = []
+    connection_created.connect(lambda sender, connection, **kwargs: opened.append(connection.alias), weak=False)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = User.objects.create_user(email='bench@example.com', username='bench', password=None)
+        path, token = f"/api/users/{user.userId}", generate_token(user)
+        connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(lambda _: wsgi_request(application, path, token), range(options['concurrency'])))
+            opened.clear()
+            start = time.perf_counter()
+            samples = list(pool.map(lambda _: wsgi_request(application, path, token), range(options['requests'])))
+            duration = time.perf_counter() - start
+    finally:
+        connection.close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+
+    def percentile(p):
+        return round(latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)], 2)
+
+    print(json.dumps({
+        "requests": len(samples),
+        "non_200": sum(status != 200 for _, status in samples),
+        "connections_opened": len(opened),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--modes', default='new,persistent,pool')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--output', default='bench_connections.json')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import django
+        django.setup()
+        worker(json.loads(args.worker))
+        return
+
+    results = []
+    for mode in args.modes.split(','):
+        env = dict(os.environ, USER_CACHE_TTL='0', DB_POOL_MIN_SIZE=str(args.pool_size),
+                   DB_POOL_MAX_SIZE=str(args.pool_size), **MODES[mode])
+        options = {"requests": args.requests, "concurrency": args.concurrency}
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', json.dumps(options)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append({"mode": mode, **json.loads(output.strip().splitlines()[-1])})
+
+    report = {
+        "benchmark": "connections",
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key not in ('worker', 'output')},
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'mode':<12}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'opened':>8}{'non-200':>9}")
+    for row in results:
+        print(f"{row['mode']:<12}{row['throughput_rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['connections_opened']:>8}{row['non_200']:>9}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
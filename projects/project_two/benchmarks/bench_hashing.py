@@ -0,0 +1,173 @@
+"""
+Benchmark of user registration throughput across password hashing setups.
+
+Drives POST /auth/register with ``--concurrency`` threads against a throwaway
+test database (created from the configured DATABASES, like the test runner
+does) for every combination of:
+
+- hasher: 'pbkdf2' (Django's default), 'scrypt', 'argon2' and 'bcrypt' (when
+  their libraries are installed), and 'md5' as an insecure baseline;
+- mode: 'inline' (PASSWORD_HASHING_WORKERS = 0, hashed in the request
+  thread) or 'pool' (hashed in a pool of ``--workers`` processes).
+
+Each configuration runs in its own process. Besides registrations per
+second, it reports registrations per core: registrations divided by the CPU
+time used by the process and its hashing workers.
+
+Results are printed as a table and written as JSON to ``--output``.
+
+Usage:
+    DJANGO_SECRET_KEY=... python benchmarks/bench_hashing.py [--registrations 200] [--concurrency 8]
+        [--hashers pbkdf2,scrypt,md5] [--modes inline,pool] [--workers 4] [--output bench_hashing.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UserManager.settings')
+
+
+HASHERS = {
+    'pbkdf2': ('django.contrib.auth.hashers.PBKDF2PasswordHasher', None),
+    'scrypt': ('django.contrib.auth.hashers.ScryptPasswordHasher', None),
+    'argon2': ('django.contrib.auth.hashers.Argon2PasswordHasher', 'argon2'),
+    'bcrypt': ('django.contrib.auth.hashers.BCryptSHA256PasswordHasher', 'bcrypt'),
+    'md5': ('django.contrib.auth.hashers.MD5PasswordHasher', None),
+}
+
+
+def cpu_time():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def register(client, index):
+    start = time.perf_counter()
+    response = client.post('/auth/register', {
+        "firstName": 'Bench',
+        "lastName": str(index),
+        "email": f"bench{index}@example.com",
+        "password": f"bench-password-{index}",
+    }, format='json')
+    return time.perf_counter() - start, response.status_code
+
+
+def worker(options):
+    """Run one configuration in this process and print its summary as JSON."""
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.PASSWORD_HASHERS = [HASHERS[options['hasher']][0]]
+    settings.PASSWORD_HASHING_WORKERS = options['workers'] if options['mode'] == 'pool' else 0
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from rest_framework.test import APIClient
+    from users import hashing
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        local = threading.local()
+
+        def run(index):
+            # One client per thread; Django gives each thread its own connection.
+            if not hasattr(local, 'client'):
+                local.client = APIClient()
+            return register(local.client, index)
+
+        if options['mode'] == 'pool':
+            # Start the workers before timing, as a long-running server would have.
+            hashing.hash_passwords([None] + ['warm-up'] * options['workers'])
+        count = options['registrations']
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            start, cpu = time.perf_counter(), cpu_time()
+            samples = list(pool.map(run, range(count)))
+            duration = time.perf_counter() - start
+        # The workers' CPU time is only counted once they have exited.
+        hashing.shutdown()
+        cpu = cpu_time() - cpu
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+    print(json.dumps({
+        "registrations": count,
+        "failed": sum(status != 201 for _, status in samples),
+        "duration_s": round(duration, 3),
+        "cpu_s": round(cpu, 3),
+        "registrations_per_s": round(count / duration, 1),
+        "registrations_per_core": round(count / cpu, 1) if cpu else None,
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)], 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--registrations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--hashers', default='pbkdf2,scrypt,argon2,bcrypt,md5')
+    parser.add_argument('--modes', default='inline,pool')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='bench_hashing.json')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(json.loads(args.worker))
+        return
+
+    results = []
+    for hasher in args.hashers.split(','):
+        module = HASHERS[hasher][1]
+        if module:
+            try:
+                __import__(module)
+            except ImportError:
+                print(f"Skipping {hasher}: {module} is not installed")
+                continue
+        for mode in args.modes.split(','):
+            options = {
+                "hasher": hasher,
+                "mode": mode,
+                "workers": args.workers,
+                "registrations": args.registrations,
+                "concurrency": args.concurrency,
+            }
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', json.dumps(options)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results.append({"hasher": hasher, "mode": mode, **json.loads(output.strip().splitlines()[-1])})
+
+    report = {
+        "benchmark": "hashing",
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key not in ('worker', 'output')},
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'hasher':<8}{'mode':<8}{'reg/s':>10}{'reg/core':>10}{'p50 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for row in results:
+        print(f"{row['hasher']:<8}{row['mode']:<8}{row['registrations_per_s']:>10}{row['registrations_per_core']:>10}"
+              f"{row['p50_ms']:>10}{row['p99_ms']:>10}{row['failed']:>8}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
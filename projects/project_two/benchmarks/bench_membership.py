@@ -0,0 +1,136 @@
+"""
+Benchmark of organisation membership checks across organisation sizes.
+
+Creates a throwaway test database (from the configured DATABASES, like the
+test runner does), fills one organisation per size in ``--sizes`` with that
+many members, then times ``--checks`` membership checks per organisation,
+half for members and half for non-members, with each strategy:
+
+- scan: ``user in organisation.users.all()``, loading every member;
+- exists: `users.cache.is_member`, one existence query on the membership table;
+- cached: `users.cache.is_member` with ORG_MEMBERSHIP_CACHE enabled and the
+  member set already cached.
+
+Results are printed as a table and written as JSON to ``--output``.
+
+Usage:
+    DJANGO_SECRET_KEY=... python benchmarks/bench_membership.py [--sizes 10,1000,10000,50000]
+        [--checks 200] [--strategies scan,exists,cached] [--output bench_membership.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UserManager.settings')
+
+import django  # noqa: E402
+
+
+def create_organisation(size, batch_size=5000):
+    from users.models import User, Organisation
+
+    organisation = Organisation.objects.create(name=f"Bench {size}")
+    users = [User(userId=uuid.uuid4(), username=f"bench-{size}-{i}", email=f"bench-{size}-{i}@example.com",
+                  password='!') for i in range(size)]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    Organisation.users.through.objects.bulk_create(
+        [Organisation.users.through(organisation_id=organisation.pk, user_id=user.pk) for user in users],
+        batch_size=batch_size,
+    )
+    return organisation, users
+
+
+def time_checks(strategy, organisation, users, outsiders):
+    from django.db import connection, reset_queries
+    from django.test.utils import override_settings
+    from users import cache
+
+    checks = [(user, True) for user in users] + [(user, False) for user in outsiders]
+    random.shuffle(checks)
+    with override_settings(ORG_MEMBERSHIP_CACHE=strategy == 'cached', DEBUG=True):
+        cache.clear()
+        cache.shared_cache().clear()
+        if strategy == 'cached':
+            cache.is_member(organisation.pk, users[0].pk)
+        reset_queries()
+        timings = []
+        for user, expected in checks:
+            start = time.perf_counter()
+            if strategy == 'scan':
+                result = user in organisation.users.all()
+            else:
+                result = cache.is_member(organisation.pk, user.pk)
+            timings.append(time.perf_counter() - start)
+            assert result is expected
+        queries = len(connection.queries)
+    return {
+        "checks": len(checks),
+        "queries_per_check": round(queries / len(checks), 2),
+        "mean_us": round(statistics.fmean(timings) * 1e6, 1),
+        "p50_us": round(statistics.median(timings) * 1e6, 1),
+        "max_us": round(max(timings) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='10,1000,10000,50000')
+    parser.add_argument('--checks', type=int, default=200)
+    parser.add_argument('--strategies', default='scan,exists,cached')
+    parser.add_argument('--scan-max', type=int, default=10000,
+                        help='Skip the scan strategy for organisations larger than this.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_membership.json')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from users.models import User
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        outsiders = [User.objects.create_user(email=f"outsider{i}@example.com", username=f"outsider{i}",
+                                              password=None) for i in range(args.checks // 2)]
+        results = []
+        for size in (int(size) for size in args.sizes.split(',')):
+            organisation, users = create_organisation(size)
+            sample = random.sample(users, min(len(users), args.checks - len(outsiders)))
+            for strategy in args.strategies.split(','):
+                if strategy == 'scan' and size > args.scan_max:
+                    continue
+                results.append({"size": size, "strategy": strategy,
+                                **time_checks(strategy, organisation, sample, outsiders)})
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        "benchmark": "membership",
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "params": vars(args),
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'size':>8}  {'strategy':<10}{'queries':>9}{'mean us':>10}{'p50 us':>10}{'max us':>10}")
+    for row in results:
+        print(f"{row['size']:>8}  {row['strategy']:<10}{row['queries_per_check']:>9}{row['mean_us']:>10}"
+              f"{row['p50_us']:>10}{row['max_us']:>10}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
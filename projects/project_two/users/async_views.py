@@ -0,0 +1,252 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from .serializers import USER_READ_FIELDS, UserSerializer, OrganisationSerializer
+from .models import User, Organisation
+from .utils import AsyncJWTAuthentication
+from .cache import ais_member
+from .pagination import InvalidPage, akeyset_page, wants_page
+from .memberships import add_members
+
+
+def _invalid_page(error):
+    return JsonResponse({
+        "status": "Bad request",
+        "message": str(error),
+        "statusCode": 400
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _access_denied():
+    return JsonResponse({
+        "status": "Bad request",
+        "message": "Access denied"
+    }, status=status.HTTP_403_FORBIDDEN)
+
+
+async def _allowed(request, org_id):
+    org_ids = getattr(request.user, 'claimed_org_ids', None)
+    if org_ids is not None:
+        return str(org_id) in org_ids
+    return await ais_member(org_id, request.user.pk)
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the async API views.
+
+    DRF's APIView only runs synchronously, so these are plain Django views
+    with async handlers, keeping the contract of the views in `users.views`:
+    requests are authenticated with `AsyncJWTAuthentication`, and requests
+    without valid credentials get the same 403 response as from DRF.
+
+    Attributes:
+        authentication_class (class): The authentication class for the view.
+    """
+    authentication_class = AsyncJWTAuthentication
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # As for APIView: JWT authentication is not open to CSRF.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            credentials = await self.authentication_class().authenticate(request)
+        except AuthenticationFailed as e:
+            return self.forbidden(e.detail)
+        if credentials is None:
+            return self.forbidden('Authentication credentials were not provided.')
+        request.user, request.auth = credentials
+
+        if request.content_type == 'application/json' and request.body:
+            try:
+                request.data = json.loads(request.body)
+            except ValueError as e:
+                return JsonResponse({"detail": f"JSON parse error - {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            request.data = request.POST
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def forbidden(detail):
+        return JsonResponse({"detail": str(detail)}, status=status.HTTP_403_FORBIDDEN)
+
+
+class AsyncUserDetail(AsyncAPIView):
+    """
+    Async version of `users.views.UserDetail`.
+
+    Methods:
+        get(request, user_id):
+            Handle GET request to retrieve user details.
+    """
+    async def get(self, request, user_id):
+        try:
+            user = await User.objects.aget(pk=user_id)
+        except User.DoesNotExist:
+            return JsonResponse({
+                "status": "Error",
+                "message": f"User with id {user_id} does not exist"
+            }, status=status.HTTP_404_NOT_FOUND)
+        serializer = UserSerializer(user)
+        return JsonResponse({
+			"status": "success",
+			"message": "User data retrieved successfully",
+			"data": serializer.data
+		}, status=status.HTTP_200_OK)
+
+
+class AsyncOrganisationList(AsyncAPIView):
+    """
+    Async version of `users.views.OrganisationList`.
+
+    Methods:
+        get(request):
+            Handle GET request to retrieve organisations associated with the authenticated user.
+        post(request):
+            Handle POST request to create an organisation with the authenticated user as member.
+    """
+    async def get(self, request):
+        org_ids = getattr(request.user, 'claimed_org_ids', None)
+        if org_ids is not None:
+            organisations = Organisation.objects.filter(pk__in=org_ids)
+        else:
+            organisations = request.user.organisations.all()
+        if wants_page(request):
+            try:
+                page, next_cursor = await akeyset_page(organisations, 'orgId', request)
+            except InvalidPage as e:
+                return _invalid_page(e)
+        else:
+            page, next_cursor = [organisation async for organisation in organisations.order_by('orgId')], None
+        serializer = OrganisationSerializer(page, many=True)
+        return JsonResponse({
+			"status": "success",
+			"message": "Organisations Retrieved Successfully",
+			"data": {
+				"organisations": serializer.data,
+				"next": next_cursor
+			}
+		}, status=status.HTTP_200_OK)
+
+    async def post(self, request):
+        serializer = OrganisationSerializer(data=request.data)
+        if serializer.is_valid():
+            # Validating an organisation makes no queries, but saving it does.
+            organisation = Organisation(**serializer.validated_data)
+            await organisation.asave()
+            await organisation.users.aadd(request.user)
+            return JsonResponse({
+				"status": "success",
+				"message": "Organisation created successfully",
+				"data": OrganisationSerializer(organisation).data
+			}, status=status.HTTP_201_CREATED)
+
+        return JsonResponse({
+            "status": "Bad Request",
+            "message": "Client error",
+            "statusCode": 400
+		}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncOrganisationDetail(AsyncAPIView):
+    """
+    Async version of `users.views.OrganisationDetail`.
+
+    Methods:
+        get(request, org_id):
+            Handle GET request to retrieve details of a specific organisation.
+    """
+    async def get(self, request, org_id):
+        if not await _allowed(request, org_id):
+            return _access_denied()
+        organisation = await Organisation.objects.aget(pk=org_id)
+        serializer = OrganisationSerializer(organisation)
+        return JsonResponse({
+			"status": "success",
+			"message": "Organisation retrieved successfully",
+			"data": serializer.data
+		}, status=status.HTTP_200_OK)
+
+
+class AsyncOrganisationMembers(AsyncAPIView):
+    """
+    Async version of `users.views.OrganisationMembers`.
+
+    Methods:
+        get(request, org_id):
+            Handle GET request to retrieve one page of the members of the organisation.
+    """
+    async def get(self, request, org_id):
+        if not await _allowed(request, org_id):
+            return _access_denied()
+
+        members = User.objects.filter(organisations=org_id).only(*USER_READ_FIELDS)
+        try:
+            page, next_cursor = await akeyset_page(members, 'userId', request)
+        except InvalidPage as e:
+            return _invalid_page(e)
+        serializer = UserSerializer(page, many=True)
+        return JsonResponse({
+            "status": "success",
+            "message": "Organisation members retrieved successfully",
+            "data": {
+                "users": serializer.data,
+                "next": next_cursor
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class AsyncAddUserToOrganisation(AsyncAPIView):
+    """
+    Async version of `users.views.AddUserToOrganisation`.
+
+    The memberships are still added by `users.memberships.add_members`, in a
+    thread, as transactions are not available in async code.
+
+    Methods:
+        post(request, org_id):
+            Handle POST request to add users to an organisation.
+    """
+    async def post(self, request, org_id):
+        organisation = await Organisation.objects.filter(pk=org_id).afirst()
+        if organisation is None:
+            return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not await _allowed(request, organisation.pk):
+            return _access_denied()
+
+        user_ids = request.data.get('userIds')
+        if user_ids is not None:
+            if (not isinstance(user_ids, list) or not all(isinstance(user_id, str) for user_id in user_ids)
+                    or len(user_ids) > getattr(settings, 'BULK_ADD_MAX_USERS', 10000)):
+                return JsonResponse({
+                    "status": "Bad request",
+                    "message": "userIds must be a list of user ids",
+                    "statusCode": 400
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({
+                "status": "success",
+                "message": "Users added to organisation successfully",
+                "data": await sync_to_async(add_members)(organisation, user_ids)
+            }, status=status.HTTP_200_OK)
+
+        user_id = request.data.get('userId')
+
+        if (await sync_to_async(add_members)(organisation, [user_id]))["notFound"]:
+            return JsonResponse({
+				"status": "Error",
+				"message": f"User with id {user_id} does not exist"
+			}, status=status.HTTP_404_NOT_FOUND)
+
+        return JsonResponse({
+			"status": "success",
+			"message": "User added to organisation successfully"
+		}, status=status.HTTP_200_OK)
@@ -0,0 +1,327 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+
+from .models import Organisation
+
+
+User = get_user_model()
+Membership = Organisation.users.through
+
+# Fields loaded and cached for authenticated users. Anything else (password,
+# last_login, ...) is deferred and loaded from the database only if accessed.
+AUTH_USER_FIELDS = frozenset({
+    'userId', 'username', 'email', 'firstName', 'lastName', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'membershipVersion',
+})
+
+KEY_PREFIX = 'users:auth:'
+MEMBERS_KEY_PREFIX = 'users:members:'
+
+# Cached in place of the member set of organisations too large to cache.
+TOO_MANY_MEMBERS = False
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a fixed TTL.
+
+    Args:
+        maxsize (int): The maximum number of entries kept.
+        ttl (float): Seconds an entry stays valid.
+        timer (callable): Clock returning seconds, used for expiry.
+    """
+    def __init__(self, maxsize, ttl, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the live value stored for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self._timer():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (value, self._timer() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove ``key`` if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_local = None
+_members_local = None
+_local_lock = threading.Lock()
+
+
+def _fields():
+    # Model.from_db expects the loaded fields in concrete field order.
+    return tuple(field.attname for field in User._meta.concrete_fields if field.attname in AUTH_USER_FIELDS)
+
+
+def _user_key(user_id):
+    # Cached users are tuples in `_fields()` order, so the key names the
+    # fields: entries written with other fields, e.g. by another release,
+    # are never read back as this layout.
+    signature = hashlib.sha256(','.join(_fields()).encode()).hexdigest()[:8]
+    return f"{KEY_PREFIX}{signature}:{user_id}"
+
+
+def local_cache():
+    """
+    Return the process-wide LRU tier, creating it on first use.
+
+    Returns:
+        LRUCache: The cache, sized by USER_CACHE_LOCAL_SIZE.
+    """
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LRUCache(getattr(settings, 'USER_CACHE_LOCAL_SIZE', 1024),
+                                  getattr(settings, 'USER_CACHE_LOCAL_TTL', 5))
+    return _local
+
+
+def members_local_cache():
+    """
+    Return the process-wide LRU tier of organisation member sets.
+
+    Returns:
+        LRUCache: The cache, sized by ORG_MEMBERSHIP_CACHE_LOCAL_SIZE.
+    """
+    global _members_local
+    if _members_local is None:
+        with _local_lock:
+            if _members_local is None:
+                _members_local = LRUCache(getattr(settings, 'ORG_MEMBERSHIP_CACHE_LOCAL_SIZE', 256),
+                                          getattr(settings, 'USER_CACHE_LOCAL_TTL', 5))
+    return _members_local
+
+
+def shared_cache():
+    """Return the Django cache used as the shared tier."""
+    return caches[getattr(settings, 'USER_CACHE_ALIAS', 'default')]
+
+
+def _build(values):
+    return User.from_db(router.db_for_read(User), _fields(), values)
+
+
+def get_user(user_id):
+    """
+    Return the user with the given ID for authentication.
+
+    Users are looked up in the in-process LRU tier, then in the shared Django
+    cache, then in the database. Only the fields in AUTH_USER_FIELDS are
+    loaded and cached, as a tuple of values under a key naming those fields;
+    the others are deferred. Every
+    call returns a new instance, so callers may modify it freely.
+
+    With USER_CACHE_TTL set to 0 the caches are bypassed and the whole row
+    is loaded.
+
+    Args:
+        user_id (str): The user's ID.
+
+    Returns:
+        User: The user.
+
+    Raises:
+        User.DoesNotExist: If there is no such user.
+    """
+    ttl = getattr(settings, 'USER_CACHE_TTL', 300)
+    if not ttl:
+        return User.objects.get(userId=user_id)
+
+    key = _user_key(user_id)
+    local = local_cache()
+    values = local.get(key)
+    if values is None:
+        values = shared_cache().get(key)
+        if values is None:
+            fields = _fields()
+            values = User.objects.filter(userId=user_id).values_list(*fields).first()
+            if values is None:
+                raise User.DoesNotExist(f"User {user_id} does not exist")
+            shared_cache().set(key, values, timeout=ttl)
+        local.set(key, values)
+    return _build(values)
+
+
+async def aget_user(user_id):
+    """
+    Async version of `get_user`, reading the shared cache and the database
+    with their async APIs.
+
+    Raises:
+        User.DoesNotExist: If there is no such user.
+    """
+    ttl = getattr(settings, 'USER_CACHE_TTL', 300)
+    if not ttl:
+        return await User.objects.aget(userId=user_id)
+
+    key = _user_key(user_id)
+    local = local_cache()
+    values = local.get(key)
+    if values is None:
+        values = await shared_cache().aget(key)
+        if values is None:
+            fields = _fields()
+            values = await User.objects.filter(userId=user_id).values_list(*fields).afirst()
+            if values is None:
+                raise User.DoesNotExist(f"User {user_id} does not exist")
+            await shared_cache().aset(key, values, timeout=ttl)
+        local.set(key, values)
+    return _build(values)
+
+
+def invalidate_user(user_id):
+    """
+    Drop a user from the shared tier and from this process's LRU tier.
+
+    Other processes keep their LRU entry until it expires, after at most
+    USER_CACHE_LOCAL_TTL seconds.
+
+    Args:
+        user_id: The user's ID.
+    """
+    key = _user_key(user_id)
+    shared_cache().delete(key)
+    local_cache().delete(key)
+
+
+def _member_set(org_id):
+    key = MEMBERS_KEY_PREFIX + str(org_id)
+    local = members_local_cache()
+    members = local.get(key)
+    if members is None:
+        members = shared_cache().get(key)
+        if members is None:
+            limit = getattr(settings, 'ORG_MEMBERSHIP_CACHE_MAX_MEMBERS', 100000)
+            user_ids = list(Membership.objects.filter(organisation_id=org_id)
+                            .values_list('user_id', flat=True)[:limit + 1])
+            if len(user_ids) > limit:
+                members = TOO_MANY_MEMBERS
+            else:
+                members = b''.join(sorted(user_id.bytes for user_id in user_ids))
+            shared_cache().set(key, members, timeout=getattr(settings, 'ORG_MEMBERSHIP_CACHE_TTL', 300))
+        local.set(key, members)
+    return members
+
+
+def _contains(members, user_id):
+    # Binary search over the sorted 16-byte user IDs.
+    target = uuid.UUID(str(user_id)).bytes
+    low, high = 0, len(members) // 16
+    while low < high:
+        middle = (low + high) // 2
+        if members[middle * 16:middle * 16 + 16] < target:
+            low = middle + 1
+        else:
+            high = middle
+    return members[low * 16:low * 16 + 16] == target
+
+
+def is_member(org_id, user_id):
+    """
+    Return whether a user belongs to an organisation.
+
+    By default this is one existence query on the indexed
+    (organisation_id, user_id) pair of the membership table. With
+    ORG_MEMBERSHIP_CACHE enabled, the organisation's member IDs are cached
+    as a sorted array of 16-byte UUIDs, in-process and in the shared cache,
+    and searched in O(log N); organisations with more than
+    ORG_MEMBERSHIP_CACHE_MAX_MEMBERS members are still checked with the
+    existence query.
+
+    Args:
+        org_id: The organisation's ID.
+        user_id: The user's ID.
+
+    Returns:
+        bool: True if the user is a member of the organisation.
+    """
+    if getattr(settings, 'ORG_MEMBERSHIP_CACHE', False):
+        members = _member_set(org_id)
+        if members is not TOO_MANY_MEMBERS:
+            return _contains(members, user_id)
+    return Membership.objects.filter(organisation_id=org_id, user_id=user_id).exists()
+
+
+async def _amember_set(org_id):
+    key = MEMBERS_KEY_PREFIX + str(org_id)
+    local = members_local_cache()
+    members = local.get(key)
+    if members is None:
+        members = await shared_cache().aget(key)
+        if members is None:
+            limit = getattr(settings, 'ORG_MEMBERSHIP_CACHE_MAX_MEMBERS', 100000)
+            rows = Membership.objects.filter(organisation_id=org_id).values_list('user_id', flat=True)[:limit + 1]
+            user_ids = [user_id async for user_id in rows]
+            if len(user_ids) > limit:
+                members = TOO_MANY_MEMBERS
+            else:
+                members = b''.join(sorted(user_id.bytes for user_id in user_ids))
+            await shared_cache().aset(key, members, timeout=getattr(settings, 'ORG_MEMBERSHIP_CACHE_TTL', 300))
+        local.set(key, members)
+    return members
+
+
+async def ais_member(org_id, user_id):
+    """Async version of `is_member`."""
+    if getattr(settings, 'ORG_MEMBERSHIP_CACHE', False):
+        members = await _amember_set(org_id)
+        if members is not TOO_MANY_MEMBERS:
+            return _contains(members, user_id)
+    return await Membership.objects.filter(organisation_id=org_id, user_id=user_id).aexists()
+
+
+def invalidate_members(org_id):
+    """
+    Drop an organisation's member set from the shared tier and from this
+    process's LRU tier.
+
+    Args:
+        org_id: The organisation's ID.
+    """
+    key = MEMBERS_KEY_PREFIX + str(org_id)
+    shared_cache().delete(key)
+    members_local_cache().delete(key)
+
+
+def clear():
+    """Empty this process's LRU tiers."""
+    local_cache().clear()
+    members_local_cache().clear()
@@ -0,0 +1,88 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker(settings_module):
+    # Spawned workers start without Django; forked ones inherit it.
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+        import django
+        django.setup()
+
+
+def get_executor():
+    """
+    Return the process pool that hashes passwords, creating it on first use.
+
+    Returns:
+        ProcessPoolExecutor: A pool of PASSWORD_HASHING_WORKERS processes, or
+        None when PASSWORD_HASHING_WORKERS is 0 and passwords are hashed inline.
+    """
+    global _executor
+    workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 0)
+    if not workers:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'UserManager.settings'),),
+                )
+    return _executor
+
+
+def shutdown():
+    """Stop the process pool, if any; the next hash starts a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def hash_password(password):
+    """
+    Hash a password with `make_password`, in the process pool if there is one.
+
+    Password hashing is deliberately slow CPU work. Inline, it competes for
+    the serving process's cores with every other request; in the pool, at
+    most PASSWORD_HASHING_WORKERS hashes run at once, in separate processes,
+    and the calling thread only waits for the result.
+
+    Args:
+        password (str): The raw password, or None for an unusable password.
+
+    Returns:
+        str: The encoded password hash.
+    """
+    executor = get_executor()
+    if executor is None or password is None:
+        return make_password(password)
+    return executor.submit(make_password, password).result()
+
+
+def hash_passwords(passwords):
+    """
+    Hash many passwords, spread over the process pool if there is one.
+
+    Args:
+        passwords (list): The raw passwords; None items get unusable passwords.
+
+    Returns:
+        list: The encoded password hashes, in the same order.
+    """
+    executor = get_executor()
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (getattr(settings, 'PASSWORD_HASHING_WORKERS', 1) * 4))
+    return list(executor.map(make_password, passwords, chunksize=chunksize))
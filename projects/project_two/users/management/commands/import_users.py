@@ -0,0 +1,213 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from users.hashing import hash_passwords
+from users.models import User, Organisation
+from users.utils import default_username
+
+
+Membership = Organisation.users.through
+
+REQUIRED_FIELDS = ('email', 'firstName', 'lastName')
+OPTIONAL_FIELDS = ('password', 'phone', 'username')
+
+
+def read_rows(stream, fmt):
+    """
+    Yield the rows of a CSV or JSON Lines stream as dicts, one at a time.
+
+    Malformed JSON lines are yielded as None, so they are counted as invalid
+    rows without stopping the import.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+class Command(BaseCommand):
+    """
+    Import users from a CSV or JSON Lines file.
+
+    Rows need `email`, `firstName` and `lastName`, and may have `password`,
+    `phone` and `username` (which defaults to the email, as on registration).
+    Every imported user gets a default organisation, as on registration.
+
+    The input is streamed and imported in chunks: rows are validated, emails
+    already taken (in the database or earlier in the chunk) are looked up
+    with one query and skipped, passwords are hashed with
+    `users.hashing.hash_passwords`, then the users, their organisations and
+    the membership rows are written with `bulk_create` in one transaction.
+    After each chunk the number of input rows consumed is written to a
+    checkpoint file; a rerun resumes after them. Since known emails are
+    skipped, rerunning a chunk that was already committed is harmless.
+    """
+    help = 'Import users from a CSV or JSON Lines file in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The CSV or JSON Lines file, or - for standard input.')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--hashed-passwords', action='store_true',
+                            help='The password column holds Django password hashes, not plain text.')
+        parser.add_argument('--report-duplicates', action='store_true',
+                            help='List every skipped duplicate email on stderr.')
+        parser.add_argument('--checkpoint', help='Checkpoint file; defaults to <path>.checkpoint.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        checkpoint = options['checkpoint'] or (None if path == '-' else f"{path}.checkpoint")
+        self.hashed = options['hashed_passwords']
+        self.report_duplicates = options['report_duplicates']
+        self.counts = {"rows": 0, "imported": 0, "duplicates": 0, "invalid": 0}
+
+        skip = 0
+        if checkpoint and os.path.exists(checkpoint) and not options['restart']:
+            with open(checkpoint) as f:
+                self.counts = json.load(f)
+            skip = self.counts["rows"]
+            self.stdout.write(f"Resuming after row {skip} from {checkpoint}")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        started = time.perf_counter()
+        rows_at_start = self.counts["rows"]
+        try:
+            rows = islice(read_rows(stream, fmt), skip, None)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                self.import_chunk(chunk, first_row=self.counts["rows"] + 1)
+                self.counts["rows"] += len(chunk)
+                if checkpoint:
+                    self.save_checkpoint(checkpoint)
+                rate = (self.counts["rows"] - rows_at_start) / (time.perf_counter() - started)
+                self.stdout.write(
+                    f"{self.counts['rows']} rows: {self.counts['imported']} imported, "
+                    f"{self.counts['duplicates']} duplicates, {self.counts['invalid']} invalid "
+                    f"({rate:.0f} rows/s)"
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.counts['imported']} users from {self.counts['rows']} rows"))
+
+    def save_checkpoint(self, checkpoint):
+        partial = f"{checkpoint}.tmp"
+        with open(partial, 'w') as f:
+            json.dump(self.counts, f)
+        os.replace(partial, checkpoint)
+
+    def clean(self, row):
+        if row is None:
+            raise ValidationError('Malformed row')
+        # JSON rows may hold numbers, lists or objects where text is expected.
+        not_text = [field for field in REQUIRED_FIELDS + OPTIONAL_FIELDS
+                    if row.get(field) is not None and not isinstance(row[field], str)]
+        if not_text:
+            raise ValidationError(f"Not text: {', '.join(not_text)}")
+        missing = [field for field in REQUIRED_FIELDS if not (row.get(field) or '').strip()]
+        if missing:
+            raise ValidationError(f"Missing {', '.join(missing)}")
+        email = User.objects.normalize_email(row['email'].strip())
+        validate_email(email)
+        username = (row.get('username') or '').strip()
+        if len(username) > User._meta.get_field('username').max_length:
+            raise ValidationError('Username too long')
+        return {
+            "email": email,
+            "username": username or default_username(email),
+            "firstName": row['firstName'].strip(),
+            "lastName": row['lastName'].strip(),
+            "phone": (row.get('phone') or '').strip() or None,
+            "password": row.get('password') or None,
+        }
+
+    def import_chunk(self, chunk, first_row):
+        cleaned = []
+        for line, row in enumerate(chunk, first_row):
+            try:
+                cleaned.append(self.clean(row))
+            except ValidationError as e:
+                self.counts["invalid"] += 1
+                self.stderr.write(f"Row {line}: {'; '.join(e.messages)}")
+        try:
+            users, duplicates = self.write_users(cleaned)
+        except IntegrityError:
+            # A user registered concurrently with one of these emails or
+            # usernames; the lookup in write_users now finds them.
+            users, duplicates = self.write_users(cleaned)
+        self.counts["imported"] += len(users)
+        self.counts["duplicates"] += len(duplicates)
+        if self.report_duplicates:
+            for email in duplicates:
+                self.stderr.write(f"Duplicate: {email}")
+
+    def write_users(self, cleaned):
+        batch_size = getattr(settings, 'BULK_BATCH_SIZE', 1000)
+        emails = {row["email"] for row in cleaned}
+        usernames = {row["username"] for row in cleaned}
+        taken_emails, taken_usernames = set(), set()
+        taken = User.objects.filter(Q(email__in=emails) | Q(username__in=usernames))
+        for email, username in taken.values_list('email', 'username'):
+            taken_emails.add(email)
+            taken_usernames.add(username)
+
+        rows, duplicates = [], []
+        for row in cleaned:
+            if row["email"] in taken_emails or row["username"] in taken_usernames:
+                duplicates.append(row["email"])
+                continue
+            taken_emails.add(row["email"])
+            taken_usernames.add(row["username"])
+            rows.append(row)
+
+        # Hash before opening the transaction, so it is not held open meanwhile.
+        passwords = [row["password"] for row in rows]
+        if self.hashed:
+            hashes = [password or make_password(None) for password in passwords]
+        else:
+            hashes = hash_passwords(passwords)
+        users = [User(password=password, **{key: value for key, value in row.items() if key != "password"})
+                 for row, password in zip(rows, hashes)]
+        organisations = [Organisation(name=f"{user.firstName}'s Organisation") for user in users]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            Organisation.objects.bulk_create(organisations, batch_size=batch_size)
+            Membership.objects.bulk_create(
+                [Membership(organisation_id=organisation.pk, user_id=user.pk)
+                 for user, organisation in zip(users, organisations)],
+                batch_size=batch_size,
+            )
+        return users, duplicates
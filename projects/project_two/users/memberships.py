@@ -0,0 +1,70 @@
+import uuid
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+from .models import User, Organisation
+
+
+Membership = Organisation.users.through
+
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def add_members(organisation, user_ids, batch_size=None):
+    """
+    Add many users to an organisation in one transaction.
+
+    The users are looked up with one ``IN`` query, their existing
+    memberships with another, and the new membership rows are inserted in
+    batches of ``batch_size`` with conflicts ignored, so a concurrent add of
+    the same user is not an error. ``m2m_changed`` is sent for the rows
+    added, as ``organisation.users.add`` would.
+
+    Args:
+        organisation (Organisation): The organisation.
+        user_ids (list): The IDs of the users to add, as strings or UUIDs.
+        batch_size (int): Rows per INSERT; defaults to BULK_BATCH_SIZE.
+
+    Returns:
+        dict: The IDs, as given, under ``added``, ``alreadyMember`` and
+        ``notFound``, in the order given. Malformed IDs are not found.
+    """
+    batch_size = batch_size or getattr(settings, 'BULK_BATCH_SIZE', 1000)
+    keys = {user_id: _as_uuid(user_id) for user_id in user_ids}
+    wanted = {key for key in keys.values() if key is not None}
+    using = router.db_for_write(Membership, instance=organisation)
+
+    with transaction.atomic(using=using):
+        found = set(User.objects.using(using).filter(pk__in=wanted).values_list('pk', flat=True))
+        existing = set(Membership.objects.using(using).filter(organisation_id=organisation.pk, user_id__in=found)
+                       .values_list('user_id', flat=True))
+        new = found - existing
+        if new:
+            signal_kwargs = dict(sender=Membership, instance=organisation, reverse=False, model=User,
+                                 pk_set=new, using=using)
+            m2m_changed.send(action='pre_add', **signal_kwargs)
+            Membership.objects.using(using).bulk_create(
+                [Membership(organisation_id=organisation.pk, user_id=user_id) for user_id in new],
+                batch_size=batch_size, ignore_conflicts=True,
+            )
+            m2m_changed.send(action='post_add', **signal_kwargs)
+
+    results = {"added": [], "alreadyMember": [], "notFound": []}
+    reported = set()
+    for user_id in user_ids:
+        key = keys[user_id]
+        if key in new and key not in reported:
+            reported.add(key)
+            results["added"].append(user_id)
+        elif key in found:
+            results["alreadyMember"].append(user_id)
+        else:
+            results["notFound"].append(user_id)
+    return results
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='membershipVersion',
+            field=models.PositiveIntegerField(default=0, verbose_name='membership version'),
+        ),
+    ]
@@ -10,6 +10,7 @@ class User(AbstractUser):
     email = models.EmailField(max_length=254, unique=True)
     password = models.CharField(max_length=255)
     phone = models.CharField(max_length=255, null=True, blank=True)
+    membershipVersion = models.PositiveIntegerField(default=0, verbose_name="membership version")
    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'firstName', 'lastName', 'password']
@@ -1,6 +1,8 @@
 from .models import User, Organisation
 from rest_framework import serializers
 from rest_framework.response import Response
+from .hashing import hash_password
+from .utils import default_username
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,7 +12,8 @@ class UserSerializer(serializers.ModelSerializer):
     This serializer converts User model instances to and from JSON format.
     It ensures that the password field is write-only, meaning it will not be
     included in the serialized representation when reading user data, but it
-    will be included when creating or updating user data.
+    will be included when creating or updating user data. Passwords are hashed
+    with `users.hashing.hash_password`, in a process pool when configured.
 
     Attributes:
         Meta (class): Inner class that defines the metadata for the serializer.
@@ -25,11 +28,16 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         password = validated_data.get('password', None)
         instance = self.Meta.model(**validated_data)
+        instance.username = instance.username or default_username(instance.email)
         if password is not None:
-            instance.set_password(password)
+            instance.password = hash_password(password)
         instance.save()
         
         return instance
+
+
+# The fields a UserSerializer reads, for loading users only to list them.
+USER_READ_FIELDS = [field for field in UserSerializer.Meta.fields if field != 'password']
     
     
 class OrganisationSerializer(serializers.ModelSerializer):
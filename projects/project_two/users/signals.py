@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_members, invalidate_user
+from .models import User, Organisation
+
+
+def _invalidate(invalidate, key):
+    # Drop the entry at once and again when the transaction commits, so a
+    # request reading the old rows before the commit cannot keep it cached.
+    invalidate(key)
+    transaction.on_commit(lambda: invalidate(key))
+
+
+@receiver(post_save, sender=User, dispatch_uid='users_invalidate_cached_user_on_save')
+@receiver(post_delete, sender=User, dispatch_uid='users_invalidate_cached_user_on_delete')
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop a saved or deleted user from the authentication cache."""
+    _invalidate(invalidate_user, instance.pk)
+
+
+@receiver(post_delete, sender=Organisation, dispatch_uid='users_invalidate_cached_members_on_delete')
+def invalidate_cached_members(sender, instance, **kwargs):
+    """Drop a deleted organisation's member set from the membership cache."""
+    _invalidate(invalidate_members, instance.pk)
+
+
+@receiver(m2m_changed, sender=Organisation.users.through, dispatch_uid='users_bump_membership_version')
+def bump_membership_version(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Bump the membership version of every user whose organisations changed.
+
+    Access tokens carrying membership claims record the version they were
+    issued at; once it is bumped, their claims are no longer trusted. The
+    member sets of the organisations involved are dropped from the
+    membership cache.
+    """
+    if action == 'pre_clear':
+        related = instance.organisations if reverse else instance.users
+        instance._cleared_pks = list(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    changed = instance.__dict__.pop('_cleared_pks', []) if action == 'post_clear' else list(pk_set)
+    if not changed:
+        return
+    user_ids, org_ids = ([instance.pk], changed) if reverse else (changed, [instance.pk])
+
+    User.objects.filter(pk__in=user_ids).update(membershipVersion=F('membershipVersion') + 1)
+    for user_id in user_ids:
+        _invalidate(invalidate_user, user_id)
+    for org_id in org_ids:
+        _invalidate(invalidate_members, org_id)
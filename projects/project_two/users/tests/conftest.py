@@ -0,0 +1,29 @@
+import pytest
+from rest_framework.test import APIClient
+from users import cache
+from users.utils import generate_token
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    cache.clear()
+    cache.shared_cache().clear()
+    yield
+    cache.clear()
+    cache.shared_cache().clear()
+
+
+@pytest.fixture
+def fast_hasher(settings):
+    """Hash passwords with MD5, for tests that create many users."""
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@pytest.fixture
+def client_for():
+    """Return a function building an API client authenticated as a user."""
+    def client_for(user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {generate_token(user)}")
+        return client
+    return client_for
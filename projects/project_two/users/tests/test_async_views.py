@@ -0,0 +1,117 @@
+import importlib
+import uuid
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from django.urls import clear_url_caches, resolve
+from rest_framework.test import APIClient
+from users import async_views
+from users.models import User, Organisation
+from users.utils import AsyncJWTAuthentication, generate_token
+
+
+def load_urls(settings, use_async):
+    import UserManager.urls
+    import users.urls
+    settings.USERS_ASYNC_VIEWS = use_async
+    importlib.reload(users.urls)
+    importlib.reload(UserManager.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def both_views(settings):
+    """Call the view for each setting, and return both responses."""
+    def request(user, method, path, data=None):
+        responses = []
+        for use_async in (False, True):
+            load_urls(settings, use_async)
+            client = APIClient()
+            if user is not None:
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {generate_token(user)}")
+            responses.append(getattr(client, method)(path, data, format='json'))
+        return responses
+    yield request
+    load_urls(settings, False)
+
+
+@pytest.fixture
+def member():
+    user = User.objects.create_user(email='ama@example.com', password='password123', username='ama')
+    other = User.objects.create_user(email='kofi@example.com', password='password123', username='kofi')
+    organisation = Organisation.objects.create(name="Ama's Organisation", description='Mine')
+    organisation.users.add(user)
+    return user, other, organisation
+
+
+def assert_same(responses):
+    sync, asynchronous = responses
+    assert sync.status_code == asynchronous.status_code
+    assert sync.json() == asynchronous.json()
+    return sync
+
+
+@pytest.mark.django_db
+def test_setting_selects_async_views(settings):
+    load_urls(settings, True)
+    try:
+        assert resolve('/api/organisations').func.view_class is async_views.AsyncOrganisationList
+        assert resolve('/auth/login').func.view_class.__module__ == 'users.views'
+    finally:
+        load_urls(settings, False)
+    assert resolve('/api/organisations').func.view_class.__module__ == 'users.views'
+
+
+@pytest.mark.django_db
+def test_async_views_keep_the_read_contract(member, both_views):
+    user, other, organisation = member
+    assert assert_same(both_views(user, 'get', f'/api/users/{user.userId}')).status_code == 200
+    assert assert_same(both_views(user, 'get', f'/api/users/{uuid.uuid4()}')).status_code == 404
+    # Malformed ids do not match the URL pattern.
+    assert [response.status_code for response in both_views(user, 'get', '/api/users/not-a-uuid')] == [404, 404]
+    assert assert_same(both_views(user, 'get', '/api/organisations')).json()["data"]["next"] is None
+    assert assert_same(both_views(user, 'get', '/api/organisations?limit=1')).status_code == 200
+    assert assert_same(both_views(user, 'get', '/api/organisations?cursor=bad')).status_code == 400
+    assert assert_same(both_views(user, 'get', f'/api/organisations/{organisation.orgId}')).status_code == 200
+    assert assert_same(both_views(other, 'get', f'/api/organisations/{organisation.orgId}')).status_code == 403
+    assert assert_same(both_views(user, 'get', f'/api/organisations/{organisation.orgId}/members')).status_code == 200
+
+
+@pytest.mark.django_db
+def test_async_views_reject_missing_and_invalid_credentials(member, both_views):
+    assert assert_same(both_views(None, 'get', '/api/organisations')).status_code == 403
+    user, _, _ = member
+    User.objects.filter(pk=user.pk).delete()
+    assert assert_same(both_views(user, 'get', '/api/organisations')).json() == {"detail": "User not found"}
+
+
+@pytest.mark.django_db
+def test_async_views_keep_the_write_contract(member, both_views):
+    user, other, organisation = member
+    sync, asynchronous = both_views(user, 'post', '/api/organisations', {"name": 'New', "description": 'Org'})
+    assert sync.status_code == asynchronous.status_code == 201
+    assert asynchronous.json()["data"]["name"] == 'New'
+    assert user.organisations.filter(name='New').count() == 2
+    assert assert_same(both_views(user, 'post', '/api/organisations', {})).status_code == 400
+
+    path = f'/api/organisations/{organisation.orgId}/users'
+    sync, asynchronous = both_views(user, 'post', path, {"userId": str(other.userId)})
+    assert sync.json() == asynchronous.json() == {
+        "status": "success", "message": "User added to organisation successfully"}
+    assert assert_same(both_views(user, 'post', path, {"userIds": [str(other.userId), 'nope']})).json()["data"] == {
+        "added": [], "alreadyMember": [str(other.userId)], "notFound": ['nope']}
+    assert assert_same(both_views(user, 'post', path, {"userId": 'nope'})).status_code == 404
+    outsider = User.objects.create_user(email='esi@example.com', password='password123', username='esi')
+    assert assert_same(both_views(outsider, 'post', path, {"userIds": [str(outsider.userId)]})).status_code == 403
+
+
+@pytest.mark.django_db
+def test_async_authentication_reads_the_user_cache(member, django_assert_num_queries):
+    user, _, _ = member
+    request = RequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {generate_token(user)}")
+    authenticate = async_to_sync(AsyncJWTAuthentication().authenticate)
+    with django_assert_num_queries(1):
+        assert authenticate(request)[0].pk == user.pk
+    with django_assert_num_queries(0):
+        assert authenticate(request)[0].pk == user.pk
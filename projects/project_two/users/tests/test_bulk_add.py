@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+from users.models import User, Organisation
+
+
+@pytest.fixture
+def setup(client_for):
+    admin = User.objects.create_user(email='admin@example.com', password='password', username='admin')
+    organisation = Organisation.objects.create(name='Org')
+    organisation.users.add(admin)
+    users = [User.objects.create_user(email=f"user{i}@example.com", password='password', username=f"user{i}")
+             for i in range(3)]
+    return client_for(admin), organisation, users
+
+
+@pytest.mark.django_db
+def test_bulk_add_reports_each_id(setup):
+    client, organisation, users = setup
+    organisation.users.add(users[0])
+    missing = str(uuid.uuid4())
+    ids = [str(user.userId) for user in users] + [missing, 'not-a-uuid']
+
+    response = client.post(f'/api/organisations/{organisation.orgId}/users', {'userIds': ids}, format='json')
+    assert response.status_code == 200
+    assert response.data['data'] == {
+        "added": ids[1:3],
+        "alreadyMember": ids[:1],
+        "notFound": [missing, 'not-a-uuid'],
+    }
+    assert set(organisation.users.all()) >= set(users)
+    # The membership version of added users is bumped, as with users.add().
+    assert User.objects.get(pk=users[1].pk).membershipVersion == 1
+
+
+@pytest.mark.django_db
+def test_bulk_add_rejects_malformed_lists(setup):
+    client, organisation, _ = setup
+    url = f'/api/organisations/{organisation.orgId}/users'
+    assert client.post(url, {'userIds': 'abc'}, format='json').status_code == 400
+    assert client.post(url, {'userIds': [{'id': 1}]}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_single_add_keeps_its_responses(setup):
+    client, organisation, users = setup
+    url = f'/api/organisations/{organisation.orgId}/users'
+    assert client.post(url, {'userId': str(users[2].userId)}, format='json').status_code == 200
+    assert organisation.users.filter(pk=users[2].pk).exists()
+    assert client.post(url, {'userId': str(uuid.uuid4())}, format='json').status_code == 404
+
+
+@pytest.mark.django_db
+def test_only_members_can_add_users(setup, client_for):
+    _, organisation, users = setup
+    outsider = client_for(users[0])
+    url = f'/api/organisations/{organisation.orgId}/users'
+    ids = [str(user.userId) for user in users]
+    assert outsider.post(url, {'userIds': ids}, format='json').status_code == 403
+    assert outsider.post(url, {'userId': ids[0]}, format='json').status_code == 403
+    assert not organisation.users.filter(pk__in=ids).exists()
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+from django.db import connection
+from UserManager.backends.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+
+requires_postgresql = pytest.mark.skipif(connection.vendor != 'postgresql', reason='needs a PostgreSQL test database')
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+def make_pool(opened, **kwargs):
+    def connect():
+        conn = FakeConnection(len(opened))
+        opened.append(conn)
+        return conn
+    return ConnectionPool(connect, **kwargs)
+
+
+def test_reuses_released_connections(opened):
+    pool = make_pool(opened, min_size=2, max_size=4)
+    pool.fill()
+    assert len(opened) == 2
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.stats()["created"] == 2
+
+
+def test_waits_then_times_out_when_full(opened):
+    pool = make_pool(opened, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    threading.Timer(0.01, pool.release, (conn,)).start()
+    pool.timeout = 1
+    assert pool.acquire() is conn
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["waits"] == 2
+
+
+def test_replaces_connections_failing_their_check(opened):
+    now = [0.0]
+    pool = make_pool(opened, max_size=1, check=lambda conn: False, check_after=30, timer=lambda: now[0])
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+    pool.release(conn)
+    now[0] = 31
+    replacement = pool.acquire()
+    assert replacement is not conn and conn.closed
+    assert pool.stats()["size"] == 1
+
+
+def test_discard_frees_a_slot(opened):
+    pool = make_pool(opened, max_size=1, timeout=0.01)
+    pool.discard(pool.acquire())
+    assert pool.acquire() is opened[1]
+
+
+def test_closed_pool_closes_released_connections(opened):
+    pool = make_pool(opened, max_size=2)
+    idle, in_use = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close()
+    assert idle.closed and not in_use.closed
+    pool.release(in_use)
+    assert in_use.closed and pool.stats()["size"] == 0
+
+
+def pooled_wrapper(**overrides):
+    from UserManager.backends.pooled_postgresql.base import DatabaseWrapper
+
+    settings_dict = {
+        **connection.settings_dict,
+        'ENGINE': 'UserManager.backends.pooled_postgresql',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {**connection.settings_dict['OPTIONS'], 'pool': {'min_size': 0, 'max_size': 2}},
+        **overrides,
+    }
+    return DatabaseWrapper(settings_dict, alias='pool_test')
+
+
+def pool_test_stats():
+    from UserManager.backends.pooled_postgresql.base import pool_stats
+
+    return [stats for stats in pool_stats() if stats["alias"] == 'pool_test']
+
+
+@requires_postgresql
+@pytest.mark.django_db(transaction=True)
+def test_pooled_backend_returns_connections_to_the_pool():
+    from UserManager.backends.pooled_postgresql.base import close_pools
+
+    wrapper = pooled_wrapper()
+    try:
+        pids = []
+        for _ in range(3):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                pids.append(cursor.fetchone()[0])
+            wrapper.close()
+        assert len(set(pids)) == 1
+        [stats] = pool_test_stats()
+        assert (stats["created"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+    finally:
+        close_pools(wrapper.settings_dict['NAME'])
+
+
+@requires_postgresql
+@pytest.mark.django_db(transaction=True)
+def test_idle_pooled_connections_do_not_block_dropping_the_test_database():
+    name = f"{connection.settings_dict['NAME']}_pool"
+    wrapper = pooled_wrapper(TEST={**connection.settings_dict['TEST'], 'NAME': name})
+    wrapper.creation._create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    wrapper.settings_dict['NAME'] = name
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    wrapper.close()
+    assert [stats["idle"] for stats in pool_test_stats()] == [1]
+
+    wrapper.creation._destroy_test_db(name, verbosity=0)
+    assert pool_test_stats() == []
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', [name])
+        assert cursor.fetchone() is None
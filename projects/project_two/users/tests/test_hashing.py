@@ -0,0 +1,26 @@
+import pytest
+from django.contrib.auth.hashers import check_password, is_password_usable
+from users import hashing
+
+
+@pytest.fixture
+def pool(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    settings.PASSWORD_HASHING_WORKERS = 2
+    yield
+    hashing.shutdown()
+
+
+def test_hashes_in_process_pool(pool):
+    assert hashing.get_executor() is not None
+    assert check_password('secret', hashing.hash_password('secret'))
+    hashes = hashing.hash_passwords(['a', None, 'c'])
+    assert check_password('a', hashes[0]) and check_password('c', hashes[2])
+    assert not is_password_usable(hashes[1])
+
+
+def test_hashes_inline_without_workers(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    settings.PASSWORD_HASHING_WORKERS = 0
+    assert hashing.get_executor() is None
+    assert check_password('secret', hashing.hash_password('secret'))
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from django.contrib.auth.hashers import check_password
+from django.core.management import CommandError, call_command
+from users.models import User, Organisation
+
+pytestmark = pytest.mark.usefixtures('fast_hasher')
+
+
+@pytest.mark.django_db
+def test_imports_csv_in_chunks(tmp_path, capsys):
+    User.objects.create_user(email='taken@example.com', password='password', username='taken')
+    path = tmp_path / 'users.csv'
+    path.write_text(
+        "email,firstName,lastName,password,phone\n"
+        "ama@example.com,Ama,Mensah,secret1,0244\n"
+        "taken@example.com,Taken,User,secret2,\n"
+        "kofi@example.com,Kofi,Owusu,,\n"
+        "ama@example.com,Ama,Again,secret3,\n"
+        "bad-email,No,Email,secret4,\n"
+    )
+    call_command('import_users', str(path), '--chunk-size', '2', '--report-duplicates')
+
+    ama = User.objects.get(email='ama@example.com')
+    assert ama.firstName == 'Ama' and ama.phone == '0244'
+    assert check_password('secret1', ama.password)
+    assert not User.objects.get(email='kofi@example.com').has_usable_password()
+    assert Organisation.objects.get(users=ama).name == "Ama's Organisation"
+    assert User.objects.count() == 3
+
+    out, err = capsys.readouterr()
+    assert 'Imported 2 users from 5 rows' in out
+    assert 'Duplicate: taken@example.com' in err and 'Duplicate: ama@example.com' in err
+    assert 'Row 5' in err
+    assert not (tmp_path / 'users.csv.checkpoint').exists()
+
+
+@pytest.mark.django_db
+def test_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / 'users.jsonl'
+    path.write_text('\n'.join(json.dumps({"email": f"user{i}@example.com", "firstName": f"User{i}", "lastName": "Doe"})
+                              for i in range(5)))
+    (tmp_path / 'users.jsonl.checkpoint').write_text(
+        json.dumps({"rows": 3, "imported": 3, "duplicates": 0, "invalid": 0}))
+
+    call_command('import_users', str(path))
+    assert sorted(User.objects.values_list('email', flat=True)) == ['user3@example.com', 'user4@example.com']
+    assert Organisation.users.through.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_reports_rows_of_the_wrong_type(tmp_path, capsys):
+    domain = '.'.join(['b' * 60] * 3) + '.com'
+    rows = [
+        {"email": 123, "firstName": "Num", "lastName": "Ber"},
+        {"email": "list@example.com", "firstName": ["Li"], "lastName": "St"},
+        {"email": "long@example.com", "firstName": "Lo", "lastName": "Ng", "username": "u" * 151},
+        {"email": f"{'a' * 64}@{domain}", "firstName": "Ama", "lastName": "Mensah"},
+    ]
+    path = tmp_path / 'users.jsonl'
+    path.write_text('\n'.join(json.dumps(row) for row in rows))
+
+    call_command('import_users', str(path))
+    assert len(User.objects.get(firstName='Ama').username) <= 150
+    out, err = capsys.readouterr()
+    assert 'Imported 1 users from 4 rows' in out
+    assert 'Row 1: Not text: email' in err and 'Row 2: Not text: firstName' in err
+    assert 'Row 3: Username too long' in err
+
+
+def test_rejects_empty_chunks(tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text("email,firstName,lastName\n")
+    with pytest.raises(CommandError):
+        call_command('import_users', str(path), '--chunk-size', '0')
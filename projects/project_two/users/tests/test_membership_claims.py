@@ -0,0 +1,58 @@
+import pytest
+from django.conf import settings
+from jwt import decode
+from users.models import User, Organisation
+from users.utils import generate_token
+
+
+@pytest.fixture(autouse=True)
+def claims_enabled(settings):
+    settings.TOKEN_MEMBERSHIP_CLAIMS = True
+
+
+@pytest.fixture
+def member():
+    user = User.objects.create_user(email='ama@example.com', password='password123', username='ama')
+    organisation = Organisation.objects.create(name="Ama's Organisation")
+    organisation.users.add(user)
+    return user, organisation
+
+
+@pytest.mark.django_db
+def test_token_carries_membership_claims(member):
+    user, organisation = member
+    payload = decode(generate_token(user), settings.SECRET_KEY, algorithms=['HS256'])
+    assert payload['org_ids'] == [str(organisation.orgId)]
+    assert payload['membership_version'] == User.objects.get(pk=user.pk).membershipVersion == 1
+
+
+@pytest.mark.django_db
+def test_detail_authorizes_from_claims(member, django_assert_num_queries, client_for):
+    user, organisation = member
+    other = Organisation.objects.create(name='Other')
+    client = client_for(user)
+    # One query to authenticate the user, one to load the organisation.
+    with django_assert_num_queries(2):
+        assert client.get(f'/api/organisations/{organisation.orgId}').status_code == 200
+    with django_assert_num_queries(0):
+        assert client.get(f'/api/organisations/{other.orgId}').status_code == 403
+
+
+@pytest.mark.django_db
+def test_membership_change_invalidates_claims(member, client_for):
+    user, organisation = member
+    client = client_for(user)
+    organisation.users.remove(user)
+    assert User.objects.get(pk=user.pk).membershipVersion == 2
+    assert client.get(f'/api/organisations/{organisation.orgId}').status_code == 403
+    assert client.get('/api/organisations').data['data']['organisations'] == []
+
+
+@pytest.mark.django_db
+def test_no_claims_beyond_limit(member, settings, client_for):
+    user, _ = member
+    settings.TOKEN_MEMBERSHIP_CLAIMS_MAX = 1
+    Organisation.objects.create(name='Second').users.add(user)
+    payload = decode(generate_token(user), settings.SECRET_KEY, algorithms=['HS256'])
+    assert 'org_ids' not in payload
+    assert len(client_for(user).get('/api/organisations').data['data']['organisations']) == 2
@@ -0,0 +1,45 @@
+import pytest
+from users import cache
+from users.models import User, Organisation
+
+
+@pytest.fixture
+def members():
+    organisation = Organisation.objects.create(name='Org')
+    users = [User.objects.create_user(email=f'user{i}@example.com', password='password', username=f'user{i}')
+             for i in range(5)]
+    organisation.users.add(*users[:4])
+    return organisation, users
+
+
+@pytest.mark.django_db
+def test_membership_is_one_existence_query(members, django_assert_num_queries):
+    organisation, users = members
+    with django_assert_num_queries(1):
+        assert cache.is_member(organisation.pk, users[0].pk)
+    with django_assert_num_queries(1):
+        assert not cache.is_member(organisation.pk, users[4].pk)
+
+
+@pytest.mark.django_db
+def test_cached_member_set_is_searched_and_invalidated(members, settings, django_assert_num_queries):
+    settings.ORG_MEMBERSHIP_CACHE = True
+    organisation, users = members
+    assert cache.is_member(organisation.pk, users[1].pk)
+    with django_assert_num_queries(0):
+        assert [cache.is_member(organisation.pk, user.pk) for user in users] == [True] * 4 + [False]
+
+    users[4].organisations.add(organisation)
+    organisation.users.remove(users[0])
+    assert cache.is_member(organisation.pk, users[4].pk)
+    assert not cache.is_member(organisation.pk, users[0].pk)
+
+
+@pytest.mark.django_db
+def test_large_organisations_are_not_cached(members, settings, django_assert_num_queries):
+    settings.ORG_MEMBERSHIP_CACHE = True
+    settings.ORG_MEMBERSHIP_CACHE_MAX_MEMBERS = 3
+    organisation, users = members
+    assert cache.is_member(organisation.pk, users[0].pk)
+    with django_assert_num_queries(1):
+        assert cache.is_member(organisation.pk, users[0].pk)
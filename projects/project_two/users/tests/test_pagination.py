@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from users.models import User, Organisation
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(email='ama@example.com', password='password123', username='ama')
+
+
+def walk(client, url, key, limit):
+    seen, cursor = [], None
+    while True:
+        params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+        data = client.get(url, params).data['data']
+        assert len(data[key]) <= limit
+        seen += data[key]
+        cursor = data['next']
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.django_db
+def test_organisations_are_paginated_by_cursor(user, client_for):
+    organisations = [Organisation.objects.create(name=f"Org {i}") for i in range(7)]
+    for organisation in organisations:
+        organisation.users.add(user)
+    Organisation.objects.create(name='Other')
+
+    seen = walk(client_for(user), '/api/organisations', 'organisations', 3)
+    assert [org['orgId'] for org in seen] == sorted(str(org.orgId) for org in organisations)
+
+
+@pytest.mark.django_db
+def test_organisations_without_limit_or_cursor_are_not_truncated(user, settings, client_for):
+    settings.PAGE_SIZE = 2
+    for i in range(3):
+        Organisation.objects.create(name=f"Org {i}").users.add(user)
+    data = client_for(user).get('/api/organisations').data['data']
+    assert len(data['organisations']) == 3 and data['next'] is None
+
+
+@pytest.mark.django_db
+def test_page_size_is_capped_and_validated(user, settings, client_for):
+    settings.PAGE_SIZE_MAX = 2
+    for i in range(3):
+        Organisation.objects.create(name=f"Org {i}").users.add(user)
+    client = client_for(user)
+    data = client.get('/api/organisations', {'limit': 100}).data['data']
+    assert len(data['organisations']) == 2 and data['next']
+    assert client.get('/api/organisations', {'cursor': 'not-a-cursor'}).status_code == 400
+    assert client.get('/api/organisations', {'limit': 0}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_members_listing(user, client_for):
+    organisation = Organisation.objects.create(name='Org')
+    members = [user] + [User.objects.create_user(email=f"user{i}@example.com", password='password', username=f"user{i}")
+                        for i in range(4)]
+    organisation.users.add(*members)
+    outsider = User.objects.create_user(email='kofi@example.com', password='password', username='kofi')
+
+    url = f'/api/organisations/{organisation.orgId}/members'
+    seen = walk(client_for(user), url, 'users', 2)
+    assert [member['userId'] for member in seen] == sorted(str(member.userId) for member in members)
+    assert 'password' not in seen[0]
+    with CaptureQueriesContext(connection) as queries:
+        client_for(user).get(url)
+    assert not any('password' in query['sql'] for query in queries.captured_queries)
+    assert client_for(outsider).get(url).status_code == 403
@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import User, Organisation
+
+pytestmark = pytest.mark.usefixtures('fast_hasher')
+
+DATA = {
+    "firstName": "John",
+    "lastName": "Doe",
+    "email": "john.doe@example.com",
+    "password": "password123",
+}
+
+
+@pytest.mark.django_db
+def test_registration_query_count():
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().post('/auth/register', DATA, format='json')
+    assert response.status_code == 201
+    # The unique email check, then one INSERT each for the user, the
+    # organisation and the membership, in one transaction (a savepoint here,
+    # since the test itself runs in a transaction).
+    assert [query['sql'].split()[0] for query in queries.captured_queries] == [
+        'SELECT', 'SAVEPOINT', 'INSERT', 'INSERT', 'INSERT', 'RELEASE',
+    ]
+    user = User.objects.get(email=DATA['email'])
+    assert Organisation.objects.get(users=user).name == "John's Organisation"
+
+
+@pytest.mark.django_db
+def test_failed_registration_leaves_nothing_behind(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('organisation insert failed')
+
+    monkeypatch.setattr(Organisation.objects, 'create', fail)
+    with pytest.raises(RuntimeError):
+        APIClient().post('/auth/register', DATA, format='json')
+    assert not User.objects.filter(email=DATA['email']).exists()
+
+
+@pytest.mark.django_db
+def test_username_defaults_to_the_email():
+    assert APIClient().post('/auth/register', DATA, format='json').status_code == 201
+    assert User.objects.get(email=DATA['email']).username == DATA['email']
+
+    # Emails may be longer than the 150 characters allowed for usernames.
+    domain = '.'.join(['b' * 60] * 3) + '.com'
+    emails = [f"{'a' * 63}{i}@{domain}" for i in range(2)]
+    for email in emails:
+        assert APIClient().post('/auth/register', dict(DATA, email=email), format='json').status_code == 201
+    usernames = {User.objects.get(email=email).username for email in emails}
+    assert len(usernames) == 2
+    assert all(len(username) <= 150 for username in usernames)
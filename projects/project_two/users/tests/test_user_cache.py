@@ -0,0 +1,82 @@
+import pytest
+from django.contrib.auth.hashers import check_password
+from rest_framework import exceptions
+from users import cache
+from users.models import User
+from users.utils import JWTAuthentication, generate_token
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(email='ama@example.com', password='password123', username='ama',
+                                    firstName='Ama', lastName='Mensah')
+
+
+@pytest.mark.django_db
+def test_hot_user_authenticates_without_queries(user, django_assert_num_queries):
+    token = generate_token(user)
+    with django_assert_num_queries(1):
+        JWTAuthentication()._authenticate_credentials(token)
+    with django_assert_num_queries(0):
+        authenticated, _ = JWTAuthentication()._authenticate_credentials(token)
+    assert authenticated.pk == user.pk
+    assert authenticated.firstName == 'Ama'
+    assert authenticated.get_deferred_fields() >= {'password', 'phone'}
+
+
+@pytest.mark.django_db
+def test_shared_tier_fills_local_tier(user, django_assert_num_queries):
+    cache.get_user(user.pk)
+    cache.clear()
+    with django_assert_num_queries(0):
+        assert cache.get_user(user.pk).email == 'ama@example.com'
+
+
+@pytest.mark.django_db
+def test_entries_cached_with_other_fields_are_not_read(user, monkeypatch, django_assert_num_queries):
+    cache.get_user(user.pk)
+    cache.clear()
+    # As after a release that caches a different set of fields.
+    monkeypatch.setattr(cache, 'AUTH_USER_FIELDS', cache.AUTH_USER_FIELDS - {'membershipVersion'})
+    with django_assert_num_queries(1):
+        cached = cache.get_user(user.pk)
+    assert cached.email == 'ama@example.com'
+    assert 'membershipVersion' in cached.get_deferred_fields()
+
+
+@pytest.mark.django_db
+def test_deferred_fields_survive_save(user):
+    cached = cache.get_user(user.pk)
+    cached.firstName = 'Akua'
+    cached.save()
+    user.refresh_from_db()
+    assert user.firstName == 'Akua'
+    assert check_password('password123', user.password)
+
+
+@pytest.mark.django_db
+def test_save_and_delete_invalidate(user):
+    token = generate_token(user)
+    JWTAuthentication()._authenticate_credentials(token)
+
+    user.lastName = 'Owusu'
+    user.save()
+    authenticated, _ = JWTAuthentication()._authenticate_credentials(token)
+    assert authenticated.lastName == 'Owusu'
+
+    user.delete()
+    with pytest.raises(exceptions.AuthenticationFailed):
+        JWTAuthentication()._authenticate_credentials(token)
+
+
+def test_lru_evicts_least_recently_used_and_expires():
+    now = [0.0]
+    lru = cache.LRUCache(maxsize=2, ttl=5, timer=lambda: now[0])
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    now[0] = 5
+    assert lru.get('a') is None
@@ -1,5 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from .views import UserRegistration, UserLogin, UserDetail, OrganisationList, OrganisationDetail, AddUserToOrganisation
+from .views import UserRegistration, UserLogin, UserDetail, OrganisationList, OrganisationDetail, OrganisationMembers, AddUserToOrganisation
+
+if getattr(settings, 'USERS_ASYNC_VIEWS', False):
+	from .async_views import (AsyncUserDetail as UserDetail, AsyncOrganisationList as OrganisationList,
+							  AsyncOrganisationDetail as OrganisationDetail, AsyncOrganisationMembers as OrganisationMembers,
+							  AsyncAddUserToOrganisation as AddUserToOrganisation)
 
 urlpatterns = [
 	path('auth/register', UserRegistration.as_view(), name='user_resgistion'),
@@ -7,5 +13,6 @@ urlpatterns = [
 	path('api/users/<uuid:user_id>', UserDetail.as_view(), name='get_user'),
 	path('api/organisations', OrganisationList.as_view(), name="organisations_list_create"),
 	path('api/organisations/<uuid:org_id>', OrganisationDetail.as_view(), name="user_organisation"),
-	path('api/organisations/<uuid:org_id>/users', AddUserToOrganisation.as_view(), name="add_user_to_org")
+	path('api/organisations/<uuid:org_id>/users', AddUserToOrganisation.as_view(), name="add_user_to_org"),
+	path('api/organisations/<uuid:org_id>/members', OrganisationMembers.as_view(), name="organisation_members")
 ]
\ No newline at end of file
@@ -1,9 +1,11 @@
 from django.conf import settings
 from datetime import datetime, timezone, timedelta
+import hashlib
 import jwt
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
 from rest_framework import authentication, exceptions
+from .cache import aget_user, get_user
 
 
 User = get_user_model()
@@ -25,11 +27,37 @@ def generate_token(user):
         'iat': datetime.now(timezone.utc)
         
 	}
+    if getattr(settings, 'TOKEN_MEMBERSHIP_CLAIMS', False):
+        payload.update(membership_claims(user))
     
     access_token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
     return access_token
 
 
+def membership_claims(user):
+    """
+    Return the organisation membership claims for a user's access token.
+
+    The claims are the IDs of the user's organisations (`org_ids`) and the
+    user's membership version (`membership_version`) when they were read.
+    The version is read first, so a membership change racing with this call
+    leaves the claims outdated rather than wrong.
+
+    Args:
+        user (User): The user the token is issued to.
+
+    Returns:
+        dict: The claims, or an empty dict if the user belongs to more than
+        TOKEN_MEMBERSHIP_CLAIMS_MAX organisations.
+    """
+    version = User.objects.values_list('membershipVersion', flat=True).get(pk=user.pk)
+    limit = getattr(settings, 'TOKEN_MEMBERSHIP_CLAIMS_MAX', 100)
+    org_ids = [str(org_id) for org_id in user.organisations.values_list('orgId', flat=True)[:limit + 1]]
+    if len(org_ids) > limit:
+        return {}
+    return {"org_ids": org_ids, "membership_version": version}
+
+
 def generate_refresh_token(user):
     """
     Generate a refresh token for a given user.
@@ -57,6 +85,27 @@ def generate_refresh_token(user):
 
 
 
+def default_username(email):
+    """
+    Return the username given to a user who does not choose one.
+
+    `username` is unique but not part of the API, so it defaults to the
+    email. Emails longer than the username column are shortened, keeping
+    them unique with a hash of the whole email.
+
+    Args:
+        email (str): The user's email.
+
+    Returns:
+        str: A username of at most the username column's max_length.
+    """
+    max_length = User._meta.get_field('username').max_length
+    if len(email) <= max_length:
+        return email
+    digest = hashlib.sha256(email.encode()).hexdigest()[:16]
+    return f"{email[:max_length - len(digest) - 1]}~{digest}"
+
+
 class JWTAuthentication(authentication.BaseAuthentication):
     """
     Custom authentication class for validating JWT tokens.
@@ -65,11 +114,26 @@ class JWTAuthentication(authentication.BaseAuthentication):
     the Authorization header for a Bearer token, decodes the token, and retrieves 
     the associated user.
 
+    Users are read through `users.cache.get_user`, so hot users authenticate
+    without a database query. When the token carries up-to-date membership
+    claims, the IDs of the user's organisations are set on the user as
+    `claimed_org_ids`; otherwise `claimed_org_ids` is None and membership has
+    to be checked in the database.
+
     Methods:
         authenticate(request): Extracts the token from the request and validates it.
         _authenticate_credentials(token): Decodes the token and retrieves the user.
     """
     def authenticate(self, request):
+        token = self._get_token(request)
+        if token is None:
+            return None
+
+        return self._authenticate_credentials(token)
+
+
+    @staticmethod
+    def _get_token(request):
         auth_header = request.headers.get('Authorization')
         if not auth_header:
             return None
@@ -80,24 +144,39 @@ class JWTAuthentication(authentication.BaseAuthentication):
                 raise exceptions.AuthenticationFailed('Invalid token prefix')
         except ValueError:
             raise exceptions.AuthenticationFailed('Invalid token header')
-
-        return self._authenticate_credentials(token)
+        return token
 
 
-    def _authenticate_credentials(self, token):
+    @staticmethod
+    def _decode(token):
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         except jwt.ExpiredSignatureError:
             raise exceptions.AuthenticationFailed('Token has expired')
         except jwt.InvalidTokenError:
             raise exceptions.AuthenticationFailed('Invalid token')
 
+
+    def _authenticate_credentials(self, token):
+        payload = self._decode(token)
+
         try:
-            user = User.objects.get(userId=payload['user_id'])
+            user = get_user(payload['user_id'])
         except User.DoesNotExist:
             raise exceptions.AuthenticationFailed('User not found')
 
+        user.claimed_org_ids = self._claimed_org_ids(payload, user)
         return (user, token)
+
+
+    @staticmethod
+    def _claimed_org_ids(payload, user):
+        if not getattr(settings, 'TOKEN_MEMBERSHIP_CLAIMS', False):
+            return None
+        org_ids = payload.get('org_ids')
+        if org_ids is None or payload.get('membership_version') != user.membershipVersion:
+            return None
+        return frozenset(org_ids)
     
     
     @staticmethod
@@ -109,4 +188,29 @@ class JWTAuthentication(authentication.BaseAuthentication):
             raise exceptions.AuthenticationFailed("Refresh token has expired")
         except jwt.InvalidTokenError:
             raise exceptions.AuthenticationFailed('Invalid Refresh Token')
-            
\ No newline at end of file
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    Async version of `JWTAuthentication`, for the views in `users.async_views`.
+
+    Tokens are checked in the same way; users are read with
+    `users.cache.aget_user`, through the async ORM.
+
+    Methods:
+        authenticate(request): Coroutine extracting the token from the request and validating it.
+    """
+    async def authenticate(self, request):
+        token = self._get_token(request)
+        if token is None:
+            return None
+
+        payload = self._decode(token)
+
+        try:
+            user = await aget_user(payload['user_id'])
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed('User not found')
+
+        user.claimed_org_ids = self._claimed_org_ids(payload, user)
+        return (user, token)
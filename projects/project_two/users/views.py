@@ -1,12 +1,32 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from rest_framework.exceptions import AuthenticationFailed
-from .serializers import UserSerializer, OrganisationSerializer
+from .serializers import USER_READ_FIELDS, UserSerializer, OrganisationSerializer
 from .models import User, Organisation
 from .utils import generate_refresh_token, generate_token, JWTAuthentication
+from .cache import is_member
+from .pagination import InvalidPage, keyset_page, wants_page
+from .memberships import Membership, add_members
+
+
+def _allowed(request, org_id):
+    org_ids = getattr(request.user, 'claimed_org_ids', None)
+    if org_ids is not None:
+        return str(org_id) in org_ids
+    return is_member(org_id, request.user.pk)
+
+
+def _invalid_page(error):
+    return Response({
+        "status": "Bad request",
+        "message": str(error),
+        "statusCode": 400
+    }, status=status.HTTP_400_BAD_REQUEST)
 
 
 class UserRegistration(APIView):
@@ -17,6 +37,10 @@ class UserRegistration(APIView):
     creates a new user, creates a default organisation for the user, and generates
     authentication tokens for the user.
 
+    The user, the organisation and the membership row are written in one
+    transaction, with one INSERT each, so a failed registration leaves
+    nothing behind.
+
     Attributes:
         permission_classes (tuple): Specifies the permission classes for the view.
     """
@@ -25,9 +49,17 @@ class UserRegistration(APIView):
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            org = Organisation.objects.create(name=f"{user.firstName}'s Organisation")
-            org.users.add(user)
+            try:
+                with transaction.atomic():
+                    user = serializer.save()
+                    org = Organisation.objects.create(name=f"{user.firstName}'s Organisation")
+                    # Inserted directly rather than with org.users.add(), which
+                    # first looks for an existing row; m2m_changed is not needed
+                    # since neither the user nor the organisation is cached yet.
+                    Membership.objects.create(organisation_id=org.pk, user_id=user.pk)
+            except IntegrityError:
+                # The email was registered concurrently, after validation.
+                return self.failed()
             access_token = generate_token(user)
             refresh_token = generate_refresh_token(user)
             return Response({
@@ -39,6 +71,10 @@ class UserRegistration(APIView):
                 }
             }, status=status.HTTP_201_CREATED)
 
+        return self.failed()
+
+    @staticmethod
+    def failed():
         return Response({
             "status": "Bad request",
             "message": "Registration unsuccessful",
@@ -114,7 +150,13 @@ class UserDetail(APIView):
     authentication_classes = (JWTAuthentication,)
     
     def get(self, request, user_id):
-        user = User.objects.get(pk=user_id)
+        try:
+            user = User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            return Response({
+                "status": "Error",
+                "message": f"User with id {user_id} does not exist"
+            }, status=status.HTTP_404_NOT_FOUND)
         serializer = UserSerializer(user)
         return Response({
 			"status": "success",
@@ -131,6 +173,11 @@ class OrganisationList(APIView):
     associated with. Requires JWT authentication and returns the organisations' 
     data upon successful retrieval.
 
+    With a `limit` or `cursor` query parameter, the list is paginated by
+    organisation ID with `users.pagination.keyset_page`: `limit` sets the page
+    size and `cursor` takes the `next` cursor of the previous page. Without
+    either, every organisation is returned, as before pagination was added.
+
     Attributes:
         authentication_classes (tuple): Specifies the authentication classes for the view.
         permission_classes (tuple): Specifies the permission classes for the view.
@@ -143,15 +190,27 @@ class OrganisationList(APIView):
     permission_classes = (permissions.IsAuthenticated,)
     
     def get(self, request):
-        organisations = request.user.organisations.all()
-        serializer = OrganisationSerializer(organisations, many=True)
+        org_ids = getattr(request.user, 'claimed_org_ids', None)
+        if org_ids is not None:
+            organisations = Organisation.objects.filter(pk__in=org_ids)
+        else:
+            organisations = request.user.organisations.all()
+        if wants_page(request):
+            try:
+                page, next_cursor = keyset_page(organisations, 'orgId', request)
+            except InvalidPage as e:
+                return _invalid_page(e)
+        else:
+            page, next_cursor = organisations.order_by('orgId'), None
+        serializer = OrganisationSerializer(page, many=True)
         
         response = Response()
         response.data = {
 			"status": "success",
 			"message": "Organisations Retrieved Successfully",
 			"data": {
-				"organisations": serializer.data
+				"organisations": serializer.data,
+				"next": next_cursor
 			}
 		}
         response.status_code = status.HTTP_200_OK
@@ -183,6 +242,10 @@ class OrganisationDetail(APIView):
     (`org_id`). Requires JWT authentication and permission to access details of 
     organisations associated with the authenticated user.
 
+    When the access token carries up-to-date membership claims, access is
+    decided from the claims; otherwise with `users.cache.is_member`, which
+    never loads the organisation's members.
+
     Attributes:
         authentication_classes (tuple): Specifies the authentication classes for the view.
         permission_classes (tuple): Specifies the permission classes for the view.
@@ -196,8 +259,8 @@ class OrganisationDetail(APIView):
     permission_classes = (permissions.IsAuthenticated,)
     
     def get(self, request, org_id):
-        organisation = Organisation.objects.get(pk=org_id)
-        if request.user in organisation.users.all():
+        if _allowed(request, org_id):
+            organisation = Organisation.objects.get(pk=org_id)
             serializer = OrganisationSerializer(organisation)
             return Response({
 				"status": "success",
@@ -211,6 +274,49 @@ class OrganisationDetail(APIView):
 		}, status=status.HTTP_403_FORBIDDEN)
 
 
+class OrganisationMembers(APIView):
+    """
+    API view for listing the members of an organisation.
+
+    This view lists the users of the organisation identified by its ID
+    (`org_id`), paginated by user ID with `users.pagination.keyset_page`.
+    Requires JWT authentication, and only members of the organisation may
+    list its members.
+
+    Attributes:
+        authentication_classes (tuple): Specifies the authentication classes for the view.
+        permission_classes (tuple): Specifies the permission classes for the view.
+
+    Methods:
+        get(request, org_id):
+            Handle GET request to retrieve one page of the members of the organisation.
+    """
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, org_id):
+        if not _allowed(request, org_id):
+            return Response({
+                "status": "Bad request",
+                "message": "Access denied"
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        members = User.objects.filter(organisations=org_id).only(*USER_READ_FIELDS)
+        try:
+            page, next_cursor = keyset_page(members, 'userId', request)
+        except InvalidPage as e:
+            return _invalid_page(e)
+        serializer = UserSerializer(page, many=True)
+        return Response({
+            "status": "success",
+            "message": "Organisation members retrieved successfully",
+            "data": {
+                "users": serializer.data,
+                "next": next_cursor
+            }
+        }, status=status.HTTP_200_OK)
+
+
 class AddUserToOrganisation(APIView):
     """
     API view for adding a user to an organisation.
@@ -219,6 +325,11 @@ class AddUserToOrganisation(APIView):
     identified by its ID (`org_id`). Requires JWT authentication and permission to modify 
     organisations associated with the authenticated user.
 
+    A list of IDs (`userIds`, at most BULK_ADD_MAX_USERS) adds them all in one
+    transaction with `users.memberships.add_members`, and the response reports
+    which were added, already members, or not found. Only members of the
+    organisation may add users to it.
+
     Attributes:
         authentication_classes (tuple): Specifies the authentication classes for the view.
         permission_classes (tuple): Specifies the permission classes for the view.
@@ -239,19 +350,35 @@ class AddUserToOrganisation(APIView):
 				"status": "Error",
 				"message": f"Organisation with id {org_id} does not exist"
 			}, status=status.HTTP_404_NOT_FOUND)
+        if not _allowed(request, organisation.pk):
+            return Response({
+                "status": "Bad request",
+                "message": "Access denied"
+            }, status=status.HTTP_403_FORBIDDEN)
         
+        user_ids = request.data.get('userIds')
+        if user_ids is not None:
+            if (not isinstance(user_ids, list) or not all(isinstance(user_id, str) for user_id in user_ids)
+                    or len(user_ids) > getattr(settings, 'BULK_ADD_MAX_USERS', 10000)):
+                return Response({
+                    "status": "Bad request",
+                    "message": "userIds must be a list of user ids",
+                    "statusCode": 400
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                "status": "success",
+                "message": "Users added to organisation successfully",
+                "data": add_members(organisation, user_ids)
+            }, status=status.HTTP_200_OK)
+
         user_id = request.data.get('userId')
         
-        try:
-            user = User.objects.get(pk=user_id)
-        except User.DoesNotExist:
+        if add_members(organisation, [user_id])["notFound"]:
             return Response({
 				"status": "Error",
 				"message": f"User with id {user_id} does not exist"
 			}, status=status.HTTP_404_NOT_FOUND)
             
-        organisation.users.add(user)
-            
         return Response({
 			"status": "success",
 			"message": "User added to organisation successfully"